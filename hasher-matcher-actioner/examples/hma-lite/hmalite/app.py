@@ -8,7 +8,7 @@ import shutil
 from flask import Flask, render_template, request, jsonify, send_from_directory
 from hmalite.config import HmaLiteDevConfig, HmaLiteProdConfig
 from hmalite.matcher import matcher_api
-from hmalite.index import reset_index, get_local_index
+from hmalite.index import get_local_index, publish_local_index, reset_index
 from threatexchange.hashing.pdq_hasher import pdq_from_file
 from threatexchange.signal_type import pdq_index
 
@@ -124,9 +124,8 @@ def create_index(filepath):
     )
     with open(config_helper.local_index_file_path, "wb") as f:
         index.serialize(f)
-    # Thanks to the miracle of the GIL, this is (mostly) safe!
-    # Flask also aggressively threadlocals everything
-    reset_index(index)
+    # Workers swap to the new index the next time they check for one
+    reset_index(index, config_helper)
 
 
 def query_index(hash):
@@ -160,8 +159,9 @@ config_helper.create_dirs()
 csv_f, index_f = config_helper.starting_index_files
 if index_f and index_f != config_helper.local_index_file_path:
     app.logger.info("Starting available at %s, loading", index_f)
-    load_index(index_f)
     shutil.copy(index_f, config_helper.local_index_file_path)
 elif csv_f:
     app.logger.info("CSV available at %s", csv_f)
     create_index(csv_f)
+# Once, before any requests, rather than each worker racing to on its first
+publish_local_index(config_helper)
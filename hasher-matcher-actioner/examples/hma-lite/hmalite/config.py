@@ -62,6 +62,11 @@ class HmaLiteConfig(t.NamedTuple):
             index_f = self._exists(self.INDEX_FILE) or self.local_index_file
         return csv_f, index_f
 
+    @property
+    def published_index_dir(self):
+        """Where the index is published for all workers, see get_local_index"""
+        return os.path.join(self.STATE_DIR, "published")
+
     @property
     def local_index_file_path(self):
         return os.path.join(self.STATE_DIR, "index.te")
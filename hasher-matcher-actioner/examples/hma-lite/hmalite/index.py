@@ -2,26 +2,50 @@
 
 from hmalite.config import HmaLiteConfig
 from threatexchange.signal_type import pdq_index
+from threatexchange.signal_type.shared_index import SharedIndexReader, publish_index
 
 
 ####################### INDEX HACKS #######################
-# This doesn't really behave the way you might think -
-# instances of flask are destroyed and created all the time/thread
-# local-d, so you'll get a bunch of copies of this(?)
-# Someday we'll have to figure out the correct way to stage it
-_INDEX = None
+# Instances of flask are destroyed and created all the time/thread local-d,
+# and prod servers run several worker processes, so rather than each loading
+# their own copy, the index is published to a directory that every worker
+# memory maps, and they pick up a new one when it is published.
+_READER = None
+
+
+def _get_reader(config: HmaLiteConfig) -> SharedIndexReader:
+    global _READER
+    if _READER is None:
+        _READER = SharedIndexReader(pdq_index.PDQIndex, config.published_index_dir)
+    return _READER
+
+
+def publish_local_index(config: HmaLiteConfig) -> None:
+    """
+    Publishes the local index file for the workers, unless an index has been
+    published already. Every worker may call this at startup, and only the
+    first one to get there publishes.
+    """
+    if not config.local_index_file:
+        return
+    with open(config.local_index_file, "rb") as f:
+        index = pdq_index.PDQIndex.deserialize(f)
+    publish_index(index, config.published_index_dir, if_missing=True)
 
 
 def get_local_index():
-    global _INDEX
-    if not _INDEX:
-        config = HmaLiteConfig.from_flask_current_app()
-        with open(config.local_index_file, "rb") as f:
-            index = pdq_index.PDQIndex.deserialize(f.read())
-        _INDEX = index
-    return _INDEX
-
-
-def reset_index(index):
-    global _INDEX
-    _INDEX = index
+    config = HmaLiteConfig.from_flask_current_app()
+    reader = _get_reader(config)
+    try:
+        return reader.get()
+    except FileNotFoundError:
+        if not config.local_index_file:
+            raise
+    # e.g. the published directory was cleared since startup
+    publish_local_index(config)
+    return reader.get()
+
+
+def reset_index(index, config: HmaLiteConfig):
+    # May be called at startup, outside of an app context
+    publish_index(index, config.published_index_dir)
@@ -24,14 +24,15 @@ from threatexchange.signal_type.signal_base import SignalType
 from hmalib.indexers.s3_indexers import (
     S3BackedMD5Index,
     S3BackedPDQIndex,
-    S3BackedPDQFlatIndex,
     S3BackedInstrumentedIndexMixin,
 )
 
 # Maps from signal type → [index] i.e. list of indexes the can be use for that signal type.
+# PDQ only needs the one: custom privacy group thresholds are passed to it at
+# query time (see Matcher), so S3BackedPDQFlatIndex no longer has to be built.
 INDEX_MAPPING: t.Dict[
     t.Type[SignalType], t.List[t.Type[S3BackedInstrumentedIndexMixin]]
 ] = {
-    PdqSignal: [S3BackedPDQIndex, S3BackedPDQFlatIndex],
+    PdqSignal: [S3BackedPDQIndex],
     VideoMD5Signal: [S3BackedMD5Index],
 }
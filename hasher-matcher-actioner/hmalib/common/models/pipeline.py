@@ -260,6 +260,78 @@ class PipelineHashRecord(PipelineRecordDefaultsBase, PipelineRecordBase):
         ]
 
 
+@dataclass
+class SkippedHashRecord(PipelineHashRecord):
+    """
+    A hash the matcher didn't search for, i.e. because it was low quality, so
+    that skipped content can be reviewed, and replayed through the matcher
+    with to_sqs_message.
+
+    Stored next to the PipelineHashRecord of the content, under its own sort
+    key prefix so that it isn't read back as one.
+    """
+
+    SKIPPED_KEY_PREFIX = "skipped#"
+
+    reason: str = "low_quality"
+
+    def to_dynamodb_item(self) -> dict:
+        item = super().to_dynamodb_item()
+        item["SK"] = self.get_dynamodb_skipped_key(self.signal_type.get_name())
+        item["SkipReason"] = self.reason
+        return item
+
+    @classmethod
+    def get_dynamodb_skipped_key(cls, signal_type_name: str) -> str:
+        return f"{cls.SKIPPED_KEY_PREFIX}{signal_type_name}"
+
+    @classmethod
+    def get_from_content_id(
+        cls,
+        table: Table,
+        content_id: str,
+        signal_type: t.Optional[t.Type[SignalType]] = None,
+    ) -> t.List["SkippedHashRecord"]:
+        """
+        Returns all SkippedHashRecords for a content_id.
+        """
+        expected_pk = cls.get_dynamodb_content_key(content_id)
+        if signal_type is None:
+            condition_expression = Key("PK").eq(expected_pk) & Key("SK").begins_with(
+                cls.SKIPPED_KEY_PREFIX
+            )
+        else:
+            condition_expression = Key("PK").eq(expected_pk) & Key("SK").eq(
+                cls.get_dynamodb_skipped_key(signal_type.get_name())
+            )
+
+        return cls._result_items_to_records(
+            table.query(
+                KeyConditionExpression=condition_expression,
+            ).get("Items", [])
+        )
+
+    @classmethod
+    def _result_items_to_records(
+        cls,
+        items: t.List[t.Dict],
+    ) -> t.List["SkippedHashRecord"]:
+        return [
+            SkippedHashRecord(
+                content_id=item["PK"][len(cls.CONTENT_KEY_PREFIX) :],
+                signal_type=get_signal_types_by_name()[item["SignalType"]],
+                content_hash=item["ContentHash"],
+                updated_at=datetime.datetime.fromisoformat(item["UpdatedAt"]),
+                signal_specific_attributes=cls.deserialize_signal_specific_attributes(
+                    item
+                ),
+                # Not in GSI-2, so not in get_recent_items_page
+                reason=item.get("SkipReason", cls.reason),
+            )
+            for item in items
+        ]
+
+
 @dataclass
 class _MatchRecord(PipelineRecordBase):
     """
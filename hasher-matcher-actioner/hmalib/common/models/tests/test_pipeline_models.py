@@ -205,6 +205,27 @@ class TestPDQModels(DynamoDBTableTestBase, unittest.TestCase):
 
         assert record == query_record
 
+    def test_skipped_hash_record(self):
+        hash_record = self.get_example_pdq_hash_record()
+        hash_record.write_to_table(self.table)
+        record = models.SkippedHashRecord(
+            TestPDQModels.TEST_CONTENT_ID,
+            PdqSignal,
+            hash_record.content_hash,
+            datetime.datetime.now(),
+            {"Quality": Decimal("10")},
+        )
+        record.write_to_table(self.table)
+
+        assert models.SkippedHashRecord.get_from_content_id(
+            self.table, TestPDQModels.TEST_CONTENT_ID
+        ) == [record]
+        assert record.to_sqs_message()["ContentHash"] == hash_record.content_hash
+        # Not mistaken for the hash record
+        assert models.PipelineHashRecord.get_from_content_id(
+            self.table, TestPDQModels.TEST_CONTENT_ID
+        ) == [hash_record]
+
     def test_write_match_record(self):
         """
         Test MatchRecord write table with hardcode query
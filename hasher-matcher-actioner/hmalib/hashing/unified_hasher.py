@@ -2,7 +2,7 @@
 
 import typing as t
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from mypy_boto3_dynamodb.service_resource import Table
 from mypy_boto3_sqs.client import SQSClient
 
@@ -22,16 +22,16 @@ class ContentSignal:
     Envelope for a signal type and signal's value. Has been extracted from a
     piece of content.
 
-    TODO: assumption that a signal value can only be string is inaccurate. Even
-    simple algorithms like PDQ emit a tuple. Quality and Hash value.
-
-    Need to figure out a way for this to be extensible or flexible for all kinds
-    of hashes.
+    Anything else the hasher computed along with the value (eg. PDQ's quality)
+    is in signal_specific_attributes, ready for PipelineHashRecord.
     """
 
     content_type: t.Type[ContentType]
     signal_type: t.Type[SignalType]
     signal_value: str
+    signal_specific_attributes: t.Dict[str, t.Union[int, float, str]] = field(
+        default_factory=dict
+    )
 
 
 class UnifiedHasher:
@@ -85,14 +85,16 @@ class UnifiedHasher:
             ):
                 with metrics.timer(metrics.names.hasher.hash(signal_type.get_name())):
                     try:
-                        hash_value = signal_type.hash_from_bytes(bytes_)
+                        hashed = signal_type.hash_with_attributes_from_bytes(bytes_)
                     except Exception:
                         logger.exception(
                             "Encountered exception while trying to hash_from_bytes. Unable to hash content."
                         )
                         continue
 
-                yield ContentSignal(content_type, signal_type, hash_value)
+                yield ContentSignal(
+                    content_type, signal_type, hashed.hash, dict(hashed.attributes)
+                )
 
     def write_hash_record(self, table: Table, hash_record: PipelineHashRecord):
         """
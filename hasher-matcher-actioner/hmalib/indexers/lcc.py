@@ -3,7 +3,6 @@
 import glob
 import os.path
 import pathlib
-import pickle
 import time
 import typing as t
 from dataclasses import dataclass
@@ -28,7 +27,7 @@ class LCCIndexer:
         latest_directory = max(pathlib.Path(directory).glob("*/"), key=os.path.getmtime)
 
         with open(latest_directory, "rb") as f:
-            return pickle.load(f)
+            return PDQIndex.deserialize(f)
 
     @classmethod
     def build_index_from_last_24h(cls, signal_type, storage_path, bucket_width) -> None:
@@ -65,4 +64,4 @@ class LCCIndexer:
         creation_time = str(datetime.now().strftime("%Y-%m-%d_%H:%M"))
         directory = os.path.join(storage_path, signal_type, creation_time)
         with open(directory, "wb") as f:
-            pickle.dump(index, f)
+            index.serialize(f)
@@ -9,9 +9,10 @@ S3 Backed Index Management. Offers a menu of indexes.
 """
 
 from datetime import datetime
-import pickle
+import io
 import boto3
 import functools
+import tempfile
 from mypy_boto3_s3.service_resource import Bucket
 from mypy_boto3_s3.type_defs import MetricsAndOperatorTypeDef
 from threatexchange.signal_type.signal_base import TrivialSignalTypeIndex
@@ -40,22 +41,28 @@ class S3BackedInstrumentedIndexMixin:
 
     def save(self, bucket_name: str):
         with metrics.timer(metrics.names.indexer.upload_index):
-            index_file_bytes = pickle.dumps(self)
+            buffer = io.BytesIO()
+            self.serialize(buffer)  # type: ignore
             get_s3_client().put_object(
                 Bucket=bucket_name,
                 Key=self.__class__._get_index_s3_key(),
-                Body=index_file_bytes,
+                Body=buffer.getvalue(),
             )
 
     @classmethod
     def load(cls, bucket_name: str):
+        """
+        Downloads to a temporary file rather than into memory, so that indexes
+        which support it (i.e. PDQIndex) can memory map it in deserialize().
+        Indexes saved as pickles by older versions still load.
+        """
         with metrics.timer(metrics.names.indexer.download_index):
-            index_file_bytes = (
-                get_s3_client()
-                .get_object(Bucket=bucket_name, Key=cls._get_index_s3_key())["Body"]
-                .read()
-            )
-            return pickle.loads(index_file_bytes)
+            with tempfile.TemporaryFile() as f:
+                get_s3_client().download_fileobj(
+                    Bucket=bucket_name, Key=cls._get_index_s3_key(), Fileobj=f
+                )
+                f.seek(0)
+                return cls.deserialize(f)  # type: ignore
 
     def get_index_class_name(self) -> str:
         """
@@ -128,6 +135,9 @@ class S3BackedPDQIndex(PDQIndex, S3BackedInstrumentedIndexMixin):
 class S3BackedPDQFlatIndex(PDQFlatIndex, S3BackedInstrumentedIndexMixin):
     """
     DO NOT OVERRIDE __init__(). Let PDQFlatIndex provide that.
+
+    No longer built by default: S3BackedPDQIndex is searched with the custom
+    thresholds of privacy groups instead.
     """
 
     @classmethod
@@ -151,6 +151,7 @@ def lambda_handler(event, context):
                     content_id=media.content_id,
                     signal_type=signal.signal_type,
                     content_hash=signal.signal_value,
+                    signal_specific_attributes=signal.signal_specific_attributes,
                     updated_at=datetime.datetime.now(),
                 )
 
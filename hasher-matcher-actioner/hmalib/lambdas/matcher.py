@@ -1,27 +1,33 @@
 # Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
 
+import collections
+import datetime
 import functools
 import json
 import os
+import typing as t
 import boto3
 from mypy_boto3_dynamodb.service_resource import DynamoDBServiceResource, Table
 from mypy_boto3_sns import SNSClient
 
 from threatexchange.signal_type.md5 import VideoMD5Signal
 from threatexchange.signal_type.pdq import PdqSignal
+from threatexchange.signal_type.signal_base import SignalType
 
 from hmalib import metrics
 from hmalib.common.logging import get_logger
 from hmalib.common.models.bank import BanksTable
 from hmalib.matchers.matchers_base import Matcher
 from hmalib.common.config import HMAConfig
-from hmalib.common.models.pipeline import PipelineHashRecord
+from hmalib.common.models.pipeline import PipelineHashRecord, SkippedHashRecord
 
 INDEXES_BUCKET_NAME = os.environ["INDEXES_BUCKET_NAME"]
 BANKS_TABLE = os.environ["BANKS_TABLE"]
 DYNAMODB_TABLE = os.environ["DYNAMODB_TABLE"]
 HMA_CONFIG_TABLE = os.environ["HMA_CONFIG_TABLE"]
 MATCHES_TOPIC_ARN = os.environ["MATCHES_TOPIC_ARN"]
+# Optional override of PDQ_MIN_QUALITY, below which hashes aren't matched
+MIN_PDQ_QUALITY = os.environ.get("MIN_PDQ_QUALITY")
 
 HMAConfig.initialize(HMA_CONFIG_TABLE)
 
@@ -46,6 +52,9 @@ def get_matcher(banks_table: BanksTable):
             index_bucket_name=INDEXES_BUCKET_NAME,
             supported_signal_types=[PdqSignal, VideoMD5Signal],
             banks_table=banks_table,
+            min_quality=(
+                {} if MIN_PDQ_QUALITY is None else {PdqSignal: int(MIN_PDQ_QUALITY)}
+            ),
         )
     return _matcher
 
@@ -68,6 +77,7 @@ def lambda_handler(event, context):
     table = get_dynamodb().Table(DYNAMODB_TABLE)
     banks_table = BanksTable(get_dynamodb().Table(BANKS_TABLE))
 
+    hash_records = []
     for sqs_record in event["Records"]:
         message = json.loads(sqs_record["body"])
 
@@ -88,34 +98,66 @@ def lambda_handler(event, context):
             hash_record.content_id,
             hash_record.content_hash,
         )
-
-        matches = get_matcher(banks_table).match(
-            hash_record.signal_type, hash_record.content_hash
-        )
-        logger.info("Found %d matches.", len(matches))
-
-        for match in matches:
-            get_matcher(banks_table).write_match_record_for_result(
-                table=table,
-                signal_type=hash_record.signal_type,
-                content_hash=hash_record.content_hash,
-                content_id=hash_record.content_id,
-                match=match,
+        if get_matcher(banks_table).is_low_quality(
+            hash_record.signal_type, hash_record.signal_specific_attributes
+        ):
+            # Low quality hashes are near many unrelated ones, so matching
+            # them would mostly produce false positives. Recorded, so that
+            # they can be reviewed and replayed.
+            logger.info(
+                "Skipping low quality hash for contentId: %s with attributes: %s",
+                hash_record.content_id,
+                hash_record.signal_specific_attributes,
             )
-
-        for match in matches:
-            get_matcher(banks_table).write_signal_if_not_found(
-                table=table, signal_type=hash_record.signal_type, match=match
-            )
-
-        if len(matches) != 0:
-            # Publish all messages together
-            get_matcher(banks_table).publish_match_message(
+            SkippedHashRecord(
                 content_id=hash_record.content_id,
+                signal_type=hash_record.signal_type,
                 content_hash=hash_record.content_hash,
-                matches=matches,
-                sns_client=get_sns_client(),
-                topic_arn=MATCHES_TOPIC_ARN,
-            )
+                updated_at=datetime.datetime.now(),
+                signal_specific_attributes=hash_record.signal_specific_attributes,
+                reason="low_quality",
+            ).write_to_table(table)
+            metrics.counts.update({metrics.names.matcher.skip_low_quality: 1})
+            continue
+        hash_records.append(hash_record)
+
+    # Search the index once per signal type for the whole batch of records
+    records_by_signal_type: t.Dict[
+        t.Type[SignalType], t.List[PipelineHashRecord]
+    ] = collections.defaultdict(list)
+    for hash_record in hash_records:
+        records_by_signal_type[hash_record.signal_type].append(hash_record)
+
+    for signal_type, records in records_by_signal_type.items():
+        all_matches = get_matcher(banks_table).match_many(
+            signal_type, [record.content_hash for record in records]
+        )
 
-        metrics.flush()
+        for hash_record, matches in zip(records, all_matches):
+            logger.info("Found %d matches.", len(matches))
+
+            for match in matches:
+                get_matcher(banks_table).write_match_record_for_result(
+                    table=table,
+                    signal_type=hash_record.signal_type,
+                    content_hash=hash_record.content_hash,
+                    content_id=hash_record.content_id,
+                    match=match,
+                )
+
+            for match in matches:
+                get_matcher(banks_table).write_signal_if_not_found(
+                    table=table, signal_type=hash_record.signal_type, match=match
+                )
+
+            if len(matches) != 0:
+                # Publish all messages together
+                get_matcher(banks_table).publish_match_message(
+                    content_id=hash_record.content_id,
+                    content_hash=hash_record.content_hash,
+                    matches=matches,
+                    sns_client=get_sns_client(),
+                    topic_arn=MATCHES_TOPIC_ARN,
+                )
+
+    metrics.flush()
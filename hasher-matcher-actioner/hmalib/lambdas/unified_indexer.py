@@ -7,8 +7,10 @@ import boto3
 
 from threatexchange.signal_type.md5 import VideoMD5Signal
 from threatexchange.signal_type.pdq import PdqSignal
+from threatexchange.signal_type.pdq_index import PDQIndex
 from threatexchange.signal_type.signal_base import SignalType
 
+from hmalib.common.config import HMAConfig
 from hmalib.common.models.bank import BanksTable
 from hmalib.common.s3_adapters import (
     HashRowT,
@@ -24,6 +26,9 @@ from hmalib.indexers.metadata import BankedSignalIndexMetadata
 from hmalib.indexers.s3_indexers import (
     S3BackedInstrumentedIndexMixin,
 )
+from hmalib.matchers.filters import (
+    get_max_threshold_of_active_privacy_groups_for_signal_type,
+)
 
 logger = get_logger(__name__)
 dynamodb = boto3.resource("dynamodb")
@@ -33,6 +38,11 @@ THREAT_EXCHANGE_DATA_FOLDER = os.environ["THREAT_EXCHANGE_DATA_FOLDER"]
 
 INDEXES_BUCKET_NAME = os.environ["INDEXES_BUCKET_NAME"]
 BANKS_TABLE = os.environ["BANKS_TABLE"]
+HMA_CONFIG_TABLE = os.environ["HMA_CONFIG_TABLE"]
+# Whether PDQ indexes are tuned when built, see PDQIndex.build
+TUNE_PDQ_INDEX = os.getenv("TUNE_PDQ_INDEX", "True") in ["True", "1"]
+
+HMAConfig.initialize(HMA_CONFIG_TABLE)
 
 
 def get_all_bank_hash_rows(
@@ -106,6 +116,26 @@ _ADAPTER_MAPPING: t.Dict[t.Type[SignalType], t.Type[ThreatExchangeS3Adapter]] =
 ALL_INDEXABLE_SIGNAL_TYPES = [PdqSignal, VideoMD5Signal]
 
 
+def build_index(
+    index_class: t.Type[S3BackedInstrumentedIndexMixin],
+    signal_type: t.Type[SignalType],
+    entries: t.Iterable[HashRowT],
+) -> S3BackedInstrumentedIndexMixin:
+    """
+    PDQ indexes find their hot entries at the threshold the matcher will
+    search them with, i.e. the largest custom threshold of the active privacy
+    groups, and unless TUNE_PDQ_INDEX is off, pick the faiss index that is
+    fastest at that threshold.
+    """
+    if issubclass(index_class, PDQIndex):
+        threshold = max(
+            index_class.get_match_threshold(),
+            get_max_threshold_of_active_privacy_groups_for_signal_type(signal_type),
+        )
+        return index_class.build(entries, thresholds=[threshold], tune=TUNE_PDQ_INDEX)
+    return index_class.build(entries)
+
+
 def lambda_handler(event, context):
     """
     Runs on a schedule. On each run, gets all data files for
@@ -156,7 +186,7 @@ def lambda_handler(event, context):
             logger.info(f"Rebuilding {signal_type} Index")
 
             for index_class in INDEX_MAPPING[signal_type]:
-                index: S3BackedInstrumentedIndexMixin = index_class.build(merged_data)
+                index = build_index(index_class, signal_type, merged_data)
 
                 logger.info(
                     f"Putting {signal_type} index in S3 for index {index.get_index_class_name()}"
@@ -15,6 +15,7 @@ from hmalib.common.models.pipeline import MatchRecord
 import typing as t
 
 from threatexchange.signal_type.index import IndexMatch, SignalTypeIndex
+from threatexchange.signal_type.pdq_index import PDQIndex
 from threatexchange.signal_type.signal_base import SignalType
 
 from hmalib import metrics
@@ -51,18 +52,32 @@ class Matcher:
     signal_type. This would take up more RAM than necessary.
 
     Indexes are pulled from S3 on first call for a signal_type.
+
+    A few degenerate PDQ hashes can match much of any query stream, and each
+    match is filtered and written separately, so PDQ matches are capped per
+    hash, and hot entries of the index (see PDQIndex.find_hot_entries) only
+    match when very close.
     """
 
+    # The closest matches kept for each hash
+    MAX_MATCHES_PER_HASH = 100
+    # How close a hash has to be to a hot entry to match it
+    HOT_ENTRY_MATCH_THRESHOLD = 10
+
     def __init__(
         self,
         index_bucket_name: str,
         supported_signal_types: t.List[t.Type[SignalType]],
         banks_table: BanksTable,
+        min_quality: t.Optional[t.Dict[t.Type[SignalType], int]] = None,
     ):
         self.index_bucket_name = index_bucket_name
         self.supported_signal_types = supported_signal_types
         self._cached_indexes: t.Dict[t.Type[SignalType], SignalTypeIndex] = {}
         self.banks_table = banks_table
+        # Overrides of the signal type's own minimum quality, see
+        # SignalType.is_low_quality
+        self.min_quality = min_quality or {}
 
         self.match_filters: t.Sequence[BaseMatchFilter] = [
             ThreatExchangePrivacyGroupMatcherActiveFilter(),
@@ -70,6 +85,19 @@ class Matcher:
             BankActiveFilter(banks_table=banks_table),
         ]
 
+    def is_low_quality(
+        self,
+        signal_type: t.Type[SignalType],
+        signal_specific_attributes: t.Mapping[str, t.Any],
+    ) -> bool:
+        """
+        Whether a hash is too low quality to be worth matching, i.e. a PDQ
+        hash of a mostly flat image, which is close to many unrelated ones.
+        """
+        return signal_type.is_low_quality(
+            signal_specific_attributes, self.min_quality.get(signal_type)
+        )
+
     def match(
         self, signal_type: t.Type[SignalType], signal_value: str
     ) -> t.List[IndexMatch[t.List[BaseIndexMetadata]]]:
@@ -82,7 +110,9 @@ class Matcher:
         index = self.get_index(signal_type)
 
         with metrics.timer(metrics.names.indexer.search_index):
-            match_results: t.List[IndexMatch] = index.query(signal_value)
+            match_results: t.List[IndexMatch] = self._query_many(
+                index, signal_type, [signal_value]
+            )[0]
 
         if not match_results:
             # No matches found in the index
@@ -90,6 +120,76 @@ class Matcher:
 
         return self.filter_match_results(match_results, signal_type)
 
+    def match_many(
+        self, signal_type: t.Type[SignalType], signal_values: t.Sequence[str]
+    ) -> t.List[t.List[IndexMatch[t.List[BaseIndexMetadata]]]]:
+        """
+        Batch version of match(). Searches the index once for all of the
+        signal_values and returns filtered matches for each, in order.
+        """
+        index = self.get_index(signal_type)
+
+        with metrics.timer(metrics.names.indexer.search_index):
+            all_match_results: t.List[t.List[IndexMatch]] = self._query_many(
+                index, signal_type, signal_values
+            )
+
+        return [
+            self.filter_match_results(match_results, signal_type)
+            if match_results
+            else []
+            for match_results in all_match_results
+        ]
+
+    def _query_many(
+        self,
+        index: SignalTypeIndex,
+        signal_type: t.Type[SignalType],
+        signal_values: t.Sequence[str],
+    ) -> t.List[t.List[IndexMatch]]:
+        """
+        Searches index up to the largest custom threshold of the active
+        privacy groups, if that is above the index's own. Matches beyond the
+        threshold of their privacy group are then dropped by
+        ThreatExchangePdqMatchDistanceFilter.
+
+        Only the closest MAX_MATCHES_PER_HASH PDQ matches are kept.
+        """
+        if not isinstance(index, PDQIndex):
+            return index.query_many(signal_values)
+
+        max_custom_threshold = (
+            get_max_threshold_of_active_privacy_groups_for_signal_type(signal_type)
+        )
+        all_match_results = index.query_many(
+            signal_values,
+            threshold=max(max_custom_threshold, index.get_match_threshold()),
+            # One extra, to tell whether any were cut
+            max_matches=self.MAX_MATCHES_PER_HASH + 1,
+            hot_threshold=self.HOT_ENTRY_MATCH_THRESHOLD,
+            # For most_matched, in the warning below
+            count_matches=True,
+        )
+        truncated = []
+        for signal_value, match_results in zip(signal_values, all_match_results):
+            if len(match_results) > self.MAX_MATCHES_PER_HASH:
+                truncated.append(signal_value)
+                del match_results[self.MAX_MATCHES_PER_HASH :]
+        if truncated:
+            # Once per batch, as most_matched has to look at every count
+            logger.warning(
+                "Keeping only the closest %d matches for %d hashes, e.g. %s. Most "
+                "matched hashes in index: %s",
+                self.MAX_MATCHES_PER_HASH,
+                len(truncated),
+                truncated[:3],
+                index.most_matched(5),
+            )
+            metrics.counts.update(
+                {metrics.names.matcher.truncate_matches: len(truncated)}
+            )
+        return all_match_results
+
     def filter_match_results(
         self, results: t.List[IndexMatch], signal_type: t.Type[SignalType]
     ) -> t.List[IndexMatch]:
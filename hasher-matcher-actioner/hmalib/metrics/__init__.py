@@ -105,6 +105,12 @@ class names:
         download_index = f"{_prefix}.download_index"
         get_bank_data = f"{_prefix}.get_bank_data"
 
+    class matcher:
+        _prefix = "matcher"
+
+        skip_low_quality = f"{_prefix}.skip_low_quality"
+        truncate_matches = f"{_prefix}.truncate_matches"
+
 
 _METRICS_NAMESPACE_ENVVAR = "METRICS_NAMESPACE"
 METRICS_NAMESPACE = os.getenv(_METRICS_NAMESPACE_ENVVAR, names.hma_namespace)
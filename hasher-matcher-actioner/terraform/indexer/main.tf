@@ -97,6 +97,7 @@ resource "aws_lambda_function" "indexer" {
       MEASURE_PERFORMANCE              = var.measure_performance ? "True" : "False"
       HMA_CONFIG_TABLE                 = var.config_table.name
       BANKS_TABLE                      = var.banks_datastore.name
+      TUNE_PDQ_INDEX                   = var.tune_pdq_index ? "True" : "False"
     }
   }
   tags = merge(
@@ -167,6 +168,11 @@ data "aws_iam_policy_document" "indexer" {
     actions   = ["dynamodb:GetItem", "dynamodb:Query", "dynamodb:Scan", "dynamodb:PutItem", "dynamodb:UpdateItem"]
     resources = ["${var.banks_datastore.arn}*"]
   }
+  statement {
+    effect    = "Allow"
+    actions   = ["dynamodb:GetItem", "dynamodb:Scan"]
+    resources = [var.config_table.arn]
+  }
   statement {
     effect = "Allow"
     actions = [
@@ -21,6 +21,12 @@ variable "measure_performance" {
   type        = bool
 }
 
+variable "tune_pdq_index" {
+  description = "Pick the faiss index for PDQ by timing candidates when building it. Slows down builds, but can speed up matching."
+  type        = bool
+  default     = true
+}
+
 variable "threat_exchange_data" {
   description = "Configuration information for the S3 Bucket that will hold ThreatExchange Data"
   type = object({
@@ -2,21 +2,36 @@
 # Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
 
 import math
+import os
 import time
 from typing import List
 
-from PIL import Image
+from PIL import Image, JpegImagePlugin
+
+try:
+    import numpy as np
+except ImportError:  # The pure-Python path works without it
+    np = None
 
 from pdqhashing.types.containers import HashAndQuality, HashesAndQuality
+from pdqhashing.types.exceptions import PDQImageSizeException
 from pdqhashing.types.hash256 import Hash256
 from pdqhashing.utils.matrix import MatrixUtil
 
+JPEG_PREFIX = b"\xff\xd8\xff"
+
 
 class PDQHasher:
     """ The only class state is the DCT matrix, so this class may either be
     instantiated once per image, or instantiated once and used for all images;
     the latter will be slightly faster as the DCT matrix will not need to be
-    recomputed once per image. Methods are threadsafe."""
+    recomputed once per image. Methods are threadsafe.
+
+    If numpy is installed, fromFile, fromBufferedImage and dihedralFromFile
+    use the *Numpy methods, which do each stage with array operations rather
+    than per-pixel Python loops. They do the same floating point operations
+    in the same order, so hashes and qualities are bit-identical. Pass
+    useNumpy=False to use the loops regardless."""
 
     #  From Wikipedia: standard RGB to luminance (the 'Y' in 'YUV').
     LUMA_FROM_R_COEFF = float(0.299)
@@ -37,6 +52,15 @@ class PDQHasher:
     #  accumulate data from all 16x16.
     PDQ_JAROSZ_WINDOW_SIZE_DIVISOR = 128
 
+    #  Images are hashed from at most 512x512, and JPEGs larger than twice that
+    #  are decoded at 1/2, 1/4 or 1/8 scale, no smaller than this on each side.
+    #  This is the size thumbnail() decodes at for 512x512 anyway.
+    PDQ_DECODE_MIN_SIZE = 1024
+    #  JPEGs with more pixels than this once decoded are rejected from their
+    #  header, before any pixels are decoded. None for no limit. Other formats
+    #  have PIL's own checks against Image.MAX_IMAGE_PIXELS.
+    PDQ_MAX_IMAGE_PIXELS = Image.MAX_IMAGE_PIXELS
+
     #  Flags for which dihedral-transforms are desired to be produced.
     PDQ_DO_DIH_ORIGINAL = 0x01
     PDQ_DO_DIH_ROTATE_90 = 0x02
@@ -60,14 +84,22 @@ class PDQHasher:
             d[i] = di
         return d
 
-    def __init__(self) -> None:
+    def __init__(self, useNumpy=None) -> None:
         """ Christoph Zauner 'Implementation and Benchmarking of Perceptual
         Image Hash Functions' 2010
 
         See also comments on dct64To16. Input is (0..63)x(0..63); output is
         (1..16)x(1..16) with the latter indexed as (0..15)x(0..15).
-        Returns 16x64 matrix."""
+        Returns 16x64 matrix.
+
+        useNumpy defaults to whether numpy is installed."""
         self.DCT_matrix = self.compute_dct_matrix()
+        if useNumpy is None:
+            useNumpy = np is not None
+        elif useNumpy and np is None:
+            raise ImportError("useNumpy requires numpy")
+        self.useNumpy = useNumpy
+        self.DCT_matrix_np = np.array(self.DCT_matrix) if useNumpy else None
 
     class HashingMetadata:
         def __init__(self) -> None:
@@ -75,27 +107,69 @@ class PDQHasher:
             self.hashSeconds = float(-1.0)
             self.imageHeightTimesWidth = -1
 
+    def openImage(self, fp):
+        """ Opens an image from a filename or file object, reading only its
+        header, and sets up JPEGs to decode at reduced scale down to
+        PDQ_DECODE_MIN_SIZE. Raises PDQImageSizeException if a JPEG would
+        decode to more than PDQ_MAX_IMAGE_PIXELS, before decoding any of it.
+        Image.open checks the full size against Image.MAX_IMAGE_PIXELS, which
+        would reject large JPEGs that are within the limit at reduced scale,
+        so JPEGs are opened directly. """
+        img = self.openJpeg(fp)
+        if img is None:
+            return Image.open(fp)
+        img.draft(None, (self.PDQ_DECODE_MIN_SIZE, self.PDQ_DECODE_MIN_SIZE))
+        numCols, numRows = img.size
+        if (
+            self.PDQ_MAX_IMAGE_PIXELS is not None
+            and numCols * numRows > self.PDQ_MAX_IMAGE_PIXELS
+        ):
+            img.close()
+            raise PDQImageSizeException("Image too large", img.size)
+        return img
+
+    @classmethod
+    def openJpeg(cls, fp):
+        """ fp opened as a JPEG, or None if it isn't one (or is too broken to
+        open, which is left for Image.open to report) """
+        isPath = isinstance(fp, (str, bytes, os.PathLike))
+        if isPath:
+            with open(fp, "rb") as f:
+                prefix = f.read(len(JPEG_PREFIX))
+        else:
+            position = fp.tell()
+            prefix = fp.read(len(JPEG_PREFIX))
+            fp.seek(position)
+        if prefix != JPEG_PREFIX:
+            return None
+        try:
+            return JpegImagePlugin.JpegImageFile(fp)
+        except (SyntaxError, OSError):
+            if not isPath:
+                fp.seek(position)
+            return None
+
     def fromFile(self, filepath, hashingMetadata=None):
         t1 = time.time()
-        img = None
-        try:
-            img = Image.open(filepath)
-            # resizing the image proportionally to max 512px width and max 512px height
-            img.thumbnail((512, 512))
-        except IOError as e:
-            raise e
+        img = self.openImage(filepath)
+        # resizing the image proportionally to max 512px width and max 512px height
+        img.thumbnail((512, 512))
         t2 = time.time()
         readSeconds = t2 - t1
         numCols, numRows = img.size
-        buffer1 = MatrixUtil.allocateMatrixAsRowMajorArray(numRows, numCols)
-        buffer2 = MatrixUtil.allocateMatrixAsRowMajorArray(numRows, numCols)
-        buffer64x64 = MatrixUtil.allocateMatrix(64, 64)
-        buffer16x64 = MatrixUtil.allocateMatrix(16, 64)
-        buffer16x16 = MatrixUtil.allocateMatrix(16, 16)
-        t1 = time.time()
-        rv = self.fromImage(
-            img, buffer1, buffer2, buffer64x64, buffer16x64, buffer16x16
-        )
+        if self.useNumpy:
+            t1 = time.time()
+            rv = self.fromImageNumpy(img)
+        else:
+            buffer1 = MatrixUtil.allocateMatrixAsRowMajorArray(numRows, numCols)
+            buffer2 = MatrixUtil.allocateMatrixAsRowMajorArray(numRows, numCols)
+            buffer64x64 = MatrixUtil.allocateMatrix(64, 64)
+            buffer16x64 = MatrixUtil.allocateMatrix(16, 64)
+            buffer16x16 = MatrixUtil.allocateMatrix(16, 16)
+            t1 = time.time()
+            rv = self.fromImage(
+                img, buffer1, buffer2, buffer64x64, buffer16x64, buffer16x16
+            )
         t2 = time.time()
 
         if hashingMetadata is not None:
@@ -105,12 +179,11 @@ class PDQHasher:
         return rv
 
     def fromBufferedImage(self, img_bytes):
-        try:
-            img = Image.open(img_bytes)
-            # resizing the image proportionally to max 512px width and max 512px height
-            img.thumbnail((512, 512))
-        except IOError as e:
-            raise e
+        img = self.openImage(img_bytes)
+        # resizing the image proportionally to max 512px width and max 512px height
+        img.thumbnail((512, 512))
+        if self.useNumpy:
+            return self.fromImageNumpy(img)
         numCols, numRows = img.size
         buffer1 = MatrixUtil.allocateMatrixAsRowMajorArray(numRows, numCols)
         buffer2 = MatrixUtil.allocateMatrixAsRowMajorArray(numRows, numCols)
@@ -170,15 +243,16 @@ class PDQHasher:
 
     def dihedralFromFile(self, filename, hashingMetadata, dihFlags):
         t1 = time.time()
-        img = None
-        try:
-            img = Image.open(filename)
-        except IOError as e:
-            raise e
+        img = self.openImage(filename)
         t2 = time.time()
         hashingMetadata.readSeconds = t2 - t1
         numCols, numRows = img.size
         hashingMetadata.imageHeightTimesWidth = numRows * numCols
+        if self.useNumpy:
+            t1 = time.time()
+            rv = self.dihedralFromImageNumpy(img, dihFlags)
+            hashingMetadata.hashSeconds = time.time() - t1
+            return rv
         buffer1 = MatrixUtil.allocateMatrixAsRowMajorArray(numRows, numCols)
         buffer2 = MatrixUtil.allocateMatrixAsRowMajorArray(numRows, numCols)
         buffer64x64 = MatrixUtil.allocateMatrix(64, 64)
@@ -294,6 +368,164 @@ class PDQHasher:
             quality,
         )
 
+    def fromImageNumpy(self, img):
+        """ Same as fromImage, with numpy arrays in place of the buffers """
+        buffer64x64 = self.lumaTo64x64Numpy(self.floatLumaFromImageNumpy(img))
+        quality = self.computePDQImageDomainQualityMetricNumpy(buffer64x64)
+        buffer16x16 = self.dct64To16Numpy(buffer64x64)
+        return HashAndQuality(self.pdqBuffer16x16ToBitsNumpy(buffer16x16), quality)
+
+    def dihedralFromImageNumpy(self, img, dihFlags):
+        """ Same as dihedralFromBufferedImage, with numpy arrays in place of
+        the buffers. The dct16OriginalTo* transforms are sign flips of rows,
+        columns or checkerboards of the DCT output, and transposes, so each
+        is a single array operation; see the table above dct16OriginalTo*."""
+        buffer64x64 = self.lumaTo64x64Numpy(self.floatLumaFromImageNumpy(img))
+        quality = self.computePDQImageDomainQualityMetricNumpy(buffer64x64)
+        A = self.dct64To16Numpy(buffer64x64)
+        # -1 for even indices, 1 for odd
+        signs = np.where(np.arange(16) & 1, 1.0, -1.0)
+        rowSigns = signs[:, np.newaxis]
+        checkerboard = rowSigns * signs
+        transforms = [
+            (self.PDQ_DO_DIH_ORIGINAL, lambda: A),
+            (self.PDQ_DO_DIH_ROTATE_90, lambda: (A * signs).T),
+            (self.PDQ_DO_DIH_ROTATE_180, lambda: A * checkerboard),
+            (self.PDQ_DO_DIH_ROTATE_270, lambda: (A * rowSigns).T),
+            (self.PDQ_DO_DIH_FLIPX, lambda: A * rowSigns),
+            (self.PDQ_DO_DIH_FLIPY, lambda: A * signs),
+            (self.PDQ_DO_DIH_FLIP_PLUS1, lambda: A.T),
+            (self.PDQ_DO_DIH_FLIP_MINUS1, lambda: (A * checkerboard).T),
+        ]
+        hashes = [
+            self.pdqBuffer16x16ToBitsNumpy(transform())
+            if (dihFlags & flag) != 0
+            else None
+            for flag, transform in transforms
+        ]
+        return HashesAndQuality(*hashes, quality)
+
+    @classmethod
+    def floatLumaFromImageNumpy(cls, img):
+        """ fillFloatLumaFromBufferImage as a numRows x numCols array """
+        rgb = np.asarray(img.convert("RGB"), dtype=np.float64)
+        return (
+            cls.LUMA_FROM_R_COEFF * rgb[:, :, 0]
+            + cls.LUMA_FROM_G_COEFF * rgb[:, :, 1]
+            + cls.LUMA_FROM_B_COEFF * rgb[:, :, 2]
+        )
+
+    @classmethod
+    def lumaTo64x64Numpy(cls, luma):
+        """ The Jarosz filter and decimation of pdqHash256FromFloatLuma """
+        numRows, numCols = luma.shape
+        luma = cls.jaroszFilterFloatNumpy(
+            luma,
+            cls.computeJaroszFilterWindowSize(numCols),
+            cls.computeJaroszFilterWindowSize(numRows),
+            cls.PDQ_NUM_JAROSZ_XY_PASSES,
+        )
+        return cls.decimateFloatNumpy(luma)
+
+    @classmethod
+    def jaroszFilterFloatNumpy(
+        cls, luma, windowSizeAlongRows, windowSizeAlongCols, nreps
+    ):
+        for _i in range(nreps):
+            luma = cls.box1DFloatNumpy(luma, windowSizeAlongRows)
+            luma = cls.box1DFloatNumpy(luma.T, windowSizeAlongCols).T
+        return luma
+
+    @classmethod
+    def box1DFloatNumpy(cls, in_, fullWindowSize):
+        """ box1DFloat along every row of in_ at once. The loops are over the
+        columns, so each output is the same running sum box1DFloat computes,
+        while a cumsum based filter would round differently. """
+        numRows, vectorLength = in_.shape
+        out = np.empty((numRows, vectorLength))
+        halfWindowSize = int((fullWindowSize + 2) / 2)  # 7->4, 8->5
+        phase_1_nreps = int(halfWindowSize - 1)
+        phase_2_nreps = int(fullWindowSize - halfWindowSize + 1)
+        phase_3_nreps = int(vectorLength - fullWindowSize)
+        phase_4_nreps = int(halfWindowSize - 1)
+        li = 0  # Index of left edge of read window, for subtracts
+        ri = 0  # Index of right edge of read windows, for adds
+        oi = 0  # Index into output vectors
+        sum = np.zeros(numRows)
+        currentWindowSize = 0
+
+        # PHASE 1: ACCUMULATE FIRST SUM NO WRITES
+        for _i in range(phase_1_nreps):
+            sum += in_[:, ri]
+            currentWindowSize += 1
+            ri += 1
+        # PHASE 2: INITIAL WRITES WITH SMALL WINDOW
+        for _i in range(phase_2_nreps):
+            sum += in_[:, ri]
+            currentWindowSize += 1
+            out[:, oi] = sum / currentWindowSize
+            ri += 1
+            oi += 1
+        # PHASE 3: WRITES WITH FULL WINDOW
+        for _i in range(phase_3_nreps):
+            sum += in_[:, ri]
+            sum -= in_[:, li]
+            out[:, oi] = sum / currentWindowSize
+            li += 1
+            ri += 1
+            oi += 1
+        # PHASE 4: FINAL WRITES WITH SMALL WINDOW
+        for _i in range(phase_4_nreps):
+            sum -= in_[:, li]
+            currentWindowSize -= 1
+            out[:, oi] = sum / currentWindowSize
+            li += 1
+            oi += 1
+        return out
+
+    @classmethod
+    def decimateFloatNumpy(cls, in_):
+        inNumRows, inNumCols = in_.shape
+        rows = [int(((i + 0.5) * inNumRows) / 64) for i in range(64)]
+        cols = [int(((j + 0.5) * inNumCols) / 64) for j in range(64)]
+        return in_[np.ix_(rows, cols)]
+
+    @classmethod
+    def computePDQImageDomainQualityMetricNumpy(cls, buffer64x64):
+        """ computePDQImageDomainQualityMetric on a 64x64 array """
+        A = buffer64x64
+        # int() of the float truncates toward zero
+        dRows = np.trunc(((A[:-1, :] - A[1:, :]) * 100) / 255)
+        dCols = np.trunc(((A[:, :-1] - A[:, 1:]) * 100) / 255)
+        gradientSum = int(np.abs(dRows).sum() + np.abs(dCols).sum())
+        quality = int(gradientSum / 90)
+        if quality > 100:
+            quality = 100
+        return quality
+
+    def dct64To16Numpy(self, A):
+        """ dct64To16 on a 64x64 array, returning the 16x16 output.
+
+        A matrix product (D A Dt) would be quicker still, but BLAS sums in
+        its own order, which changes the low bits of the output, and so can
+        flip hash bits of values close to the median. So this accumulates
+        one k at a time for all (i, j) at once, in the order dct64To16
+        does, which gives identical values."""
+        D = self.DCT_matrix_np
+        T = np.zeros((16, 64))
+        for k in range(64):
+            T += D[:, k, np.newaxis] * A[k]
+        B = np.zeros((16, 16))
+        for k in range(64):
+            B += T[:, k, np.newaxis] * D[:, k]
+        return B
+
+    @classmethod
+    def pdqBuffer16x16ToBitsNumpy(cls, dctOutput16x16):
+        """ pdqBuffer16x16ToBits on a 16x16 array """
+        dctMedian = MatrixUtil.torbenArray(dctOutput16x16)
+        return Hash256.fromBits(dctOutput16x16 > dctMedian)
+
     @classmethod
     def decimateFloat(
         cls, in_, inNumRows, inNumCols, out  # numRows x numCols in row-major order
@@ -442,13 +674,8 @@ class PDQHasher:
         Each bit of the 16x16 output hash is for whether the given frequency
         component is greater than the median frequency component or not.
         """
-        hash = Hash256()
-        dctMedian = MatrixUtil.torben(dctOutput16x16, 16, 16)
-        for i in range(16):
-            for j in range(16):
-                if dctOutput16x16[i][j] > dctMedian:
-                    hash.setBit(i * 16 + j)
-        return hash
+        dctMedian = MatrixUtil.torbenArray(dctOutput16x16)
+        return Hash256.fromBits([v > dctMedian for row in dctOutput16x16 for v in row])
 
     @classmethod
     def computeJaroszFilterWindowSize(cls, dimension):
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+from itertools import combinations
+
+from pdqhashing.types.containers import Hash256AndMetadata
+from pdqhashing.types.exceptions import MIHDimensionExceededException
+from pdqhashing.types.hash256 import Hash256
+
+
+def _neighborMasks(slotBits, maxDistance):
+    """ For each slotwise distance s up to maxDistance, all slotBits-bit masks
+    with at most s bits set, fewest bits first. XORing a slot value with each
+    of these gives all its neighbors within s, the same values the C++/Java
+    queryAll0..queryAll3 enumerate. """
+    rv = []
+    masks = []
+    for s in range(maxDistance + 1):
+        for bits in combinations(range(slotBits), s):
+            masks.append(sum(1 << bit for bit in bits))
+        rv.append(list(masks))
+    return rv
+
+
+class MIH256:
+    """ Mutually-indexed hashing for 256-bit hashes, ported from
+    cpp/index/mih.h and the Java MIH256.
+
+    See README-MIH.md in this repo for important information regarding
+    parameter selection and performance.
+
+    Hashes may be given either as Hash256 or as ints packed with
+    Hash256.toPackedInt. Hashes are stored packed, so that verifying a
+    candidate is one xor and one popcount rather than a loop over slots. """
+
+    MIH_MAX_D = 63
+    MIH_MAX_SLOTWISE_D = 3
+
+    SLOT_BITS = 16
+    SLOT_MASK = 0xFFFF
+
+    _NEIGHBOR_MASKS = _neighborMasks(SLOT_BITS, MIH_MAX_SLOTWISE_D)
+
+    def __init__(self) -> None:
+        # 1. Array of all hashes+metadata in the index, and the same hashes
+        #    packed into ints.
+        self._allHashesAndMetadatas = []
+        self._allPackedHashes = []
+
+        # 2. For each slot index i=0..15:
+        #      For each of up to 65,536 possible slot values v at that index:
+        #        List of indices within the arrays above of all hashes
+        #        having slot value v at slot index i.
+        self._slotValuesToIndices = [{} for _ in range(Hash256.HASH256_NUM_SLOTS)]
+
+    def size(self):
+        return len(self._allHashesAndMetadatas)
+
+    def get(self):
+        return self._allHashesAndMetadatas
+
+    @classmethod
+    def _toPacked(cls, hash):
+        if isinstance(hash, Hash256):
+            return hash.toPackedInt()
+        return hash
+
+    @classmethod
+    def _slotwiseDistance(cls, d, caller):
+        # Floor of d/16; see README-MIH.md
+        slotwise_d = d // cls.SLOT_BITS
+        if d < 0 or slotwise_d > cls.MIH_MAX_SLOTWISE_D:
+            raise MIHDimensionExceededException(
+                "PDQ MIH %s: distance threshold %d out of bounds 0..%d. "
+                "Please use linear search." % (caller, d, cls.MIH_MAX_D)
+            )
+        return slotwise_d
+
+    # ---------------------------------------------------------------
+    # BULK HASH INSERTION
+    def insertAll(self, pairs):
+        """ pairs: iterable of Hash256AndMetadata """
+        for pair in pairs:
+            self.insert(pair.hash, pair.metadata)
+
+    # ---------------------------------------------------------------
+    # HASH INSERTION
+    def insert(self, hash, metadata):
+        packed = self._toPacked(hash)
+        if not isinstance(hash, Hash256):
+            hash = Hash256.fromPackedInt(packed)
+        index = len(self._allHashesAndMetadatas)
+
+        for i in range(Hash256.HASH256_NUM_SLOTS):
+            slotValue = (packed >> (self.SLOT_BITS * i)) & self.SLOT_MASK
+            indicesForSlotValue = self._slotValuesToIndices[i]
+            indices = indicesForSlotValue.get(slotValue)
+            if indices is None:
+                indicesForSlotValue[slotValue] = [index]
+            else:
+                indices.append(index)
+
+        self._allHashesAndMetadatas.append(Hash256AndMetadata(hash, metadata))
+        self._allPackedHashes.append(packed)
+
+    # ----------------------------------------------------------------
+    # HASH QUERY FOR ALL MATCHES
+    #
+    # MIH query algorithm:
+    # Given needle hash n
+    # For each slot index i:
+    #   Get slot value v of n at index i
+    #     Find the array indices of hashes in the MIH whose i'th slot value
+    #     is within slotwise distance of v. Do this by finding all the
+    #     nearest-neighbor values w of v and finding the indices of all
+    #     hashes having value w at slot index i.
+    def _candidates(self, packed, slotwise_d):
+        """ Yields lists of candidate indices, slot by slot. Indices may
+        repeat. """
+        masks = self._NEIGHBOR_MASKS[slotwise_d]
+        for i in range(Hash256.HASH256_NUM_SLOTS):
+            slotValue = (packed >> (self.SLOT_BITS * i)) & self.SLOT_MASK
+            indicesForSlotValue = self._slotValuesToIndices[i]
+            if len(indicesForSlotValue) < len(masks):
+                # Sparse slot: cheaper to scan the values present than to
+                # probe every neighbor
+                for value, indices in indicesForSlotValue.items():
+                    if bin(value ^ slotValue).count("1") <= slotwise_d:
+                        yield indices
+            else:
+                for mask in masks:
+                    indices = indicesForSlotValue.get(slotValue ^ mask)
+                    if indices is not None:
+                        yield indices
+
+    def queryAll(self, needle, d):
+        """ Returns a list of Hash256AndMetadata for all hashes in the index
+        within Hamming distance d of the needle. """
+        slotwise_d = self._slotwiseDistance(d, "queryAll")
+        packed = self._toPacked(needle)
+
+        # Find candidates
+        candidates = set()
+        for indices in self._candidates(packed, slotwise_d):
+            candidates.update(indices)
+
+        # Prune candidates
+        allPackedHashes = self._allPackedHashes
+        return [
+            self._allHashesAndMetadatas[index]
+            for index in sorted(candidates)
+            if bin(allPackedHashes[index] ^ packed).count("1") <= d
+        ]
+
+    # ----------------------------------------------------------------
+    # HASH QUERY FOR ANY MATCHES
+    def queryAny(self, needle, d):
+        """ Returns the Hash256AndMetadata of a hash within Hamming distance
+        d of the needle, or None if there is none. """
+        slotwise_d = self._slotwiseDistance(d, "queryAny")
+        packed = self._toPacked(needle)
+
+        allPackedHashes = self._allPackedHashes
+        indicesChecked = set()
+        for indices in self._candidates(packed, slotwise_d):
+            for index in indices:
+                if index in indicesChecked:
+                    continue
+                if bin(allPackedHashes[index] ^ packed).count("1") <= d:
+                    return self._allHashesAndMetadatas[index]
+                indicesChecked.add(index)
+        return None
+
+    # ----------------------------------------------------------------
+    # LINEAR SEARCH
+    def bruteForceQueryAll(self, needle, d):
+        if not isinstance(needle, Hash256):
+            needle = Hash256.fromPackedInt(needle)
+        return [
+            pair
+            for pair in self._allHashesAndMetadatas
+            if pair.hash.hammingDistance(needle) <= d
+        ]
+
+    def bruteForceQueryAny(self, needle, d):
+        if not isinstance(needle, Hash256):
+            needle = Hash256.fromPackedInt(needle)
+        for pair in self._allHashesAndMetadatas:
+            if pair.hash.hammingDistanceLE(needle, d):
+                return pair
+        return None
+
+    # ----------------------------------------------------------------
+    # OPS/REGRESSION ROUTINE
+    def dump(self, o):
+        o.write("ALL HASHES:\n")
+        for pair in self._allHashesAndMetadatas:
+            o.write("%s\n" % pair.hash)
+        o.write("MULTI-INDICES:\n")
+        for i in range(Hash256.HASH256_NUM_SLOTS):
+            o.write("\n")
+            o.write("--------------- slot_index=%d\n" % i)
+            for slotValue, indices in self._slotValuesToIndices[i].items():
+                o.write("slot_value=%04x\n" % slotValue)
+                for index in indices:
+                    o.write("  %d\n" % index)
+        o.flush()
@@ -1,7 +1,9 @@
 # pyre-strict
 # Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
 from pdqhashing.types.exceptions import PDQHashFormatException
-from pdqhashing.types.hash256 import Hash256
+from pdqhashing.types.hash256 import Hash256, np
+from random import Random
+from unittest import mock
 import unittest
 
 class Hash256Test(unittest.TestCase):
@@ -57,6 +59,26 @@ class Hash256Test(unittest.TestCase):
         self.assertEqual(hash1.hammingDistanceLE(hash2, 1), False)
         self.assertEqual(hash1.hammingDistanceLE(hash2, 257), True)
         self.assertEqual(hash1.hammingDistanceLE(hash1, 0), True)
+        self.assertEqual(hash1.hammingDistanceLE(hash1, -1), False)
+
+    def test_hamming_distance_le_stops_early(self) -> None:
+        counted = []
+
+        class CountingHash256(Hash256):
+            @classmethod
+            def hammingNorm16(cls, h):
+                counted.append(h)
+                return super().hammingNorm16(h)
+
+        hash1 = CountingHash256()
+        hash1.setAll()
+        hash2 = Hash256()
+        hash2.clearAll()
+        self.assertEqual(hash1.hammingDistanceLE(hash2, 20), False)
+        # Over 20 after the second word of 16 bits
+        self.assertEqual(len(counted), 2)
+        self.assertEqual(hash1.hammingDistanceLE(hash2, 256), True)
+        self.assertEqual(len(counted), 2 + Hash256.HASH256_NUM_SLOTS)
 
     def test_binary_operations(self) -> None:
         hash = Hash256.fromHexString(self.SAMPLE_HASH)
@@ -71,3 +93,25 @@ class Hash256Test(unittest.TestCase):
 
         self.assertEqual(hash.bitwiseOR(hash_negative), hash_set_all)
         self.assertEqual(hash.bitwiseXOR(hash_negative), hash_set_all)
+
+    def test_to_packed_int(self) -> None:
+        hash = Hash256.fromHexString(self.SAMPLE_HASH)
+        self.assertEqual(hash.toPackedInt(), int(self.SAMPLE_HASH, 16))
+        self.assertEqual(Hash256.fromPackedInt(hash.toPackedInt()), hash)
+
+    def test_from_bits(self) -> None:
+        rng = Random(1234)
+        bits = [rng.random() < 0.5 for _ in range(256)]
+        expected = Hash256()
+        for k, bit in enumerate(bits):
+            if bit:
+                expected.setBit(k)
+        self.assertEqual(Hash256.fromBits(bits), expected)
+        with mock.patch("pdqhashing.types.hash256.np", None):
+            self.assertEqual(Hash256.fromBits(bits), expected)
+        if np is not None:
+            matrix = np.array(bits).reshape(16, 16)
+            self.assertEqual(Hash256.fromBits(matrix), expected)
+            self.assertEqual(
+                Hash256.fromBits(matrix.T), Hash256.fromBits(matrix.T.ravel())
+            )
@@ -1,6 +1,9 @@
 # pyre-strict
 # Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
-from pdqhashing.utils.matrix import MatrixUtil
+from random import Random
+from unittest import mock
+
+from pdqhashing.utils.matrix import MatrixUtil, np
 import unittest
 
 class MatrixTest(unittest.TestCase):
@@ -12,3 +15,18 @@ class MatrixTest(unittest.TestCase):
             for j in range(numCols):
                 matrix[i][j] = i + float((j * 0.01))
         self.assertEqual(MatrixUtil.torben(matrix, numRows, numCols), 1.07)
+
+    def test_torben_array(self) -> None:
+        rng = Random(1234)
+        for numRows, numCols in [(4, 8), (16, 16), (3, 5)]:
+            matrix = MatrixUtil.allocateMatrix(numRows, numCols)
+            for i in range(numRows):
+                for j in range(numCols):
+                    # Few distinct values, so that there are ties
+                    matrix[i][j] = float(rng.randrange(-5, 6))
+            expected = MatrixUtil.torben(matrix, numRows, numCols)
+            self.assertEqual(MatrixUtil.torbenArray(matrix), expected)
+            with mock.patch("pdqhashing.utils.matrix.np", None):
+                self.assertEqual(MatrixUtil.torbenArray(matrix), expected)
+            if np is not None:
+                self.assertEqual(MatrixUtil.torbenArray(np.array(matrix)), expected)
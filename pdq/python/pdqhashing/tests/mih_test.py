@@ -0,0 +1,83 @@
+# pyre-strict
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+from random import Random
+import unittest
+
+from pdqhashing.indexer.mih import MIH256
+from pdqhashing.types.containers import Hash256AndMetadata
+from pdqhashing.types.exceptions import MIHDimensionExceededException
+from pdqhashing.types.hash256 import Hash256
+
+
+class MIH256Test(unittest.TestCase):
+    SAMPLE_HASH = "9c151c3af838278e3ef57c180c7d031c07aefd12f2ccc1e18f2a1e1c7d0ff163"
+
+    def setUp(self) -> None:
+        rng = Random(1234)
+        self.haystack = []
+        for i in range(300):
+            hash = Hash256.fromPackedInt(rng.getrandbits(256))
+            self.haystack.append(Hash256AndMetadata(hash, "random-%d" % i))
+        sample = Hash256.fromHexString(self.SAMPLE_HASH)
+        # Near-duplicates of one hash, at known distances
+        for d in (0, 5, 15, 16, 31, 40, 63, 64, 100):
+            near = sample.clone()
+            for k in range(d):
+                near.flipBit(k * 2)
+            self.haystack.append(Hash256AndMetadata(near, "near-%d" % d))
+        self.needle = sample
+        self.mih = MIH256()
+        self.mih.insertAll(self.haystack)
+
+    def metadatas(self, pairs):
+        return sorted(pair.metadata for pair in pairs)
+
+    def test_size(self) -> None:
+        self.assertEqual(self.mih.size(), len(self.haystack))
+        self.assertEqual(
+            [pair.metadata for pair in self.mih.get()],
+            [pair.metadata for pair in self.haystack],
+        )
+
+    def test_query_all_matches_brute_force(self) -> None:
+        for d in (0, 15, 16, 31, 32, 47, 63):
+            expected = self.metadatas(self.mih.bruteForceQueryAll(self.needle, d))
+            self.assertEqual(
+                self.metadatas(self.mih.queryAll(self.needle, d)), expected
+            )
+        self.assertEqual(
+            self.metadatas(self.mih.queryAll(self.needle, 31)),
+            ["near-0", "near-15", "near-16", "near-31", "near-5"],
+        )
+
+    def test_query_random_needles(self) -> None:
+        rng = Random(42)
+        for pair in self.haystack[:20]:
+            needle = pair.hash.fuzz(rng.randint(0, 40))
+            self.assertEqual(
+                self.metadatas(self.mih.queryAll(needle, 47)),
+                self.metadatas(self.mih.bruteForceQueryAll(needle, 47)),
+            )
+
+    def test_query_any(self) -> None:
+        match = self.mih.queryAny(self.needle, 20)
+        self.assertIn(match.metadata, ("near-0", "near-5", "near-15", "near-16"))
+        self.assertIsNone(self.mih.queryAny(self.needle.bitwiseNOT(), 63))
+        self.assertIsNone(self.mih.bruteForceQueryAny(self.needle.bitwiseNOT(), 63))
+
+    def test_packed_hashes(self) -> None:
+        packed = self.needle.toPackedInt()
+        self.assertEqual(
+            self.metadatas(self.mih.queryAll(packed, 16)),
+            self.metadatas(self.mih.queryAll(self.needle, 16)),
+        )
+        mih = MIH256()
+        mih.insert(packed, "packed")
+        self.assertEqual(mih.get()[0].hash, self.needle)
+        self.assertEqual(self.metadatas(mih.queryAll(self.needle, 0)), ["packed"])
+
+    def test_distance_out_of_bounds(self) -> None:
+        with self.assertRaises(MIHDimensionExceededException):
+            self.mih.queryAll(self.needle, 64)
+        with self.assertRaises(MIHDimensionExceededException):
+            self.mih.queryAny(self.needle, -1)
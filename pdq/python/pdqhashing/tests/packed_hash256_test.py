@@ -0,0 +1,93 @@
+# pyre-strict
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+from pdqhashing.types.exceptions import PDQHashFormatException
+from pdqhashing.types.hash256 import Hash256
+from pdqhashing.types.packed_hash256 import PackedHash256, PackedHash256Array, np
+from random import Random
+from unittest import mock
+import unittest
+
+
+class PackedHash256Test(unittest.TestCase):
+    SAMPLE_HASH = "9c151c3af838278e3ef57c180c7d031c07aefd12f2ccc1e18f2a1e1c7d0ff163"
+
+    def randomHashes(self, n, seed=0):
+        rng = Random(seed)
+        return [PackedHash256(rng.getrandbits(256)) for _ in range(n)]
+
+    def test_conversions(self) -> None:
+        hash = Hash256.fromHexString(self.SAMPLE_HASH)
+        packed = PackedHash256.fromHash256(hash)
+        self.assertEqual(packed.toHexString(), self.SAMPLE_HASH)
+        self.assertEqual(packed.toHash256(), hash)
+        self.assertEqual(PackedHash256.fromHexString(self.SAMPLE_HASH), packed)
+        self.assertEqual(PackedHash256.fromBytes(packed.toBytes()), packed)
+        self.assertEqual(packed.toBytes().hex(), self.SAMPLE_HASH)
+        self.assertEqual(len({packed, PackedHash256.fromHash256(hash)}), 1)
+        with self.assertRaises(PDQHashFormatException):
+            PackedHash256.fromHexString("AAA")
+        with self.assertRaises(PDQHashFormatException):
+            PackedHash256.fromHexString(self.SAMPLE_HASH[:-1] + "!")
+        with self.assertRaises(PDQHashFormatException):
+            PackedHash256(1 << 256)
+
+    def test_hamming_distance(self) -> None:
+        hashes = self.randomHashes(20)
+        for a in hashes:
+            self.assertEqual(a.hammingNorm(), a.toHash256().hammingNorm())
+            for b in hashes:
+                d = a.toHash256().hammingDistance(b.toHash256())
+                self.assertEqual(a.hammingDistance(b), d)
+                for bitCount in (False, True):
+                    with mock.patch(
+                        "pdqhashing.types.packed_hash256.HAS_BIT_COUNT", bitCount
+                    ):
+                        self.assertTrue(a.hammingDistanceLE(b, d))
+                        self.assertFalse(a.hammingDistanceLE(b, d - 1))
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_array(self) -> None:
+        hashes = self.randomHashes(50)
+        # Near duplicates of the first few
+        hashes += [PackedHash256(h.value ^ 0b1011) for h in hashes[:5]]
+        array = PackedHash256Array(hashes)
+        self.assertEqual(len(array), len(hashes))
+        self.assertEqual(list(array), hashes)
+        self.assertEqual(
+            list(PackedHash256Array([str(h) for h in hashes])), list(array)
+        )
+        self.assertEqual(len(PackedHash256Array()), 0)
+        self.assertIsNone(PackedHash256Array().nearest(hashes[0]))
+
+        needle = hashes[2].toHash256()
+        self.assertEqual(
+            array.hammingDistances(needle).tolist(),
+            [h.hammingDistance(hashes[2]) for h in hashes],
+        )
+        self.assertEqual(array.rangeSearch(needle, 3).tolist(), [2, 52])
+        self.assertEqual(array.nearest(needle), (2, 0))
+
+        others = PackedHash256Array(hashes[:7])
+        with mock.patch.object(PackedHash256Array, "BLOCK_BYTES", 100):
+            distances = array.pairwiseDistances(others)
+        self.assertEqual(
+            distances.tolist(),
+            [[a.hammingDistance(b) for b in hashes[:7]] for a in hashes],
+        )
+        i, j = array.pairsWithin(3)
+        pairs = [(a, b) for a, b in zip(i.tolist(), j.tolist()) if a < b]
+        self.assertEqual(pairs, [(k, 50 + k) for k in range(5)])
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_array_from_numpy(self) -> None:
+        hashes = self.randomHashes(3)
+        array = PackedHash256Array(
+            np.array([list(h.toBytes()) for h in hashes], dtype=np.uint8)
+        )
+        self.assertEqual(list(array), hashes)
+        with self.assertRaises(PDQHashFormatException):
+            PackedHash256Array(np.zeros((3, 16), dtype=np.uint8))
+
+
+if __name__ == "__main__":
+    unittest.main()
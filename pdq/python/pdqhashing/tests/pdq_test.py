@@ -1,8 +1,15 @@
 import os
 # Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
 
-from pdqhashing.hasher.pdq_hasher import PDQHasher
+import io
+from random import Random
+
+from PIL import Image, ImageDraw
+
+from pdqhashing.hasher.pdq_hasher import PDQHasher, np
+from pdqhashing.types.exceptions import PDQImageSizeException
 from pdqhashing.types.hash256 import Hash256
+from pdqhashing.utils.matrix import MatrixUtil
 import unittest
 
 SAMPLE_MEDIA = os.path.dirname(__file__) + "/../../../../data/"
@@ -100,3 +107,132 @@ class PdqTest(unittest.TestCase):
             hamming_distance = computed_hash.hammingDistance(expected_hash)
             print(computed_hash, expected_hash, hamming_distance)
             self.assertLessEqual(hamming_distance, hamming_tolerance)
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class PdqNumpyTest(unittest.TestCase):
+    def get_images(self):
+        rng = Random(1234)
+        for width, height in [(64, 64), (130, 97), (301, 515)]:
+            img = Image.new("RGB", (width, height))
+            img.putdata(
+                [
+                    (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+                    for _ in range(width * height)
+                ]
+            )
+            draw = ImageDraw.Draw(img)
+            draw.pieslice((0, 0, width, height), 0, 45, fill=(255, 255, 0))
+            yield img
+        yield Image.new("L", (80, 80), 128)
+
+    def test_same_as_loops(self) -> None:
+        loops = PDQHasher(useNumpy=False)
+        arrays = PDQHasher(useNumpy=True)
+        for img in self.get_images():
+            png = io.BytesIO()
+            img.save(png, "PNG")
+            png.seek(0)
+            expected = loops.fromBufferedImage(png)
+            png.seek(0)
+            actual = arrays.fromBufferedImage(png)
+            self.assertEqual(str(actual.getHash()), str(expected.getHash()))
+            self.assertEqual(actual.getQuality(), expected.getQuality())
+
+    def test_dihedral_same_as_loops(self) -> None:
+        loops = PDQHasher(useNumpy=False)
+        arrays = PDQHasher(useNumpy=True)
+        img = next(self.get_images())
+        numCols, numRows = img.size
+        expected = loops.dihedralFromBufferedImage(
+            img,
+            MatrixUtil.allocateMatrixAsRowMajorArray(numRows, numCols),
+            MatrixUtil.allocateMatrixAsRowMajorArray(numRows, numCols),
+            MatrixUtil.allocateMatrix(64, 64),
+            MatrixUtil.allocateMatrix(16, 64),
+            MatrixUtil.allocateMatrix(16, 16),
+            MatrixUtil.allocateMatrix(16, 16),
+            PDQHasher.PDQ_DO_DIH_ALL,
+        )
+        actual = arrays.dihedralFromImageNumpy(img, PDQHasher.PDQ_DO_DIH_ALL)
+        self.assertEqual(
+            {k: str(v) for k, v in vars(actual).items()},
+            {k: str(v) for k, v in vars(expected).items()},
+        )
+        partial = arrays.dihedralFromImageNumpy(img, PDQHasher.PDQ_DO_DIH_ROTATE_90)
+        self.assertIsNone(partial.hash)
+        self.assertEqual(str(partial.hashRotate90), str(expected.hashRotate90))
+
+
+class PdqOpenImageTest(unittest.TestCase):
+    def jpeg(self, width, height):
+        buffer = io.BytesIO()
+        img = Image.new("RGB", (width, height))
+        ImageDraw.Draw(img).pieslice((0, 0, width, height), 0, 45, fill=(255, 0, 0))
+        img.save(buffer, format="JPEG")
+        buffer.seek(0)
+        return buffer
+
+    def test_reduced_scale_decode(self) -> None:
+        pdq = PDQHasher()
+        # The largest of 1/2, 1/4 and 1/8 leaving both sides at least 1024
+        self.assertEqual(pdq.openImage(self.jpeg(4400, 2100)).size, (2200, 1050))
+        self.assertEqual(pdq.openImage(self.jpeg(900, 3000)).size, (900, 3000))
+        # The same thumbnail as from decoding the whole image, so hashes from
+        # fromFile are unchanged
+        expected = Image.open(self.jpeg(4400, 2100))
+        expected.thumbnail((512, 512))
+        actual = pdq.openImage(self.jpeg(4400, 2100))
+        actual.thumbnail((512, 512))
+        self.assertEqual(actual.tobytes(), expected.tobytes())
+
+    def test_too_large(self) -> None:
+        class SmallPDQHasher(PDQHasher):
+            PDQ_MAX_IMAGE_PIXELS = 1500 * 1050
+
+        pdq = SmallPDQHasher()
+        # Within the limit once decoded at 1/4 scale
+        self.assertEqual(pdq.openImage(self.jpeg(4400, 4400)).size, (1100, 1100))
+        with self.assertRaises(PDQImageSizeException):
+            pdq.fromBufferedImage(self.jpeg(2000, 1000))
+        with self.assertRaises(IOError):
+            pdq.openImage(self.jpeg(2000, 1000))
+
+    def test_over_pil_limit(self) -> None:
+        class SmallPDQHasher(PDQHasher):
+            PDQ_MAX_IMAGE_PIXELS = 1200 * 1200
+
+        pdq = SmallPDQHasher()
+        maxImagePixels = Image.MAX_IMAGE_PIXELS
+        Image.MAX_IMAGE_PIXELS = 1200 * 1200
+        try:
+            # Over twice PIL's limit in full, so Image.open alone raises
+            with self.assertRaises(Image.DecompressionBombError):
+                Image.open(self.jpeg(4400, 4400))
+            # But within it at 1/4 scale
+            self.assertEqual(pdq.openImage(self.jpeg(4400, 4400)).size, (1100, 1100))
+            pdq.fromBufferedImage(self.jpeg(4400, 4400))
+            self.assertEqual(Image.MAX_IMAGE_PIXELS, 1200 * 1200)
+        finally:
+            Image.MAX_IMAGE_PIXELS = maxImagePixels
+
+    def test_other_formats_keep_pil_limits(self) -> None:
+        class SmallPDQHasher(PDQHasher):
+            PDQ_MAX_IMAGE_PIXELS = 1000 * 1000
+
+        pdq = SmallPDQHasher()
+        buffer = io.BytesIO()
+        Image.new("L", (1500, 1500)).save(buffer, format="PNG")
+        maxImagePixels = Image.MAX_IMAGE_PIXELS
+        try:
+            # Only warned about by PIL up to twice its limit, so still hashed
+            Image.MAX_IMAGE_PIXELS = 1500 * 1000
+            buffer.seek(0)
+            with self.assertWarns(Image.DecompressionBombWarning):
+                pdq.fromBufferedImage(buffer)
+            Image.MAX_IMAGE_PIXELS = 1000 * 1000
+            buffer.seek(0)
+            with self.assertRaises(Image.DecompressionBombError):
+                pdq.fromBufferedImage(buffer)
+        finally:
+            Image.MAX_IMAGE_PIXELS = maxImagePixels
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+# isort:skip_file
+
+import argparse
+import os
+import sys
+import time
+from random import Random
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
+
+from pdqhashing.indexer.mih import MIH256
+from pdqhashing.types.hash256 import Hash256
+
+
+class MIHBenchmarkTool:
+    """ Compares MIH256 lookups against brute-force Hash256 comparison, on
+    random haystack hashes and needles at a known distance from them.
+        Example use from within the pdq/python directory:
+        python pdqhashing/tools/mih_benchmark_tool.py -n 100000 -d 16 31"""
+
+    PROGNAME = "MIHBenchmarkTool"
+
+    @classmethod
+    def main(cls, args):
+        parser = argparse.ArgumentParser(
+            prog=cls.PROGNAME,
+            description="Benchmark MIH256 against brute-force linear search.",
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        )
+        parser.add_argument(
+            "-n",
+            "--haystackSize",
+            type=int,
+            default=50000,
+            help="Number of random hashes to index.",
+        )
+        parser.add_argument(
+            "-q",
+            "--numNeedles",
+            type=int,
+            default=100,
+            help="Number of needles to look up.",
+        )
+        parser.add_argument(
+            "-b",
+            "--numBruteForceNeedles",
+            type=int,
+            default=10,
+            help="Number of the needles to also look up by brute force, "
+            + "which is much slower.",
+        )
+        parser.add_argument(
+            "-d",
+            "--distances",
+            type=int,
+            nargs="+",
+            default=[0, 16, 31, 47, 63],
+            help="Distance thresholds to benchmark.",
+        )
+        parser.add_argument("-s", "--seed", type=int, default=0, help="Random seed.")
+        parsedArgs = parser.parse_args(args[1:])
+
+        rng = Random(parsedArgs.seed)
+        haystack = [
+            Hash256.fromPackedInt(rng.getrandbits(256))
+            for _ in range(parsedArgs.haystackSize)
+        ]
+
+        t1 = time.time()
+        mih = MIH256()
+        for i, hash in enumerate(haystack):
+            mih.insert(hash, i)
+        print("build_seconds=%.3e" % (time.time() - t1))
+
+        for d in parsedArgs.distances:
+            needles = []
+            for _ in range(parsedArgs.numNeedles):
+                needle = haystack[rng.randrange(len(haystack))].clone()
+                for bit in rng.sample(range(256), d):
+                    needle.flipBit(bit)
+                needles.append(needle)
+
+            t1 = time.time()
+            mihMatches = [mih.queryAll(needle, d) for needle in needles]
+            mihSeconds = (time.time() - t1) / len(needles)
+
+            bruteForceNeedles = needles[: parsedArgs.numBruteForceNeedles]
+            t1 = time.time()
+            bruteForceMatches = [
+                mih.bruteForceQueryAll(needle, d) for needle in bruteForceNeedles
+            ]
+            bruteForceSeconds = (time.time() - t1) / max(1, len(bruteForceNeedles))
+
+            for mihPairs, bruteForcePairs in zip(mihMatches, bruteForceMatches):
+                assert sorted(p.metadata for p in mihPairs) == sorted(
+                    p.metadata for p in bruteForcePairs
+                ), "MIH and brute force results differ"
+
+            print(
+                "d=%d,mih_seconds_per_query=%.3e,brute_force_seconds_per_query=%.3e,speedup=%.1f"
+                % (d, mihSeconds, bruteForceSeconds, bruteForceSeconds / mihSeconds)
+            )
+
+
+if __name__ == "__main__":
+    MIHBenchmarkTool.main(sys.argv)
@@ -3,8 +3,11 @@
 # isort:skip_file
 
 import argparse
+import collections
 import os
 import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
 
@@ -31,6 +34,17 @@ class PDQPhotoHasherTool:
             self.pdqHashPrev = _pdqHashPrev
             self.hadError = _hadError
 
+    class FileResult:
+        """ The hashes of one file, or the error reading it, as returned from
+        worker processes """
+
+        def __init__(self, filename) -> None:
+            self.filename = filename
+            self.hashingMetadata = PDQHasher.HashingMetadata()
+            self.hashAndQuality = None
+            self.dihedralBag = None
+            self.error = None
+
     @classmethod
     def main(cls, args):
         parser = argparse.ArgumentParser(
@@ -102,91 +116,182 @@ class PDQPhotoHasherTool:
             help="Continue to process next image in case of errors",
         )
 
-        args = parser.parse_args()
+        parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=1,
+            help="Number of processes to hash with; 0 for one per CPU.",
+        )
+
+        parser.add_argument(
+            "--max-in-flight",
+            dest="maxInFlight",
+            type=int,
+            default=0,
+            help="Most files being hashed or waiting to be printed at once, "
+            + "with --jobs; 0 for four per process.",
+        )
+
+        parser.add_argument(
+            "--unordered",
+            dest="inInputOrder",
+            action="store_false",
+            help="With --jobs, print each file's hashes as soon as they are "
+            + "done, rather than in input order.",
+        )
+
+        parser.add_argument(
+            "--stats",
+            dest="doStats",
+            action="store_true",
+            help="Print the number of files and files per second to stderr.",
+        )
+
+        args = parser.parse_args(args[1:])
 
-        pdqHasher = PDQHasher()
         context = cls.Context(0, None, False)
-        # Iterate over image-file names. One file at a time, compute per-file
-        # hash and hamming distance to previous.
         if args.filesOnStdin:
             if args.filenames:
                 parser.print_help()
                 exit(1)
-            try:
-                lno = 0
-                for filename in sys.stdin:
-                    lno += 1
-                    context.numPDQHash += 1
-                    cls.processFile(
-                        pdqHasher,
-                        filename.strip(),
-                        args.doPDQ,
-                        args.doPDQDih,
-                        args.doPDQDihAcross,
-                        args.doDetailedOutput,
-                        args.doTimings,
-                        args.keepGoingAfterErrors,
-                        context,
-                    )
-                    sys.stdout.flush()
-                exit(0)
-            except IOError:
-                sys.stderr.write(
-                    "{}: couldn't read line {} \n".format(cls.PROGNAME, lno)
-                )
-                exit(1)
+            filenames = (line.strip() for line in sys.stdin if line.strip())
+        else:
+            filenames = iter(args.filenames)
 
-        for filename in args.filenames:
-            context.numPDQHash += 1
-            cls.processFile(
-                pdqHasher,
-                filename,
+        numJobs = args.jobs or os.cpu_count() or 1
+        if numJobs == 1:
+            pdqHasher = PDQHasher()
+            results = (
+                cls.hashFile(pdqHasher, filename, args.doPDQ, args.doPDQDih)
+                for filename in filenames
+            )
+        else:
+            results = cls.hashFilesInParallel(
+                filenames,
                 args.doPDQ,
                 args.doPDQDih,
-                args.doPDQDihAcross,
-                args.doDetailedOutput,
-                args.doTimings,
-                args.keepGoingAfterErrors,
-                context,
+                numJobs,
+                args.maxInFlight or 4 * numJobs,
+                args.inInputOrder,
+            )
+
+        # One file at a time, print per-file hashes and hamming distance to
+        # the previous one.
+        numErrors = 0
+        t1 = time.time()
+        try:
+            for result in results:
+                context.numPDQHash += 1
+                cls.printResult(
+                    result,
+                    args.doPDQDihAcross,
+                    args.doDetailedOutput,
+                    args.doTimings,
+                    context,
+                )
+                sys.stdout.flush()
+                if result.error is not None:
+                    numErrors += 1
+                    if not args.keepGoingAfterErrors:
+                        results.close()
+                        exit(1)
+        except IOError:
+            sys.stderr.write(
+                "{}: couldn't read line {} \n".format(
+                    cls.PROGNAME, context.numPDQHash + 1
+                )
+            )
+            exit(1)
+        if args.doStats:
+            seconds = time.time() - t1
+            sys.stderr.write(
+                "files={},errors={},jobs={},seconds={:.3f},files_per_second={:.2f}\n".format(
+                    context.numPDQHash,
+                    numErrors,
+                    numJobs,
+                    seconds,
+                    context.numPDQHash / max(seconds, 1e-9),
+                )
             )
-            sys.stdout.flush()
         if context.hadError:
             exit(1)
 
     @classmethod
-    def processFile(
-        cls,
-        pdqHasher,
-        filename,
-        doPDQHash,
-        doPDQDih,
-        doPDQDihAcross,
-        doDetailedOutput,
-        doTimings,
-        keepGoingAfterErrors,
-        context,
+    def hashFile(cls, pdqHasher, filename, doPDQHash, doPDQDih):
+        """ Hashes one file, returning a FileResult with any error reading it
+        rather than raising it """
+        result = cls.FileResult(filename)
+        try:
+            if doPDQHash:
+                result.hashAndQuality = pdqHasher.fromFile(
+                    filename, result.hashingMetadata
+                )
+            if doPDQDih:
+                result.dihedralBag = pdqHasher.dihedralFromFile(
+                    filename, result.hashingMetadata, PDQHasher.PDQ_DO_DIH_ALL
+                )
+        except IOError as e:
+            result.error = str(e)
+        return result
+
+    # The PDQHasher of each worker process of hashFilesInParallel
+    workerHasher = None
+
+    @classmethod
+    def initWorker(cls):
+        cls.workerHasher = PDQHasher()
+
+    @classmethod
+    def hashFileInWorker(cls, filename, doPDQHash, doPDQDih):
+        return cls.hashFile(cls.workerHasher, filename, doPDQHash, doPDQDih)
+
+    @classmethod
+    def hashFilesInParallel(
+        cls, filenames, doPDQHash, doPDQDih, numJobs, maxInFlight, inInputOrder
     ):
-        hash = None
-        hashAndQuality = None
-        dihedralBag = None
-        quality = int()
-        norm = int()
-        delta = int()
-        hashingMetadata = PDQHasher.HashingMetadata()
-        if doPDQHash:
+        """ Yields a FileResult for each of filenames, hashed by numJobs
+        processes, in input order or else as they are done. filenames are
+        only read as fast as they are hashed, so that at most maxInFlight
+        files are queued, hashing, or done but waiting to be yielded, however
+        many there are in all. """
+        pending = collections.deque()
+        with ProcessPoolExecutor(numJobs, initializer=cls.initWorker) as executor:
             try:
-                hashAndQuality = pdqHasher.fromFile(filename, hashingMetadata)
-            except IOError as e:
-                context.hadError = True
-                sys.stderr.write(
-                    "{}: could not read image file {}, Error {}\n".format(
-                        cls.PROGNAME, filename, e
+                for filename in filenames:
+                    while len(pending) >= maxInFlight:
+                        yield cls.nextDone(pending, inInputOrder)
+                    pending.append(
+                        executor.submit(
+                            cls.hashFileInWorker, filename, doPDQHash, doPDQDih
+                        )
                     )
-                )
-                if keepGoingAfterErrors:
-                    return
-                else:
-                    exit(1)
+                while pending:
+                    yield cls.nextDone(pending, inInputOrder)
+            finally:
+                # e.g. on stopping after an error, don't hash the rest
+                for future in pending:
+                    future.cancel()
+
+    @classmethod
+    def nextDone(cls, pending, inInputOrder):
+        """ Removes from pending the first future, or else the first to be
+        done, and returns its result """
+        if inInputOrder:
+            return pending.popleft().result()
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in pending:
+            if future in done:
+                pending.remove(future)
+                return future.result()
+
+    @classmethod
+    def printResult(cls, result, doPDQDihAcross, doDetailedOutput, doTimings, context):
+        filename = result.filename
+        hashingMetadata = result.hashingMetadata
+        hashAndQuality = result.hashAndQuality
+        dihedralBag = result.dihedralBag
+        if hashAndQuality is not None:
             hash = hashAndQuality.getHash()
             quality = hashAndQuality.getQuality()
             norm = hash.hammingNorm()
@@ -211,20 +316,7 @@ class PDQPhotoHasherTool:
                 output += ",filename={}".format(filename)
                 print(output)
             context.pdqHashPrev = hash
-        if doPDQDih:
-            try:
-                dihedralBag = pdqHasher.dihedralFromFile(
-                    filename, hashingMetadata, PDQHasher.PDQ_DO_DIH_ALL
-                )
-            except IOError as e:
-                context.hadError = True
-                sys.stderr.write(
-                    "%s: could not read image file %s.\n".format(cls.PROGNAME, filename)
-                )
-                if keepGoingAfterErrors:
-                    return
-                else:
-                    exit(1)
+        if dihedralBag is not None:
             if not doDetailedOutput:
                 if doPDQDihAcross:
                     print(
@@ -339,6 +431,13 @@ class PDQPhotoHasherTool:
                         )
                     )
             context.pdqHashPrev = dihedralBag.hash.clone()
+        if result.error is not None:
+            context.hadError = True
+            sys.stderr.write(
+                "{}: could not read image file {}, Error {}\n".format(
+                    cls.PROGNAME, filename, result.error
+                )
+            )
 
 
 if __name__ == "__main__":
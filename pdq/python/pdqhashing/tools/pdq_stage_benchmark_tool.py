@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+# isort:skip_file
+
+import argparse
+import os
+import sys
+import time
+from random import Random
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
+
+from PIL import Image
+
+from pdqhashing.hasher.pdq_hasher import PDQHasher, np
+from pdqhashing.types.hash256 import Hash256
+from pdqhashing.utils.matrix import MatrixUtil
+
+
+class PDQStageBenchmarkTool:
+    """ Times each stage of PDQHasher, with the pure-Python loops and with
+    numpy, on image files or a random image.
+        Example use from within the pdq/python directory:
+        python pdqhashing/tools/pdq_stage_benchmark_tool.py ../data/misc-images/b.jpg"""
+
+    PROGNAME = "PDQStageBenchmarkTool"
+
+    @classmethod
+    def main(cls, args):
+        parser = argparse.ArgumentParser(
+            prog=cls.PROGNAME,
+            description="Time each stage of PDQ hashing, with loops and numpy.",
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        )
+        parser.add_argument(
+            "filenames",
+            nargs="*",
+            type=str,
+            help="Images to hash, instead of a random one.",
+        )
+        parser.add_argument(
+            "--size",
+            type=int,
+            default=512,
+            help="Width and height of the random image.",
+        )
+        parser.add_argument(
+            "-r",
+            "--repetitions",
+            type=int,
+            default=3,
+            help="Times each stage is run per image; the fastest is reported.",
+        )
+        parser.add_argument("-s", "--seed", type=int, default=0, help="Random seed.")
+        parsedArgs = parser.parse_args(args[1:])
+        if np is None:
+            sys.stderr.write("%s: numpy is not installed\n" % cls.PROGNAME)
+            sys.exit(1)
+
+        images = []
+        for filename in parsedArgs.filenames:
+            img = Image.open(filename)
+            img.thumbnail((512, 512))
+            images.append(img)
+        if not images:
+            rng = Random(parsedArgs.seed)
+            img = Image.new("RGB", (parsedArgs.size, parsedArgs.size))
+            img.putdata(
+                [
+                    (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+                    for _ in range(parsedArgs.size * parsedArgs.size)
+                ]
+            )
+            images.append(img)
+
+        totals = {}
+        for img in images:
+            for stage, loopsSeconds, numpySeconds in cls.timeStages(
+                img, parsedArgs.repetitions
+            ):
+                total = totals.setdefault(stage, [0.0, 0.0])
+                total[0] += loopsSeconds
+                total[1] += numpySeconds
+
+        for stage, (loopsSeconds, numpySeconds) in totals.items():
+            print(
+                "stage=%s,loops_seconds=%.3e,numpy_seconds=%.3e,speedup=%.1f"
+                % (
+                    stage,
+                    loopsSeconds / len(images),
+                    numpySeconds / len(images),
+                    loopsSeconds / max(numpySeconds, 1e-9),
+                )
+            )
+
+    @classmethod
+    def timeStages(cls, img, repetitions):
+        """ Yields (stage, loops seconds, numpy seconds) for each stage of
+        hashing img, each the fastest of repetitions runs. The numpy stages
+        are checked to give the same results as the loops. """
+        pdq = PDQHasher(useNumpy=True)
+        numCols, numRows = img.size
+        buffer1 = MatrixUtil.allocateMatrixAsRowMajorArray(numRows, numCols)
+        buffer2 = MatrixUtil.allocateMatrixAsRowMajorArray(numRows, numCols)
+        buffer64x64 = MatrixUtil.allocateMatrix(64, 64)
+        buffer16x64 = MatrixUtil.allocateMatrix(16, 64)
+        buffer16x16 = MatrixUtil.allocateMatrix(16, 16)
+        windowSizeAlongRows = pdq.computeJaroszFilterWindowSize(numCols)
+        windowSizeAlongCols = pdq.computeJaroszFilterWindowSize(numRows)
+
+        def fastest(f):
+            best = None
+            for _ in range(repetitions):
+                t1 = time.time()
+                rv = f()
+                seconds = time.time() - t1
+                if best is None or seconds < best:
+                    best = seconds
+            return rv, best
+
+        def jaroszLoops():
+            # The filter works in place, so start from the luma each time
+            buffer1[:] = luma
+            pdq.jaroszFilterFloat(
+                buffer1,
+                buffer2,
+                numRows,
+                numCols,
+                windowSizeAlongRows,
+                windowSizeAlongCols,
+                pdq.PDQ_NUM_JAROSZ_XY_PASSES,
+            )
+
+        def bitsLoops():
+            hash = Hash256()
+            for i in range(16):
+                for j in range(16):
+                    if buffer16x16[i][j] > dctMedian:
+                        hash.setBit(i * 16 + j)
+            return hash
+
+        _, loops = fastest(lambda: pdq.fillFloatLumaFromBufferImage(img, buffer1))
+        lumaNp, numpy = fastest(lambda: pdq.floatLumaFromImageNumpy(img))
+        luma = list(buffer1)
+        assert lumaNp.ravel().tolist() == luma
+        yield "luma", loops, numpy
+
+        _, loops = fastest(jaroszLoops)
+        filteredNp, numpy = fastest(
+            lambda: pdq.jaroszFilterFloatNumpy(
+                lumaNp,
+                windowSizeAlongRows,
+                windowSizeAlongCols,
+                pdq.PDQ_NUM_JAROSZ_XY_PASSES,
+            )
+        )
+        assert filteredNp.ravel().tolist() == buffer1
+        yield "jarosz", loops, numpy
+
+        _, loops = fastest(
+            lambda: pdq.decimateFloat(buffer1, numRows, numCols, buffer64x64)
+        )
+        decimatedNp, numpy = fastest(lambda: pdq.decimateFloatNumpy(filteredNp))
+        assert decimatedNp.tolist() == buffer64x64
+        yield "decimate", loops, numpy
+
+        quality, loops = fastest(
+            lambda: pdq.computePDQImageDomainQualityMetric(buffer64x64)
+        )
+        qualityNp, numpy = fastest(
+            lambda: pdq.computePDQImageDomainQualityMetricNumpy(decimatedNp)
+        )
+        assert qualityNp == quality
+        yield "quality", loops, numpy
+
+        _, loops = fastest(lambda: pdq.dct64To16(buffer64x64, buffer16x64, buffer16x16))
+        dctNp, numpy = fastest(lambda: pdq.dct64To16Numpy(decimatedNp))
+        assert dctNp.tolist() == buffer16x16
+        yield "dct", loops, numpy
+
+        dctMedian, loops = fastest(lambda: MatrixUtil.torben(buffer16x16, 16, 16))
+        medianNp, numpy = fastest(lambda: MatrixUtil.torbenArray(dctNp))
+        assert medianNp == dctMedian
+        yield "median", loops, numpy
+
+        hash, loops = fastest(bitsLoops)
+        hashNp, numpy = fastest(lambda: Hash256.fromBits(dctNp > medianNp))
+        assert hashNp == hash
+        yield "bits", loops, numpy
+
+
+if __name__ == "__main__":
+    PDQStageBenchmarkTool.main(sys.argv)
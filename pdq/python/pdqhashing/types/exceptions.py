@@ -5,3 +5,20 @@ class PDQHashFormatException(Exception):
     def __init__(self, error_message, unacceptableInput=None) -> None:
         super(PDQHashFormatException, self).__init__(error_message)
         self._unacceptableInput = unacceptableInput
+
+
+class PDQImageSizeException(IOError):
+    """ An IOError, so that it is handled like images that can't be read """
+
+    def __init__(self, error_message, size=None) -> None:
+        super(PDQImageSizeException, self).__init__(error_message)
+        self._size = size
+
+
+class MIHDimensionExceededException(Exception):
+    def __init__(self, error_message) -> None:
+        super(MIHDimensionExceededException, self).__init__(error_message)
+        self._errorMessage = error_message
+
+    def getErrorMessage(self):
+        return self._errorMessage
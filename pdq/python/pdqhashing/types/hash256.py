@@ -3,6 +3,11 @@
 
 from random import randint
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from pdqhashing.types.exceptions import PDQHashFormatException
 
 
@@ -84,30 +89,57 @@ class Hash256:
         for i in range(self.HASH256_NUM_SLOTS):
             self.w[i] = 0xFFFF
 
+    def toPackedInt(self):
+        """ All 16 slots packed into a single 256-bit int, so that distances
+        are one xor and one popcount instead of a loop over the slots. """
+        x = 0
+        for word in reversed(self.w):
+            x = (x << 16) | (word & 0xFFFF)
+        return x
+
+    @classmethod
+    def fromPackedInt(cls, x):
+        """ Inverse of toPackedInt """
+        rv = Hash256()
+        for i in range(cls.HASH256_NUM_SLOTS):
+            rv.w[i] = (x >> (16 * i)) & 0xFFFF
+        return rv
+
+    @classmethod
+    def fromBits(cls, bits):
+        """ The hash with bit k set for each true bits[k], as if by setBit(k)
+        for each of them. bits are 256 truth values in a sequence, or in a
+        numpy array of any shape (i.e. a 16x16 matrix in row-major order),
+        which are packed into words in one operation. """
+        if np is None:
+            x = 0
+            for k, bit in enumerate(bits):
+                if bit:
+                    x |= 1 << k
+            return cls.fromPackedInt(x)
+        rows = np.asarray(bits, dtype=bool).reshape(cls.HASH256_NUM_SLOTS, 16)
+        # Bit j of each row is bit j of its word, as little-endian uint16
+        packed = np.packbits(rows, axis=1, bitorder="little")
+        words = np.ascontiguousarray(packed).view("<u2")
+        rv = Hash256()
+        rv.w = words.ravel().tolist()
+        return rv
+
     def hammingNorm(self):
-        n = 0
-        i = 0
-        while i < self.HASH256_NUM_SLOTS:
-            n += self.hammingNorm16(self.w[i])
-            i += 1
-        return n
+        return bin(self.toPackedInt()).count("1")
 
     def hammingDistance(self, that):
-        n = 0
-        i = 0
-        while i < self.HASH256_NUM_SLOTS:
-            n += self.hammingNorm16(int((self.w[i] ^ that.w[i])))
-            i += 1
-        return n
+        return bin(self.toPackedInt() ^ that.toPackedInt()).count("1")
 
     def hammingDistanceLE(self, that, d) -> bool:
+        """ Word by word, stopping as soon as the distance is over d, so
+        hashes far apart cost only a few words. For the exact distance,
+        hammingDistance is faster. """
         e = 0
-        i = 0
-        while i < self.HASH256_NUM_SLOTS:
-            e += self.hammingNorm16(int((self.w[i] ^ that.w[i])))
+        for i in range(self.HASH256_NUM_SLOTS):
+            e += self.hammingNorm16(self.w[i] ^ that.w[i])
             if e > d:
                 return False
-            i += 1
         return True
 
     def setBit(self, k):
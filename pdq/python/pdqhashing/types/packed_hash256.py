@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from pdqhashing.types.exceptions import PDQHashFormatException
+from pdqhashing.types.hash256 import Hash256
+
+# int.bit_count is new in Python 3.10
+HAS_BIT_COUNT = hasattr(int, "bit_count")
+
+if HAS_BIT_COUNT:
+
+    def popcount(x):
+        return x.bit_count()
+
+
+else:
+
+    def popcount(x):
+        return bin(x).count("1")
+
+
+_MASK64 = (1 << 64) - 1
+
+# Bits set in each byte, for numpy before np.bitwise_count
+_POPCOUNT8 = None
+if np is not None:
+    _POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class PackedHash256:
+    """ Immutable 256-bit hash held in a single int, with bit k of the int
+    being bit k of the equivalent Hash256. Distances are one xor and one
+    popcount, with no per-word loop and nothing allocated but the xor; it is
+    hashable, so it can be used as a dict key or in a set. """
+
+    __slots__ = ("value",)
+
+    HASH256_NUM_BYTES = 32
+
+    def __init__(self, value=0) -> None:
+        if not 0 <= value < (1 << 256):
+            raise PDQHashFormatException("Not a 256-bit value", value)
+        self.value = value
+
+    @classmethod
+    def fromHash256(cls, hash):
+        return cls(hash.toPackedInt())
+
+    def toHash256(self):
+        return Hash256.fromPackedInt(self.value)
+
+    @classmethod
+    def fromHexString(cls, s):
+        if len(s) != Hash256.HASH256_HEX_NUM_NYBBLES:
+            raise PDQHashFormatException("Incorrect length", s)
+        try:
+            return cls(int(s, 16))
+        except ValueError:
+            raise PDQHashFormatException("Incorrect format", s)
+
+    def toHexString(self):
+        return "%064x" % self.value
+
+    @classmethod
+    def fromBytes(cls, b):
+        """ From 32 bytes, most significant first, as in the hex string """
+        if len(b) != cls.HASH256_NUM_BYTES:
+            raise PDQHashFormatException("Incorrect length", b)
+        return cls(int.from_bytes(b, "big"))
+
+    def toBytes(self):
+        return self.value.to_bytes(self.HASH256_NUM_BYTES, "big")
+
+    def hammingNorm(self):
+        return popcount(self.value)
+
+    def hammingDistance(self, that):
+        return popcount(self.value ^ that.value)
+
+    def hammingDistanceLE(self, that, d) -> bool:
+        x = self.value ^ that.value
+        if HAS_BIT_COUNT:
+            return x.bit_count() <= d
+        # Without a native popcount, stop counting 64 bits at a time as soon
+        # as the distance is known to be over d
+        total = 0
+        while x:
+            total += bin(x & _MASK64).count("1")
+            if total > d:
+                return False
+            x >>= 64
+        return total <= d
+
+    def __str__(self):
+        return self.toHexString()
+
+    def __repr__(self):
+        return "PackedHash256(%s)" % self.toHexString()
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, PackedHash256) and self.value == other.value
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __lt__(self, other) -> bool:
+        return self.value < other.value
+
+
+class PackedHash256Array:
+    """ Many 256-bit hashes packed into a numpy uint8 array of shape (n, 32),
+    in the byte order of PackedHash256.toBytes, for comparing a needle against
+    all of them, or all of them against all of another array, in bulk.
+    Requires numpy. """
+
+    # Most bytes of xor'ed hashes held at once by pairwiseDistances
+    BLOCK_BYTES = 1 << 24
+
+    def __init__(self, hashes=()) -> None:
+        """ hashes: Hash256, PackedHash256, ints or hex strings, or an existing
+        uint8 array of shape (n, 32) """
+        if np is None:
+            raise ImportError("PackedHash256Array requires numpy")
+        if isinstance(hashes, np.ndarray):
+            if hashes.dtype != np.uint8 or hashes.shape[1:] != (32,):
+                raise PDQHashFormatException("Not a uint8 (n, 32) array", hashes.shape)
+            self.bytes = hashes
+            return
+        packed = [self._toPacked(h).toBytes() for h in hashes]
+        self.bytes = np.frombuffer(b"".join(packed), dtype=np.uint8).reshape(
+            len(packed), PackedHash256.HASH256_NUM_BYTES
+        )
+
+    @classmethod
+    def _toPacked(cls, hash):
+        if isinstance(hash, PackedHash256):
+            return hash
+        if isinstance(hash, Hash256):
+            return PackedHash256.fromHash256(hash)
+        if isinstance(hash, str):
+            return PackedHash256.fromHexString(hash)
+        return PackedHash256(hash)
+
+    def __len__(self):
+        return len(self.bytes)
+
+    def __getitem__(self, i):
+        return PackedHash256.fromBytes(self.bytes[i].tobytes())
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @classmethod
+    def popcountRows(cls, x):
+        """ The number of bits set in each row of a uint8 array """
+        if hasattr(np, "bitwise_count"):
+            return np.bitwise_count(x).sum(axis=-1, dtype=np.int32)
+        return _POPCOUNT8[x].sum(axis=-1, dtype=np.int32)
+
+    def hammingDistances(self, needle):
+        """ The distance from needle to each hash, as an int32 array """
+        row = np.frombuffer(self._toPacked(needle).toBytes(), dtype=np.uint8)
+        return self.popcountRows(self.bytes ^ row)
+
+    def rangeSearch(self, needle, d):
+        """ Indices of the hashes within distance d of needle, in order """
+        return np.flatnonzero(self.hammingDistances(needle) <= d)
+
+    def nearest(self, needle):
+        """ (index, distance) of the hash closest to needle, the first of
+        them on ties, or None if there are no hashes """
+        if not len(self):
+            return None
+        distances = self.hammingDistances(needle)
+        i = int(np.argmin(distances))
+        return i, int(distances[i])
+
+    def pairwiseDistances(self, that=None):
+        """ Distances from each hash to each hash of that (or of self) as an
+        int32 array of shape (len(self), len(that)). Worked out in blocks of
+        rows, so memory beyond the result stays within BLOCK_BYTES. """
+        if that is None:
+            that = self
+        rv = np.empty((len(self), len(that)), dtype=np.int32)
+        rowsPerBlock = max(1, self.BLOCK_BYTES // max(1, that.bytes.size))
+        for start in range(0, len(self), rowsPerBlock):
+            block = self.bytes[start : start + rowsPerBlock]
+            rv[start : start + len(block)] = self.popcountRows(
+                block[:, None, :] ^ that.bytes[None, :, :]
+            )
+        return rv
+
+    def pairsWithin(self, d, that=None):
+        """ (i, j) index arrays of each pair of self[i] and that[j] (or
+        self[j]) within distance d of each other """
+        return np.nonzero(self.pairwiseDistances(that) <= d)
@@ -1,6 +1,11 @@
 #!/usr/bin/env python
 # Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 class MatrixUtil:
     @classmethod
@@ -68,3 +73,17 @@ class MatrixUtil:
             return guess
         else:
             return mingtguess
+
+    @classmethod
+    def torbenArray(cls, m):
+        """ The same value as torben: the ((n + 1) / 2)th smallest of the n
+        values in m, when torben's passes end. But selected with one partial
+        sort (numpy.partition, or sorted() without numpy) instead of repeated
+        Python passes over m. m is a numpy array of any shape, or a list of
+        rows. """
+        if np is None:
+            values = sorted(v for row in m for v in row)
+            return values[int((len(values) + 1) / 2) - 1]
+        values = np.asarray(m, dtype=np.float64).ravel()
+        midn = int((values.size + 1) / 2)
+        return float(np.partition(values, midn - 1)[midn - 1])
@@ -0,0 +1,127 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+import argparse
+import binascii
+import time
+
+import numpy
+
+from threatexchange.hashing import pdq_hamming
+from threatexchange.hashing.pdq_utils import (
+    BITS_IN_PDQ,
+    hex_to_binary_str,
+    simple_distance,
+    simple_distance_binary,
+)
+
+parser = argparse.ArgumentParser(
+    description="Run basic benchmarks comparing PDQ hamming distance implementations",
+    formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+)
+
+parser.add_argument(
+    "--num-pairs",
+    type=int,
+    default=1_000_000,
+    help="number of hash pairs to compare",
+)
+parser.add_argument(
+    "--binary-str-sample-size",
+    type=int,
+    default=10_000,
+    help=(
+        "number of pairs to time with the old binary string comparison, which "
+        "is extrapolated to --num-pairs since it is too slow to run in full"
+    ),
+)
+parser.add_argument("--seed", type=int, help="seed for random number generator")
+
+args = parser.parse_args()
+
+######
+# Print Benchmark Settings
+######
+
+print("Benchmark: PDQ Hamming Distance Comparison")
+print("")
+print("Options:")
+for arg in vars(args):
+    print("\t", arg, ": ", getattr(args, arg))
+print("")
+
+######
+# Set up environment and helpers
+######
+
+seed = args.seed if args.seed else time.time_ns()
+rng = numpy.random.default_rng(seed)
+if args.seed is None:
+    print("using random seed of ", seed)
+    print("use --seed ", seed, " to rerun with same random values")
+    print("")
+
+
+def generate_random_hashes(n):
+    """
+    returns n random 256 bit PDQ hashes as hexstrings of 64 characters
+    """
+    hex_str = binascii.hexlify(rng.bytes(n * BITS_IN_PDQ // 8)).decode()
+    return [hex_str[i : i + 64] for i in range(0, len(hex_str), 64)]
+
+
+left = generate_random_hashes(args.num_pairs)
+right = generate_random_hashes(args.num_pairs)
+
+######
+# Run benchmarks
+######
+
+sample = min(args.binary_str_sample_size, args.num_pairs)
+start = time.time()
+binary_str_distances = [
+    simple_distance_binary(hex_to_binary_str(a), hex_to_binary_str(b))
+    for a, b in zip(left[:sample], right[:sample])
+]
+binary_str_time = (time.time() - start) * args.num_pairs / sample
+
+start = time.time()
+int_distances = [simple_distance(a, b) for a, b in zip(left, right)]
+int_time = time.time() - start
+
+start = time.time()
+packed_left = pdq_hamming.hashes_to_packed(left)
+packed_right = pdq_hamming.hashes_to_packed(right)
+pack_time = time.time() - start
+
+start = time.time()
+numpy_distances = pdq_hamming.pairwise_distances(packed_left, packed_right)
+numpy_time = time.time() - start
+
+matrix_side = int(args.num_pairs**0.5)
+start = time.time()
+matrix = pdq_hamming.distance_matrix(
+    packed_left[:matrix_side], packed_right[:matrix_side]
+)
+matrix_time = time.time() - start
+
+assert binary_str_distances == int_distances[:sample]
+assert int_distances == numpy_distances.tolist()
+assert matrix[0, 0] == int_distances[0]
+
+print(f"Time for {args.num_pairs:,d} pair comparisons:")
+print("\tbinary string (old simple_distance, extrapolated) (s): ", binary_str_time)
+print("\tpacked int (simple_distance) (s): ", int_time)
+print("\tnumpy pack hex hashes (s): ", pack_time)
+print("\tnumpy pairwise_distances (s): ", numpy_time)
+print(
+    f"\tnumpy distance_matrix {matrix_side:,d}x{matrix_side:,d} (s): ",
+    matrix_time,
+)
+print("")
+print("Speedup over binary string comparison:")
+print("\tpacked int: ", binary_str_time / int_time)
+print("\tnumpy pairwise_distances: ", binary_str_time / numpy_time)
+print(
+    "\tnumpy pairwise_distances incl. packing: ",
+    binary_str_time / (numpy_time + pack_time),
+)
@@ -12,11 +12,12 @@ import faiss
 from threatexchange.hashing import (
     PDQFlatHashIndex,
     PDQMultiHashIndex,
+    PDQNumpyHashIndex,
     BITS_IN_PDQ,
 )
 
 parser = argparse.ArgumentParser(
-    description="Run basic benchmarks comparing PDQHashIndex implementations using faiss",
+    description="Run basic benchmarks comparing PDQHashIndex implementations using faiss, and the numpy-only PDQNumpyHashIndex",
     formatter_class=argparse.ArgumentDefaultsHelpFormatter,
 )
 
@@ -38,6 +39,15 @@ parser.add_argument(
     default=1000,
     help="number of queries to generate for each search",
 )
+parser.add_argument(
+    "--numpy-num-queries",
+    type=int,
+    default=100,
+    help=(
+        "number of the queries to also search with PDQNumpyHashIndex, which is "
+        "exhaustive and much slower, so defaults to a subset (0 to skip)"
+    ),
+)
 parser.add_argument(
     "--thresholds",
     type=int,
@@ -145,6 +155,20 @@ print(
 print(
     f"\tPDQMultiHashIndex: approximate size: {len(serialized_multi_index) // 1024:,d}KB"
 )
+
+if args.numpy_num_queries:
+    start_build_numpy_hash_index = time.time()
+    numpy_index = PDQNumpyHashIndex()
+    numpy_index.add(dataset, custom_ids=custom_ids)
+    serialized_numpy_index = pickle.dumps(numpy_index)
+    end_build_numpy_hash_index = time.time()
+    print(
+        "\tPDQNumpyHashIndex: time to build (s): ",
+        end_build_numpy_hash_index - start_build_numpy_hash_index,
+    )
+    print(
+        f"\tPDQNumpyHashIndex: approximate size: {len(serialized_numpy_index) // 1024:,d}KB"
+    )
 print("")
 
 ######
@@ -169,6 +193,12 @@ for threshold in args.thresholds:
     multi_results = multi_index.search(queries, threshold)
     end_multi_search = time.time()
 
+    numpy_queries = queries[: args.numpy_num_queries]
+    start_numpy_search = time.time()
+    if numpy_queries:
+        numpy_results = numpy_index.search(numpy_queries, threshold)
+    end_numpy_search = time.time()
+
     def count_targets_found(targets, queries, results):
         """
         Checks that each element of the provided search results list contains
@@ -203,6 +233,19 @@ for threshold in args.thresholds:
         "\tPDQMultiHashIndex - Total Time to search  (s): ",
         end_multi_search - start_multi_search,
     )
+    if numpy_queries:
+        print(
+            f"\tPDQNumpyHashIndex - Total Time to search {len(numpy_queries)} queries (s): ",
+            end_numpy_search - start_numpy_search,
+        )
+        print(
+            "\tPDQFlatHashIndex - Queries per second: ",
+            len(queries) / (end_flat_search - start_flat_search),
+        )
+        print(
+            "\tPDQNumpyHashIndex - Queries per second: ",
+            len(numpy_queries) / (end_numpy_search - start_numpy_search),
+        )
     print(
         "\tPDQFlatHashIndex - Precent of targets found: ",
         flat_found_targets / len(queries) * 100,
@@ -211,5 +254,13 @@ for threshold in args.thresholds:
         "\tPDQMultiHashIndex - Precent of targets found: ",
         multi_found_targets / len(queries) * 100,
     )
+    if numpy_queries:
+        numpy_found_targets = count_targets_found(
+            search_targets, numpy_queries, numpy_results
+        )
+        print(
+            "\tPDQNumpyHashIndex - Precent of targets found: ",
+            numpy_found_targets / len(numpy_queries) * 100,
+        )
 
     print("")
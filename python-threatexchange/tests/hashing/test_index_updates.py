@@ -1,11 +1,12 @@
 # Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
 
+import io
 import unittest
 import typing as t
 
 from threatexchange.signal_type.signal_base import TrivialSignalTypeIndex
 from threatexchange.signal_type.index import SignalTypeIndex
-from threatexchange.signal_type.pdq_index import PDQIndex
+from threatexchange.signal_type.pdq_index import PDQIndex, PDQFlatIndex, PDQNumpyIndex
 
 
 class TestIndexUpdates(unittest.TestCase):
@@ -33,6 +34,27 @@ class TestIndexUpdates(unittest.TestCase):
         self.assertEqual(len(index.query(self.get_first_set()[0][0])), 1)
         self.assertEqual(len(index.query(self.get_second_set()[0][0])), 1)
 
+    def test_index_removes_actually_remove_from_the_index(self):
+        index = self.get_index(list(self.get_first_set()) + list(self.get_second_set()))
+        first_hash = self.get_first_set()[0][0]
+        second_hash, second_meta = self.get_second_set()[0]
+
+        self.assertEqual(index.remove(first_hash), 1)
+        self.assertEqual(len(index.query(first_hash)), 0)
+        self.assertEqual(index.remove(first_hash), 0)
+
+        self.assertEqual(index.remove(second_hash, {"meta_data": 13}), 0)
+        self.assertEqual(len(index.query(second_hash)), 1)
+        self.assertEqual(index.remove(second_hash, second_meta), 1)
+        self.assertEqual(len(index.query(second_hash)), 0)
+
+        index.add(first_hash, {"meta_data": 13})
+        self.assertEqual(
+            [m.metadata for m in index.query(first_hash)], [{"meta_data": 13}]
+        )
+        # Other entries are unaffected
+        self.assertEqual(len(index.query(self.get_first_set()[1][0])), 1)
+
 
 class TestTrivialTypeIndexUpdates(TestIndexUpdates):
     __test__ = True
@@ -188,3 +210,98 @@ class TestPdqIndexUpdates(TestIndexUpdates):
                 {"meta_data": 12},
             ),
         ]
+
+
+class TestPdqFlatIndexUpdates(TestPdqIndexUpdates):
+    def get_index(
+        self, initial_set: t.Iterable[t.Tuple[str, t.Any]]
+    ) -> SignalTypeIndex:
+        return PDQFlatIndex.build(initial_set)
+
+
+class TestPdqIndexCompaction(unittest.TestCase):
+    def check_compaction(self, index_cls: t.Type[PDQIndex]) -> None:
+        entries = TestPdqIndexUpdates().get_first_set()
+        index = index_cls.build(entries)
+        index.COMPACTION_MIN_TOMBSTONES = 3
+
+        self.assertEqual(index.remove_all((h, None) for h, _ in entries[:2]), 2)
+        self.assertEqual(len(index), len(entries) - 2)
+        # Not enough tombstones yet to be worth compacting
+        self.assertEqual(len(index._tombstones), 2)
+
+        self.assertEqual(index.remove(entries[2][0]), 1)
+        self.assertEqual(len(index._tombstones), 0)
+        self.assertEqual(len(index.index.search(entries[0][0:1], 0)[0]), 0)
+        for h, _ in entries[:3]:
+            self.assertEqual(index.query(h), [])
+        for h, _ in entries[3:]:
+            self.assertEqual(len(index.query(h)), 1)
+
+        # Ids keep counting up after compaction
+        index.add(entries[0][0], "readded")
+        self.assertEqual([m.metadata for m in index.query(entries[0][0])], ["readded"])
+        self.assertEqual(len(index), len(entries) - 2)
+
+    def test_multi_hash_compaction(self):
+        self.check_compaction(PDQIndex)
+
+    def test_flat_compaction(self):
+        self.check_compaction(PDQFlatIndex)
+
+
+class TestPdqIndexDeduplication(unittest.TestCase):
+    def check_deduplication(self, index_cls: t.Type[PDQIndex]) -> None:
+        entries = TestPdqIndexUpdates().get_first_set()
+        shared = entries[0][0]
+        index = index_cls.build(entries + [(shared, "a"), (shared, "b")])
+        self.assertEqual(len(index), len(entries) + 2)
+        self.assertEqual(len(index.index.search([shared], 0, return_as_ids=True)[0]), 1)
+
+        def metadata(hash):
+            return sorted(str(m.metadata) for m in index.query(hash))
+
+        self.assertEqual(metadata(shared), sorted([str(entries[0][1]), "a", "b"]))
+        index.add(shared, "c")
+        self.assertEqual(len(index.index.search([shared], 0, return_as_ids=True)[0]), 1)
+        self.assertEqual(len(index.query(shared)), 4)
+
+        # The vector stays until its last entry is removed
+        self.assertEqual(index.remove(shared, entries[0][1]), 1)
+        self.assertEqual(metadata(shared), ["a", "b", "c"])
+        self.assertEqual(index.remove(shared), 3)
+        self.assertEqual(index.query(shared), [])
+        self.assertEqual(len(index._tombstones), 1)
+        index.add(shared, "d")
+        self.assertEqual(len(index._tombstones), 0)
+        self.assertEqual(metadata(shared), ["d"])
+
+        index.add(shared, "e")
+        buffer = io.BytesIO()
+        index.serialize(buffer)
+        buffer.seek(0)
+        loaded = index_cls.deserialize(buffer)
+        self.assertEqual(
+            sorted(str(m.metadata) for m in loaded.query(shared)), ["d", "e"]
+        )
+        self.assertEqual(len(loaded), len(index))
+
+    def test_multi_hash_deduplication(self):
+        self.check_deduplication(PDQIndex)
+
+    def test_flat_deduplication(self):
+        self.check_deduplication(PDQFlatIndex)
+
+    def test_numpy_deduplication(self):
+        self.check_deduplication(PDQNumpyIndex)
+
+
+class TestTrivialTypeIndexQueryMany(unittest.TestCase):
+    def test_query_many_matches_query(self):
+        entries = TestTrivialTypeIndexUpdates().get_first_set()
+        index = TrivialSignalTypeIndex.build(entries)
+        queries = [entries[0][0], "not a hash", entries[0][0], entries[3][0]]
+        self.assertEqual(
+            [[m.metadata for m in r] for r in index.query_many(queries)],
+            [[m.metadata for m in index.query(q)] for q in queries],
+        )
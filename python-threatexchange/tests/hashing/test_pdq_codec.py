@@ -0,0 +1,66 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+import binascii
+import unittest
+
+import numpy
+
+from threatexchange.hashing.pdq_codec import (
+    as_vectors,
+    hashes_to_vectors,
+    vectors_to_hashes,
+)
+from threatexchange.hashing.pdq_faiss_matcher import PDQFlatHashIndex
+
+test_hashes = [
+    "0000000000000000000000000000000000000000000000000000000000000000",
+    "000000000000000000000000000000000000000000000000000000000000ffff",
+    "acecf3355e3125c8e24e2f30e0d4ec4f8482b878b3c34cdbdf063278db275992",
+]
+
+
+class TestPDQCodec(unittest.TestCase):
+    def test_roundtrip(self):
+        vectors = hashes_to_vectors(test_hashes)
+        self.assertEqual(vectors.shape, (len(test_hashes), 32))
+        self.assertEqual(vectors.dtype, numpy.uint8)
+        self.assertTrue(vectors.flags.c_contiguous)
+        self.assertEqual(vectors_to_hashes(vectors), test_hashes)
+
+    def test_matches_per_hash_decode(self):
+        vectors = hashes_to_vectors(iter(test_hashes))
+        for h, v in zip(test_hashes, vectors):
+            self.assertEqual(binascii.unhexlify(h), v.tobytes())
+
+    def test_hex_bytes_input(self):
+        vectors = hashes_to_vectors([h.encode() for h in test_hashes])
+        self.assertEqual(vectors_to_hashes(vectors), test_hashes)
+
+    def test_empty(self):
+        self.assertEqual(hashes_to_vectors([]).shape, (0, 32))
+
+    def test_bad_input(self):
+        with self.assertRaises(ValueError):
+            hashes_to_vectors(["abc"])
+        with self.assertRaises(ValueError):
+            hashes_to_vectors(["zz" * 32])
+        with self.assertRaises(ValueError):
+            as_vectors(b"\x00" * 31)
+
+    def test_as_vectors(self):
+        vectors = hashes_to_vectors(test_hashes)
+        self.assertIs(as_vectors(vectors), vectors)
+        numpy.testing.assert_array_equal(as_vectors(vectors.tobytes()), vectors)
+        numpy.testing.assert_array_equal(as_vectors(test_hashes[2]), vectors[2:])
+        numpy.testing.assert_array_equal(
+            as_vectors(vectors.view(numpy.uint64)), vectors
+        )
+
+    def test_index_accepts_vectors(self):
+        vectors = hashes_to_vectors(test_hashes)
+        index = PDQFlatHashIndex()
+        index.add(vectors, range(len(test_hashes)))
+        self.assertEqual(index.hash_at(2), test_hashes[2])
+        self.assertEqual(
+            index.search(vectors[1:2].tobytes(), 16, return_as_ids=True), [[0, 1]]
+        )
@@ -0,0 +1,63 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+import concurrent.futures
+import unittest
+
+import numpy
+
+from threatexchange.hashing.pdq_codec import vectors_to_hashes
+from threatexchange.hashing.pdq_faiss_matcher import (
+    PDQFlatHashIndex,
+    PDQMultiHashIndex,
+    PDQParallelSearcher,
+)
+
+
+def random_hashes_and_queries(n, seed=42):
+    rng = numpy.random.default_rng(seed)
+    dataset = rng.integers(0, 256, size=(n, 32), dtype=numpy.uint8)
+    # Flip the low bit of a few bytes to get near (but not exact) queries
+    queries = dataset.copy()
+    queries[:, :5] ^= 1
+    return vectors_to_hashes(dataset), vectors_to_hashes(queries)
+
+
+class TestConcurrentMultiHashSearch(unittest.TestCase):
+    def setUp(self):
+        self.dataset, self.queries = random_hashes_and_queries(500)
+        self.index = PDQMultiHashIndex()
+        self.index.add(self.dataset, range(len(self.dataset)))
+
+    def test_concurrent_searches_with_different_thresholds(self):
+        thresholds = [0, 4, 16, 31]
+        expected = {
+            t: self.index.search(self.queries, t, return_as_ids=True)
+            for t in thresholds
+        }
+
+        def run(threshold):
+            return threshold, self.index.search(
+                self.queries, threshold, return_as_ids=True
+            )
+
+        with concurrent.futures.ThreadPoolExecutor(8) as pool:
+            for threshold, result in pool.map(run, thresholds * 4):
+                self.assertEqual(
+                    [sorted(r) for r in result],
+                    [sorted(r) for r in expected[threshold]],
+                )
+        self.assertEqual(self.index._nflip_gate._active, 0)
+
+    def test_parallel_searcher_matches_serial(self):
+        for index in (self.index, PDQFlatHashIndex()):
+            if index is not self.index:
+                index.add(self.dataset, range(len(self.dataset)))
+            with PDQParallelSearcher(index, num_threads=4, min_shard_size=100) as s:
+                self.assertEqual(
+                    s.search(self.queries, 16, return_as_ids=True),
+                    index.search(self.queries, 16, return_as_ids=True),
+                )
+                self.assertEqual(
+                    s.search_with_distance_in_result(self.queries[:300], 5),
+                    index.search_with_distance_in_result(self.queries[:300], 5),
+                )
@@ -3,6 +3,8 @@
 import unittest
 import binascii
 import pickle
+import random
+import faiss
 import numpy
 
 from threatexchange.hashing.pdq_faiss_matcher import PDQFlatHashIndex, PDQMultiHashIndex
@@ -71,6 +73,27 @@ class MixinTests:
             result = self.index.search(query, 0)
             self.assertEqualPDQHashSearchResults(result, [[], [], [test_hashes[-1]]])
 
+        def test_search_topk(self):
+            results = self.index.search_topk(test_hashes[:1], 2, max_distance=16)
+            self.assertEqual(results.hashes_for(0), test_hashes[:2])
+            self.assertEqual(results.distances_for(0).tolist(), [0, 16])
+
+            results = self.index.search_topk(
+                [test_hashes[0], "a" * 64], 10, max_distance=128
+            )
+            self.assertEqual(results.distances_for(0).tolist(), [0, 16, 128, 128])
+            self.assertCountEqual(results.hashes_for(0), test_hashes[:-1])
+            # 128 bits away from all of them
+            self.assertEqual(results.distances_for(1).tolist(), [128] * 5)
+            results = self.index.search_topk(["a" * 64], 10, max_distance=127)
+            self.assertEqual(results.hashes_for(0), [])
+
+        def test_search_topk_without_max_distance(self):
+            # One bit off in every 16 bit slot, so no slot matches exactly
+            results = self.index.search_topk(["0001" * 16], 2)
+            self.assertEqual(results.hashes_for(0), test_hashes[:2])
+            self.assertEqual(results.distances_for(0).tolist(), [16, 30])
+
         def test_supports_pickling(self):
             pickled_data = pickle.dumps(self.index)
             assert (
@@ -110,6 +133,31 @@ class TestPDQFlatHashIndex(MixinTests.PDQHashIndexCommonTests, unittest.TestCase
         results = self.index.search(query, 16, return_as_ids=True)
         self.assertEqualPDQHashSearchResults(results, [[0, 1], [0, 1]])
 
+    def test_load_power_of_two_sizes(self):
+        for n in (1, 2, 4, 8):
+            index = PDQMultiHashIndex()
+            index.add(test_hashes[:1] * n, range(n))
+            for loaded in (
+                pickle.loads(pickle.dumps(index)),
+                PDQMultiHashIndex.from_buffer(index.serialize_to_buffer()),
+            ):
+                self.assertEqualPDQHashSearchResults(
+                    loaded.search(test_hashes[:1], 0, return_as_ids=True),
+                    [list(range(n))],
+                )
+
+    def test_load_keeps_healthy_tables_mapped(self):
+        rng = random.Random(0)
+        hashes = ["%064x" % rng.getrandbits(256) for _ in range(64)]
+        index = PDQMultiHashIndex()
+        index.add(hashes, range(len(hashes)))
+        loaded = PDQMultiHashIndex.from_buffer(index.serialize_to_buffer())
+        if hasattr(faiss, "ZeroCopyIOReader"):
+            self.assertIsNotNone(loaded._mapped_buffer)
+        self.assertEqualPDQHashSearchResults(
+            loaded.search(hashes[-1:], 0, return_as_ids=True), [[len(hashes) - 1]]
+        )
+
 
 class TestPDQFlatHashIndexWithCustomIds(
     MixinTests.PDQHashIndexCommonTests, unittest.TestCase
@@ -159,6 +207,42 @@ class TestPDQMultiHashIndex(MixinTests.PDQHashIndexCommonTests, unittest.TestCas
         results = self.index.search(query, 16, return_as_ids=True)
         self.assertEqualPDQHashSearchResults(results, [[0, 1], [0, 1]])
 
+    def test_range_search_either_side_of_flat_scan_crossover(self):
+        rng = numpy.random.default_rng(0)
+        vectors = rng.integers(0, 256, (500, 32), dtype=numpy.uint8)
+        flat = PDQFlatHashIndex()
+        flat.add(vectors, range(len(vectors)))
+        index = PDQMultiHashIndex()
+        index.add(vectors, range(len(vectors)))
+        crossover = (index.MAX_NFLIP + 1) * index.mih_index.nhash
+        # Nearby, so that there is something to find at every threshold
+        queries = vectors[:20] ^ (rng.random((20, 32)) < 0.15).astype(numpy.uint8)
+        for threshold in (crossover - 1, crossover, 52, 128):
+            with self.subTest(threshold=threshold):
+                expected = flat.search(queries, threshold, return_as_ids=True)
+                self.assertEqualPDQHashSearchResults(
+                    index.search(queries, threshold, return_as_ids=True), expected
+                )
+
+    def test_search_topk_either_side_of_flat_scan_crossover(self):
+        rng = numpy.random.default_rng(1)
+        vectors = rng.integers(0, 256, (500, 32), dtype=numpy.uint8)
+        flat = PDQFlatHashIndex()
+        flat.add(vectors, range(len(vectors)))
+        index = PDQMultiHashIndex()
+        index.add(vectors, range(len(vectors)))
+        crossover = (index.MAX_NFLIP + 1) * index.mih_index.nhash
+        queries = vectors[:20] ^ (rng.random((20, 32)) < 0.15).astype(numpy.uint8)
+        for max_distance in (crossover - 1, crossover, 255, None):
+            with self.subTest(max_distance=max_distance):
+                expected = flat.search_topk(queries, 5, max_distance)
+                results = index.search_topk(queries, 5, max_distance)
+                self.assertEqual(
+                    results.distances.tolist(), expected.distances.tolist()
+                )
+                # Never probes more than MAX_NFLIP bits per hashmap
+                self.assertLessEqual(index.mih_index.nflip, index.MAX_NFLIP)
+
 
 class TestPDQMultiHashIndexWithCustomIds(
     MixinTests.PDQHashIndexCommonTests, unittest.TestCase
@@ -0,0 +1,58 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+import unittest
+
+import numpy
+
+from threatexchange.hashing import pdq_hamming
+from threatexchange.hashing.pdq_utils import BITS_IN_PDQ, simple_distance
+
+test_hashes = [
+    "0000000000000000000000000000000000000000000000000000000000000000",
+    "000000000000000000000000000000000000000000000000000000000000ffff",
+    "0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f",
+    "f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0",
+    "ffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff",
+    "acecf3355e3125c8e24e2f30e0d4ec4f8482b878b3c34cdbdf063278db275992",
+]
+
+
+class TestPDQHamming(unittest.TestCase):
+    def setUp(self):
+        self.packed = pdq_hamming.hashes_to_packed(test_hashes)
+
+    def test_pack_roundtrip(self):
+        self.assertEqual(self.packed.shape, (len(test_hashes), 4))
+        self.assertEqual(self.packed.dtype, numpy.uint64)
+        self.assertEqual(pdq_hamming.packed_to_hashes(self.packed), test_hashes)
+
+    def test_pack_rejects_bad_length(self):
+        with self.assertRaises(ValueError):
+            pdq_hamming.hashes_to_packed(["abcd"])
+
+    def test_as_packed(self):
+        numpy.testing.assert_array_equal(
+            pdq_hamming.as_packed(test_hashes[1]), self.packed[1:2]
+        )
+        self.assertIs(pdq_hamming.as_packed(self.packed).base, self.packed.base)
+
+    def test_distance(self):
+        self.assertEqual(pdq_hamming.distance(self.packed[0], self.packed[1]), 16)
+        self.assertEqual(
+            pdq_hamming.distance(self.packed[0], self.packed[4]), BITS_IN_PDQ
+        )
+
+    def test_one_to_many_and_matrix_match_simple_distance(self):
+        matrix = pdq_hamming.distance_matrix(self.packed, self.packed, block_pairs=4)
+        for i, a in enumerate(test_hashes):
+            one_to_many = pdq_hamming.distances_one_to_many(self.packed[i], self.packed)
+            for j, b in enumerate(test_hashes):
+                self.assertEqual(matrix[i, j], simple_distance(a, b))
+                self.assertEqual(one_to_many[j], simple_distance(a, b))
+
+    def test_pairwise_distances(self):
+        reversed_packed = self.packed[::-1].copy()
+        self.assertEqual(
+            pdq_hamming.pairwise_distances(self.packed, reversed_packed).tolist(),
+            [simple_distance(a, b) for a, b in zip(test_hashes, test_hashes[::-1])],
+        )
@@ -1,11 +1,16 @@
 # Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
 
 import base64
+import io
 import pathlib
 import tempfile
 import unittest
+from unittest import mock
+
+from PIL import Image, ImageDraw, UnidentifiedImageError
 
 from threatexchange.hashing import pdq_hasher
+from threatexchange.hashing.pdq_utils import DIHEDRAL_TRANSFORMS, simple_distance
 
 RANDOM_IMAGE_BASE64 = """iVBORw0KGgoAAAANSUhEUgAAABoAAAAcCAYAAAB/E6/TAAABQGlDQ1BJQ0MgUHJvZmlsZQAAKJFj
 YGASSCwoyGFhYGDIzSspCnJ3UoiIjFJgf8rAzMDDwMGgziCUmFxc4BgQ4ANUwgCjUcG3awyMIPqy
@@ -63,3 +68,83 @@ class PDQHasherModuleUnitTest(unittest.TestCase):
         bytes_ = base64.b64decode(RANDOM_IMAGE_BASE64)
         pdq_hash = pdq_hasher.pdq_from_bytes(bytes_)[0]
         assert pdq_hash == RANDOM_IMAGE_PDQ
+
+    def test_pdq_dihedral_from_bytes(self):
+        bytes_ = base64.b64decode(RANDOM_IMAGE_BASE64)
+        hashes, quality = pdq_hasher.pdq_dihedral_from_bytes(bytes_)
+        self.assertEqual(len(hashes), len(DIHEDRAL_TRANSFORMS))
+        self.assertEqual(hashes[0], RANDOM_IMAGE_PDQ)
+        self.assertEqual(quality, pdq_hasher.pdq_from_bytes(bytes_)[1])
+
+        image = Image.open(io.BytesIO(bytes_)).convert("RGB")
+        for transform, transpose in (
+            ("rotate90", Image.Transpose.ROTATE_90),
+            ("flip_plus1", Image.Transpose.TRANSPOSE),
+        ):
+            buffer = io.BytesIO()
+            image.transpose(transpose).save(buffer, format="PNG")
+            transformed = pdq_hasher.pdq_from_bytes(buffer.getvalue())[0]
+            expected = hashes[DIHEDRAL_TRANSFORMS.index(transform)]
+            # Up to rounding at the edges of the downsampled image
+            self.assertLessEqual(simple_distance(transformed, expected), 10)
+
+    def test_reduced_scale_decode(self):
+        image = Image.new("RGB", (4400, 3300))
+        ImageDraw.Draw(image).pieslice((0, 0, 4400, 3300), 0, 45, fill=(255, 0, 0))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG")
+        bytes_ = buffer.getvalue()
+
+        with mock.patch.object(Image.Image, "draft") as draft:
+            draft.return_value = None
+            full = pdq_hasher.pdq_from_bytes(bytes_)
+        reduced = pdq_hasher.pdq_from_bytes(bytes_)
+        self.assertEqual(reduced[1], full[1])
+        self.assertLessEqual(simple_distance(reduced[0], full[0]), 2)
+        with tempfile.NamedTemporaryFile("w+b", suffix=".jpg") as f:
+            f.write(bytes_)
+            f.flush()
+            self.assertEqual(pdq_hasher.pdq_from_file(pathlib.Path(f.name)), reduced)
+
+        # Decoded at 1/2 scale, so within a limit of 2200x1650 pixels
+        with mock.patch.object(pdq_hasher, "MAX_DECODED_PIXELS", 2200 * 1650):
+            self.assertEqual(pdq_hasher.pdq_from_bytes(bytes_), reduced)
+        with mock.patch.object(pdq_hasher, "MAX_DECODED_PIXELS", 2200 * 1650 - 1):
+            with self.assertRaises(Image.DecompressionBombError):
+                pdq_hasher.pdq_from_bytes(bytes_)
+
+    def test_over_pil_limit(self):
+        image = Image.new("L", (4400, 4400))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG")
+        bytes_ = buffer.getvalue()
+        limit = 1200 * 1200
+        # Over twice PIL's limit in full, so Image.open alone raises
+        with mock.patch.object(Image, "MAX_IMAGE_PIXELS", limit):
+            with self.assertRaises(Image.DecompressionBombError):
+                Image.open(io.BytesIO(bytes_))
+            # But within it at 1/4 scale
+            with mock.patch.object(pdq_hasher, "MAX_DECODED_PIXELS", limit):
+                self.assertEqual(
+                    pdq_hasher._open_image(io.BytesIO(bytes_)).size, (1100, 1100)
+                )
+                pdq_hasher.pdq_from_bytes(bytes_)
+            self.assertEqual(Image.MAX_IMAGE_PIXELS, limit)
+
+    def test_other_formats_keep_pil_limits(self):
+        image = Image.new("L", (1500, 1500))
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        bytes_ = buffer.getvalue()
+        with mock.patch.object(pdq_hasher, "MAX_DECODED_PIXELS", 1000 * 1000):
+            # Only warned about by PIL up to twice its limit, so still hashed
+            with mock.patch.object(Image, "MAX_IMAGE_PIXELS", 1500 * 1000):
+                with self.assertWarns(Image.DecompressionBombWarning):
+                    pdq_hasher.pdq_from_bytes(bytes_)
+            with mock.patch.object(Image, "MAX_IMAGE_PIXELS", 1000 * 1000):
+                with self.assertRaises(Image.DecompressionBombError):
+                    pdq_hasher.pdq_from_bytes(bytes_)
+
+    def test_broken_jpeg(self):
+        with self.assertRaises(UnidentifiedImageError):
+            pdq_hasher.pdq_from_bytes(b"\xff\xd8\xff not really a jpeg")
@@ -0,0 +1,79 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+import pickle
+import unittest
+
+import numpy
+
+from threatexchange.hashing.pdq_id_map import IdPositionMap
+from threatexchange.hashing.pdq_faiss_matcher import PDQMultiHashIndex
+
+test_hashes = [
+    "0000000000000000000000000000000000000000000000000000000000000000",
+    "000000000000000000000000000000000000000000000000000000000000ffff",
+    "0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f",
+    "f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0",
+    "ffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff",
+]
+
+
+class TestIdPositionMap(unittest.TestCase):
+    def test_identity_ids_store_nothing(self):
+        id_map = IdPositionMap.from_ids(numpy.arange(3))
+        id_map.extend(numpy.arange(3, 5))
+        self.assertTrue(id_map.is_identity)
+        self.assertEqual(len(id_map), 5)
+        self.assertEqual(id_map.position_of(4), 4)
+        with self.assertRaises(KeyError):
+            id_map.position_of(5)
+
+    def test_extend_with_custom_ids(self):
+        id_map = IdPositionMap.from_ids(numpy.arange(2))
+        id_map.extend(numpy.array([100, -7, 50]))
+        id_map.extend(numpy.array([75]))
+        self.assertFalse(id_map.is_identity)
+        self.assertEqual(
+            id_map.lookup(numpy.array([0, 1, 100, -7, 50, 75])).tolist(),
+            [0, 1, 2, 3, 4, 5],
+        )
+        with self.assertRaises(KeyError):
+            id_map.lookup(numpy.array([2]))
+        with self.assertRaises(KeyError):
+            id_map.position_of(1000)
+
+    def test_many_small_extends(self):
+        rng = numpy.random.default_rng(0)
+        ids = rng.permutation(10_000).astype(numpy.int64) * 3 - 7
+        id_map = IdPositionMap()
+        for i in range(0, len(ids), 7):
+            id_map.extend(ids[i : i + 7])
+            self.assertEqual(id_map.position_of(ids[i]), i)
+        # Merged into few runs, rather than one per extend
+        self.assertLessEqual(len(id_map.runs), 15)
+        self.assertEqual(id_map.lookup(ids).tolist(), list(range(len(ids))))
+
+    def test_duplicate_ids_find_first(self):
+        id_map = IdPositionMap.from_ids(numpy.array([5, 6]))
+        for _ in range(4):
+            id_map.extend(numpy.array([5]))
+        self.assertEqual(id_map.position_of(5), 0)
+
+    def test_pickle(self):
+        id_map = IdPositionMap.from_ids(numpy.array([9, 3, 4]))
+        reloaded = pickle.loads(pickle.dumps(id_map))
+        self.assertEqual(reloaded.position_of(3), 1)
+
+
+class TestPDQMultiHashIndexIncrementalAdd(unittest.TestCase):
+    def test_repeated_small_adds(self):
+        custom_ids = [2**63 + i for i in range(len(test_hashes))]
+        index = PDQMultiHashIndex()
+        for h, custom_id in zip(test_hashes, custom_ids):
+            index.add([h], [custom_id])
+        for h, custom_id in zip(test_hashes, custom_ids):
+            self.assertEqual(index.hash_at(custom_id), h)
+
+        reloaded = pickle.loads(pickle.dumps(index))
+        self.assertEqual(reloaded.hash_at(custom_ids[3]), test_hashes[3])
+        reloaded.add([test_hashes[0]], [7])
+        self.assertEqual(reloaded.hash_at(7), test_hashes[0])
@@ -0,0 +1,62 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+import unittest
+
+import numpy
+
+from threatexchange.hashing.pdq_faiss_matcher import PDQFlatHashIndex, PDQMultiHashIndex
+from threatexchange.hashing.pdq_index_tuning import (
+    CANDIDATES,
+    PDQIndexConfig,
+    tune,
+)
+
+
+class TestPDQIndexTuning(unittest.TestCase):
+    def test_create(self):
+        self.assertIsInstance(
+            PDQIndexConfig("PDQFlatHashIndex").create(), PDQFlatHashIndex
+        )
+        index = PDQIndexConfig(nhash=8).create()
+        self.assertIsInstance(index, PDQMultiHashIndex)
+        self.assertEqual(index.mih_index.nhash, 8)
+        with self.assertRaises(ValueError):
+            PDQIndexConfig("Nope").create()
+
+    def test_dict_round_trip(self):
+        config = PDQIndexConfig(nhash=8)
+        self.assertEqual(PDQIndexConfig.from_dict(config.to_dict()), config)
+
+    def test_tune(self):
+        vectors = numpy.random.default_rng(0).integers(
+            0, 256, (2000, 32), dtype=numpy.uint8
+        )
+        result = tune(vectors, [15, 31], sample_size=500, num_queries=20, seed=0)
+        self.assertEqual(set(result.costs), set(CANDIDATES))
+        self.assertEqual(result.best, min(result.costs, key=result.costs.get))
+        self.assertTrue(all(cost > 0 for cost in result.costs.values()))
+
+        hashes = [bytes(v).hex() for v in vectors[:100]]
+        result = tune(hashes, [31], num_queries=5, candidates=CANDIDATES[:1])
+        self.assertEqual(result.best, CANDIDATES[0])
+
+    def test_tune_skips_scanning_candidates(self):
+        hashes = ["%064x" % i for i in range(100)]
+        eight = PDQIndexConfig(nhash=8)
+        self.assertFalse(eight.uses_hash_tables_at(31))
+        self.assertTrue(eight.uses_hash_tables_at(15))
+        result = tune(hashes, [31], num_queries=5, candidates=[eight, *CANDIDATES])
+        self.assertEqual(set(result.costs), set(CANDIDATES))
+        result = tune(hashes, [52], num_queries=5)
+        self.assertEqual(set(result.costs), {PDQIndexConfig("PDQFlatHashIndex")})
+        result = tune(hashes, [52], candidates=[eight])
+        self.assertEqual(result.best, PDQIndexConfig("PDQFlatHashIndex"))
+
+    def test_tune_empty(self):
+        self.assertEqual(tune([], [31]).best, PDQIndexConfig())
+        with self.assertRaises(ValueError):
+            tune([], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
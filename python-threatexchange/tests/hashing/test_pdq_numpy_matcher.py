@@ -0,0 +1,146 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+import pickle
+import unittest
+
+import numpy
+
+from threatexchange.hashing.pdq_faiss_matcher import PDQFlatHashIndex
+from threatexchange.hashing.pdq_numpy_matcher import PDQNumpyHashIndex
+from threatexchange.signal_type.pdq_index import PDQNumpyIndex
+
+test_hashes = [
+    "0000000000000000000000000000000000000000000000000000000000000000",
+    "000000000000000000000000000000000000000000000000000000000000ffff",
+    "0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f",
+    "f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0",
+    "ffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff",
+]
+
+MAX_UNSIGNED_INT64 = numpy.iinfo(numpy.uint64).max
+
+
+class TestPDQNumpyHashIndex(unittest.TestCase):
+    custom_ids = [MAX_UNSIGNED_INT64 - i for i in range(len(test_hashes))]
+
+    def setUp(self):
+        # Tiny blocks, to exercise the blocking
+        self.index = PDQNumpyHashIndex(block_pairs=3)
+        self.index.add(test_hashes, self.custom_ids)
+
+    def assertEqualPDQHashSearchResults(self, result, expected):
+        self.assertEqual(len(result), len(expected))
+        for (r, e) in zip(result, expected):
+            self.assertCountEqual(r, e)
+
+    def test_search(self):
+        self.assertEqualPDQHashSearchResults(
+            self.index.search(test_hashes, 0), [[h] for h in test_hashes]
+        )
+        self.assertEqualPDQHashSearchResults(
+            self.index.search(test_hashes[:1], 16), [test_hashes[:2]]
+        )
+        self.assertEqualPDQHashSearchResults(
+            self.index.search(test_hashes[:1], 128), [test_hashes[:-1]]
+        )
+        self.assertEqualPDQHashSearchResults(
+            self.index.search(["a" * 64, test_hashes[-1]], 0), [[], [test_hashes[-1]]]
+        )
+
+    def test_search_return_ids(self):
+        results = self.index.search(test_hashes[:2], 16, return_as_ids=True)
+        self.assertEqualPDQHashSearchResults(
+            results, [self.custom_ids[:2], self.custom_ids[:2]]
+        )
+
+    def test_search_with_distance_in_result(self):
+        result = self.index.search_with_distance_in_result(test_hashes[:1], 16)
+        self.assertCountEqual(
+            result[test_hashes[0]],
+            [
+                (self.custom_ids[0], test_hashes[0], 0),
+                (self.custom_ids[1], test_hashes[1], 16),
+            ],
+        )
+
+    def test_hash_at(self):
+        self.assertEqual(self.index.hash_at(self.custom_ids[2]), test_hashes[2])
+        with self.assertRaises(KeyError):
+            self.index.hash_at(0)
+
+    def test_search_topk(self):
+        results = self.index.search_topk(test_hashes[:2], 2)
+        self.assertEqual(results.ids_for(0).tolist(), self.custom_ids[:2])
+        self.assertEqual(results.distances_for(0).tolist(), [0, 16])
+        self.assertEqual(results.ids_for(1).tolist(), self.custom_ids[1::-1])
+        self.assertEqual(results.distances_for(1).tolist(), [0, 16])
+
+        everything = self.index.search_topk(test_hashes[:1], 100)
+        self.assertEqual(len(everything.ids_for(0)), len(test_hashes))
+        self.assertEqual(everything.distances_for(0).tolist(), [0, 16, 128, 128, 256])
+
+        capped = self.index.search_topk(test_hashes[:2], 100, max_distance=16)
+        self.assertEqual(capped.distances_for(0).tolist(), [0, 16])
+        self.assertEqual(capped.ids_for(1).tolist(), self.custom_ids[1::-1])
+
+    def test_empty_index(self):
+        index = PDQNumpyHashIndex()
+        self.assertEqual(index.search(test_hashes[:2], 31), [[], []])
+        self.assertEqual(index.search_topk(test_hashes[:2], 3).total, 0)
+
+    def test_incremental_add(self):
+        self.index.add(test_hashes[:1], [42])
+        self.assertEqual(len(self.index), len(test_hashes) + 1)
+        self.assertCountEqual(
+            self.index.search(test_hashes[:1], 0, return_as_ids=True)[0],
+            [self.custom_ids[0], 42],
+        )
+
+    def test_remove(self):
+        self.assertEqual(self.index.remove([self.custom_ids[0], 12345]), 1)
+        self.assertEqual(len(self.index), len(test_hashes) - 1)
+        self.assertEqual(self.index.search(test_hashes[:1], 16), [test_hashes[1:2]])
+        with self.assertRaises(KeyError):
+            self.index.hash_at(self.custom_ids[0])
+        self.assertEqual(self.index.hash_at(self.custom_ids[4]), test_hashes[4])
+        self.index.add(test_hashes[:1], [1])
+        self.assertEqual(self.index.hash_at(1), test_hashes[0])
+
+    def test_supports_pickling(self):
+        reconstructed_index = pickle.loads(pickle.dumps(self.index))
+        self.assertEqual(len(reconstructed_index), len(test_hashes))
+        self.assertEqual(reconstructed_index.block_pairs, 3)
+        self.assertEqual(
+            reconstructed_index.search(test_hashes[:1], 0), [test_hashes[:1]]
+        )
+        self.assertEqual(
+            reconstructed_index.hash_at(self.custom_ids[3]), test_hashes[3]
+        )
+
+    def test_matches_faiss_flat_index(self):
+        rng = numpy.random.default_rng(0)
+        dataset = rng.integers(0, 256, size=(300, 32), dtype=numpy.uint8)
+        # Queries near the first few dataset entries
+        queries = dataset[:20] ^ (rng.random((20, 32)) < 0.05).astype(numpy.uint8)
+
+        numpy_index = PDQNumpyHashIndex(block_pairs=1000)
+        numpy_index.add(dataset, range(300))
+        faiss_index = PDQFlatHashIndex()
+        faiss_index.add(dataset, range(300))
+        for threshold in (0, 10, 31, 100):
+            self.assertEqualPDQHashSearchResults(
+                numpy_index.search(queries, threshold, return_as_ids=True),
+                faiss_index.search(queries, threshold, return_as_ids=True),
+            )
+
+
+class TestPDQNumpyIndex(unittest.TestCase):
+    def test_query(self):
+        index = PDQNumpyIndex.build((h, i) for i, h in enumerate(test_hashes))
+        matches = index.query(test_hashes[1])
+        self.assertEqual(
+            sorted((m.distance, m.metadata) for m in matches),
+            [(0, 1), (16, 0)],
+        )
+        reconstructed = pickle.loads(pickle.dumps(index))
+        self.assertEqual(len(reconstructed.query(test_hashes[0])), 2)
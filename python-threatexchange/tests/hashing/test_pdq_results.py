@@ -0,0 +1,84 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+import unittest
+
+import numpy
+
+from threatexchange.hashing.pdq_faiss_matcher import (
+    PDQFlatHashIndex,
+    PDQMultiHashIndex,
+)
+
+test_hashes = [
+    "0000000000000000000000000000000000000000000000000000000000000000",
+    "000000000000000000000000000000000000000000000000000000000000ffff",
+    "0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f0f",
+    "ffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff",
+]
+
+queries = [
+    "0000000000000000000000000000000000000000000000000000000000000000",
+    "1111111111111111111111111111111111111111111111111111111111111111",
+    "000000000000000000000000000000000000000000000000000000000000fff0",
+]
+
+custom_ids = [2**64 - 1, 7, 2**63, 123456789]
+
+
+class MixinTests:
+    class PDQSearchResultsTests:
+        def make_index(self):
+            raise NotImplementedError
+
+        def setUp(self):
+            self.index = self.make_index()
+            self.index.add(test_hashes, custom_ids)
+
+        def test_range_search_arrays(self):
+            results = self.index.range_search(queries, 16)
+            self.assertEqual(len(results), len(queries))
+            self.assertEqual(results.total, 4)
+            self.assertEqual(results.ids.dtype, numpy.uint64)
+            self.assertEqual(
+                sorted(zip(results.ids_for(0).tolist(), results.distances_for(0))),
+                [(7, 16), (2**64 - 1, 0)],
+            )
+            self.assertEqual(results.ids_for(1).tolist(), [])
+            self.assertEqual(
+                sorted(zip(results.ids_for(2).tolist(), results.distances_for(2))),
+                [(7, 4), (2**64 - 1, 12)],
+            )
+
+        def test_hashes_are_lazy(self):
+            results = self.index.range_search(queries, 16)
+            self.assertIsNone(results._hashes)
+            self.assertEqual(
+                sorted(results.hashes_for(2)), [test_hashes[0], test_hashes[1]]
+            )
+            self.assertEqual(len(results.hashes), results.total)
+
+        def test_hashes_after_add(self):
+            results = self.index.range_search(queries[:1], 0)
+            # Adding may reallocate faiss storage, hashes must still be correct
+            self.index.add(test_hashes * 100, range(400))
+            self.assertEqual(results.hashes, [test_hashes[0]])
+
+        def test_search_with_distance_in_result(self):
+            result = self.index.search_with_distance_in_result(queries, 16)
+            self.assertEqual(
+                sorted(result[queries[2]]),
+                [(7, test_hashes[1], 4), (2**64 - 1, test_hashes[0], 12)],
+            )
+            self.assertEqual(result[queries[1]], [])
+
+
+class TestFlatPDQSearchResults(MixinTests.PDQSearchResultsTests, unittest.TestCase):
+    def make_index(self):
+        return PDQFlatHashIndex()
+
+
+class TestMultiHashPDQSearchResults(
+    MixinTests.PDQSearchResultsTests, unittest.TestCase
+):
+    def make_index(self):
+        return PDQMultiHashIndex()
@@ -187,6 +187,18 @@ def _match_file(
 ) -> t.List[IndexMatch]:
     if issubclass(s_type, MatchesStr):
         return index.query(path.read_text())
+    if issubclass(s_type, BytesHasher):
+        hash, attributes = s_type.hash_with_attributes_from_bytes(path.read_bytes())
+        if s_type.is_low_quality(attributes):
+            # Would match far too much to mean anything
+            logging.warning(
+                "%s of %s is too low quality to match (%s)",
+                s_type.get_name(),
+                path,
+                attributes,
+            )
+            return []
+        return index.query(hash)
     assert issubclass(s_type, FileHasher)
     return index.query(s_type.hash_from_file(path))
 
@@ -194,7 +206,7 @@ def _match_file(
 def _match_hashes(
     path: pathlib.Path, s_type: t.Type[SignalType], index: SignalTypeIndex
 ) -> t.List[IndexMatch]:
-    ret = []
+    hashes = []
     for hash in path.read_text().splitlines():
         hash = hash.strip()
         if not hash:
@@ -210,5 +222,8 @@ def _match_hashes(
                 f"{hash_repr} from {path} is not a valid hash for {s_type.get_name()}",
                 2,
             )
-        ret.extend(index.query(hash))
+        hashes.append(hash)
+    ret = []
+    for matches in index.query_many(hashes):
+        ret.extend(matches)
     return ret
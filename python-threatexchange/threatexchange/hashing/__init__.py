@@ -14,3 +14,11 @@ except:
         "pdq matchers require faiss to be installed; install threatexchange with the [faiss] extra to use them",
         category=ImportWarning,
     )
+
+try:
+    from threatexchange.hashing.pdq_numpy_matcher import PDQNumpyHashIndex
+except:
+    warnings.warn(
+        "PDQNumpyHashIndex requires numpy to be installed; install threatexchange with the [faiss] or [pdq_hasher] extra to use it",
+        category=ImportWarning,
+    )
@@ -0,0 +1,78 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+"""
+Bulk conversion between hex PDQ hashes and the uint8[n, 32] vectors used by
+faiss binary indices.
+
+Decoding a whole batch in one call (one join, one unhexlify, one frombuffer)
+is much cheaper than decoding each hash separately and stacking the results.
+"""
+
+import binascii
+import typing as t
+
+import numpy
+
+from .pdq_utils import BITS_IN_PDQ
+
+BYTES_IN_PDQ = BITS_IN_PDQ // 8
+
+PDQ_HASH_TYPE = t.Union[str, bytes]
+
+# Anything that can be turned into uint8[n, 32] vectors:
+#  * a single hex hash, or a sequence/iterable of them (as str or bytes)
+#  * an already decoded numpy array (uint8[n, 32] or packed uint64[n, 4])
+#  * a single bytes-like buffer of n * 32 raw (not hex) hash bytes
+PDQ_VECTORS_INPUT_TYPE = t.Union[
+    t.Iterable[PDQ_HASH_TYPE], numpy.ndarray, bytes, bytearray, memoryview
+]
+
+
+def hashes_to_vectors(hashes: t.Iterable[PDQ_HASH_TYPE]) -> numpy.ndarray:
+    """
+    Decode hex PDQ hashes into a contiguous uint8[n, 32] array in one pass.
+    """
+    hashes = list(hashes)
+    if not hashes:
+        return numpy.empty((0, BYTES_IN_PDQ), dtype=numpy.uint8)
+    if isinstance(hashes[0], str):
+        joined: PDQ_HASH_TYPE = "".join(hashes)  # type: ignore
+    else:
+        joined = b"".join(hashes)  # type: ignore
+    try:
+        raw = binascii.unhexlify(joined)
+    except (binascii.Error, TypeError) as e:
+        raise ValueError("PDQ hashes must be hexadecimal strings") from e
+    if len(raw) != len(hashes) * BYTES_IN_PDQ:
+        raise ValueError(f"PDQ hashes must be {BITS_IN_PDQ // 4} hex characters")
+    return numpy.frombuffer(raw, dtype=numpy.uint8).reshape(-1, BYTES_IN_PDQ)
+
+
+def vectors_to_hashes(vectors: numpy.ndarray) -> t.List[str]:
+    """
+    Encode uint8[n, 32] vectors (or any array with the same bytes) back into
+    hex PDQ hashes.
+    """
+    hex_str = numpy.ascontiguousarray(vectors).tobytes().hex()
+    step = BITS_IN_PDQ // 4
+    return [hex_str[i : i + step] for i in range(0, len(hex_str), step)]
+
+
+def as_vectors(hashes: PDQ_VECTORS_INPUT_TYPE) -> numpy.ndarray:
+    """
+    Normalize any supported hash input into uint8[n, 32] vectors, without
+    copying when the input is already decoded.
+    """
+    if isinstance(hashes, numpy.ndarray):
+        if hashes.dtype != numpy.uint8:
+            hashes = numpy.ascontiguousarray(hashes).view(numpy.uint8)
+        if hashes.ndim == 2 and hashes.shape[1] == BYTES_IN_PDQ:
+            return hashes
+        return hashes.reshape(-1, BYTES_IN_PDQ)
+    if isinstance(hashes, (bytes, bytearray, memoryview)):
+        if len(hashes) % BYTES_IN_PDQ:
+            raise ValueError(f"raw PDQ bytes must be a multiple of {BYTES_IN_PDQ}")
+        return numpy.frombuffer(hashes, dtype=numpy.uint8).reshape(-1, BYTES_IN_PDQ)
+    if isinstance(hashes, str):
+        return hashes_to_vectors([hashes])
+    return hashes_to_vectors(hashes)
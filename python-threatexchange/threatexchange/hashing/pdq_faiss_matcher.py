@@ -1,15 +1,20 @@
 # Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
 
+import concurrent.futures
+import contextlib
+import os
+import threading
 import typing as t
 import faiss  # type: ignore
 import binascii
 import numpy  # type: ignore
 from abc import ABC, abstractmethod
 
+from .pdq_codec import PDQ_HASH_TYPE, PDQ_VECTORS_INPUT_TYPE, as_vectors
+from .pdq_id_map import IdPositionMap
+from .pdq_results import PDQSearchResults
 from .pdq_utils import BITS_IN_PDQ
 
-PDQ_HASH_TYPE = t.Union[str, bytes]
-
 
 def uint64_to_int64(as_uint64: int):
     """
@@ -27,10 +32,22 @@ def int64_to_uint64(as_int64: int):
     return numpy.int64(as_int64).astype(numpy.uint64).item()
 
 
+def uint64_ids_to_int64_array(ids: t.Iterable[int]) -> numpy.ndarray:
+    """
+    Vectorized uint64_to_int64 for a whole sequence of ids, returning the
+    int64[n] array faiss expects.
+    """
+    if isinstance(ids, numpy.ndarray):
+        return ids.astype(numpy.uint64).view(numpy.int64)
+    return numpy.fromiter(ids, dtype=numpy.uint64).view(numpy.int64)
+
+
 class PDQHashIndex(ABC):
     @abstractmethod
     def __init__(self, faiss_index: faiss.IndexBinary) -> None:
         self.faiss_index = faiss_index
+        # Set while faiss_index is a zero-copy view of this buffer
+        self._mapped_buffer: t.Optional[numpy.ndarray] = None
         super().__init__()
 
     @abstractmethod
@@ -42,15 +59,28 @@ class PDQHashIndex(ABC):
         pass
 
     @abstractmethod
-    def add(self, hashes: t.Iterable[PDQ_HASH_TYPE], custom_ids: t.Iterable[int]):
+    def add(self, hashes: PDQ_VECTORS_INPUT_TYPE, custom_ids: t.Iterable[int]):
         """
         Adds hashes and their custom ids to the PDQ index.
+
+        hashes may be hex strings, or already decoded uint8[n, 32] vectors
+        (see pdq_codec.as_vectors).
+        """
+        pass
+
+    @abstractmethod
+    def remove(self, custom_ids: t.Iterable[int]) -> int:
+        """
+        Removes all hashes with the given custom ids from the index, returning how many were removed. This is O(n) in
+        the size of the index (rather than in the number of ids), so callers should batch removals where possible.
+
+        Like add, this must not be called while searches are in flight.
         """
         pass
 
     def search(
         self,
-        queries: t.Sequence[PDQ_HASH_TYPE],
+        queries: PDQ_VECTORS_INPUT_TYPE,
         threshhold: int,
         return_as_ids: bool = False,
     ):
@@ -61,7 +91,8 @@ class PDQHashIndex(ABC):
         Parameters
         ----------
         queries: sequence of PDQ Hashes
-            The PDQ hashes to query against the index
+            The PDQ hashes to query against the index. May also be already decoded
+            uint8[n, 32] vectors or raw bytes (see pdq_codec.as_vectors)
         threshold: int
             Threshold value to use for this search. The hamming distance between the result hashes and the related query will
             be no more than the threshold value. i.e., hamming_dist(q_i,r_i_j) <= threshold.
@@ -82,24 +113,10 @@ class PDQHashIndex(ABC):
             "0000000000000000000000000000000000000000000000000000000000000000" for a threshold of 16. Thus it would appear in
             the entry for both the hashes if they were both in the queries list.
         """
-        query_vectors = [
-            numpy.frombuffer(binascii.unhexlify(q), dtype=numpy.uint8) for q in queries
-        ]
-        qs = numpy.array(query_vectors)
-        limits, _, I = self.faiss_index.range_search(qs, threshhold + 1)
-
+        results = self.range_search(queries, threshhold)
         if return_as_ids:
-            # for custom ids, we understood them initially as uint64 numbers and then coerced them internally to be signed
-            # int64s, so we need to reverse this before returning them back to the caller. For non custom ids, this will
-            # effectively return the same result
-            output_fn: t.Callable[[int], t.Any] = int64_to_uint64
-        else:
-            output_fn = self.hash_at
-
-        return [
-            [output_fn(idx.item()) for idx in I[limits[i] : limits[i + 1]]]
-            for i in range(len(query_vectors))
-        ]
+            return [results.ids_for(i).tolist() for i in range(len(results))]
+        return [results.hashes_for(i) for i in range(len(results))]
 
     def search_with_distance_in_result(
         self,
@@ -115,32 +132,122 @@ class PDQHashIndex(ABC):
         e.g.
         result = {
             "000000000000000000000000000000000000000000000000000000000000FFFF": [
-                (12345678901, "00000000000000000000000000000000000000000000000000000000FFFFFFFF", 16.0)
+                (12345678901, "00000000000000000000000000000000000000000000000000000000FFFFFFFF", 16)
             ]
         }
         """
+        results = self.range_search(queries, threshhold)
+        return {query: results.match_tuples_for(i) for i, query in enumerate(queries)}
 
-        query_vectors = [
-            numpy.frombuffer(binascii.unhexlify(q), dtype=numpy.uint8) for q in queries
-        ]
-        qs = numpy.array(query_vectors)
-        limits, similarities, I = self.faiss_index.range_search(qs, threshhold + 1)
-
+    def range_search(
+        self,
+        queries: PDQ_VECTORS_INPUT_TYPE,
+        threshhold: int,
+    ) -> PDQSearchResults:
+        """
+        Lower level version of `search` that returns the matches for all queries as numpy arrays of ids and distances
+        (see PDQSearchResults). Matched hashes are only reconstructed if they are read from the results, and then all at
+        once, so callers that only need ids (like PDQIndex) skip that cost entirely.
+        """
+        qs = as_vectors(queries)
+        inner = self._range_search_index(threshhold)
+        limits, distances, positions = inner.range_search(qs, threshhold + 1)
+        id_map = self._id_map_view()
         # for custom ids, we understood them initially as uint64 numbers and then coerced them internally to be signed
         # int64s, so we need to reverse this before returning them back to the caller. For non custom ids, this will
         # effectively return the same result
-        output_fn: t.Callable[[int], t.Any] = int64_to_uint64
-
-        result = {}
-        for i, query in enumerate(queries):
-            match_tuples = []
-            matches = [idx.item() for idx in I[limits[i] : limits[i + 1]]]
-            distances = [idx for idx in similarities[limits[i] : limits[i + 1]]]
-            for match, distance in zip(matches, distances):
-                # (Id, Hash, Distance)
-                match_tuples.append((output_fn(match), self.hash_at(match), distance))
-            result[query] = match_tuples
-        return result
+        ids = positions if id_map is None else id_map[positions]
+        return PDQSearchResults(
+            limits,
+            ids.view(numpy.uint64),
+            distances,
+            positions,
+            self._vectors_at_positions,
+        )
+
+    def search_topk(
+        self,
+        queries: PDQ_VECTORS_INPUT_TYPE,
+        k: int,
+        max_distance: t.Optional[int] = None,
+    ) -> PDQSearchResults:
+        """
+        Returns up to the k nearest hashes to each query, closest first, as PDQSearchResults.
+
+        If max_distance is given, hashes further away than it are left out, so a query may have fewer than k results.
+        Compared to range_search at a high threshold, this bounds the size of the results however dense the index is.
+        """
+        qs = as_vectors(queries)
+        k = min(k, self.faiss_index.ntotal)
+        if k <= 0:
+            distances = numpy.empty((len(qs), 0), dtype=numpy.int32)
+            positions = numpy.empty((len(qs), 0), dtype=numpy.int64)
+        else:
+            distances, positions = self._topk_search_index(max_distance).search(qs, k)
+        found = positions >= 0
+        if max_distance is not None:
+            found &= distances <= max_distance
+        limits = numpy.zeros(len(qs) + 1, dtype=numpy.int64)
+        numpy.cumsum(found.sum(axis=1), out=limits[1:])
+        # Row-major, so the results of each query stay together and in order
+        positions = positions[found]
+        id_map = self._id_map_view()
+        ids = positions if id_map is None else id_map[positions]
+        return PDQSearchResults(
+            limits,
+            ids.view(numpy.uint64),
+            distances[found],
+            positions,
+            self._vectors_at_positions,
+        )
+
+    def _inner_index(self):
+        """
+        The index that does the searching, without the custom id wrapper (if any). It returns storage positions rather
+        than ids, which are mapped to ids (and hashes) in bulk by range_search.
+        """
+        if hasattr(self.faiss_index, "id_map"):
+            return faiss.downcast_IndexBinary(self.faiss_index.index)
+        return self.faiss_index
+
+    def _range_search_index(self, threshhold: int):
+        """
+        The index range_search uses for the given threshhold, which must return storage positions like _inner_index
+        """
+        return self._inner_index()
+
+    def _topk_search_index(self, max_distance: t.Optional[int]):
+        """
+        The index search_topk uses for the given max_distance, which must return storage positions like _inner_index
+        """
+        return self._inner_index()
+
+    def _id_map_view(self) -> t.Optional[numpy.ndarray]:
+        """
+        A zero-copy int64 view of the custom id of each storage position, or None without custom ids. Only valid until
+        the index is next changed.
+        """
+        if not hasattr(self.faiss_index, "id_map"):
+            return None
+        id_map = self.faiss_index.id_map
+        return faiss.rev_swig_ptr(id_map.data(), id_map.size())
+
+    @abstractmethod
+    def _storage(self) -> faiss.IndexBinaryFlat:
+        """
+        The flat index holding the hash vectors by position
+        """
+        pass
+
+    def _vectors_at_positions(self, positions: numpy.ndarray) -> numpy.ndarray:
+        """
+        Gathers the uint8[n, 32] hash vectors at the given storage positions. The storage is viewed afresh each time
+        rather than held onto, since faiss may reallocate it when hashes are added.
+        """
+        storage = self._storage()
+        xb = storage.xb
+        vectors = faiss.rev_swig_ptr(xb.data(), xb.size())
+        return vectors.reshape(-1, storage.code_size)[positions]
 
     def __getstate__(self):
         data = faiss.serialize_index_binary(self.faiss_index)
@@ -148,6 +255,48 @@ class PDQHashIndex(ABC):
 
     def __setstate__(self, data):
         self.faiss_index = faiss.deserialize_index_binary(data)
+        self._mapped_buffer = None
+
+    def serialize_to_buffer(self) -> numpy.ndarray:
+        """
+        The faiss serialization of this index, which from_buffer can load.
+        """
+        return faiss.serialize_index_binary(self.faiss_index)
+
+    @classmethod
+    def from_buffer(cls, buffer, zero_copy: bool = True) -> "PDQHashIndex":
+        """
+        Load an index from the output of serialize_to_buffer.
+
+        With zero_copy, if faiss supports it (faiss>=1.10), the hash vectors are used in place from buffer rather than
+        copied, which makes loading from an mmap-ed file nearly free. The buffer must then outlive the index, which it
+        does by keeping a reference to it. The first add or remove makes a private copy.
+        """
+        ret = cls.__new__(cls)
+        data = numpy.frombuffer(buffer, dtype=numpy.uint8)
+        if zero_copy and hasattr(faiss, "ZeroCopyIOReader"):
+            reader = faiss.ZeroCopyIOReader(faiss.swig_ptr(data), len(data))
+            ret.faiss_index = faiss.read_index_binary(reader)
+            ret._mapped_buffer = data
+        else:
+            ret.faiss_index = faiss.deserialize_index_binary(data)
+            ret._mapped_buffer = None
+        ret._after_load()
+        return ret
+
+    def _after_load(self) -> None:
+        """
+        Hook for subclasses to rebuild their state after from_buffer
+        """
+        pass
+
+    def _ensure_owned(self) -> None:
+        """
+        faiss aborts when changing an index that views external memory, so copy it before any change.
+        """
+        if self._mapped_buffer is not None:
+            self.faiss_index = faiss.deserialize_index_binary(self._mapped_buffer)
+            self._mapped_buffer = None
 
 
 class PDQFlatHashIndex(PDQHashIndex):
@@ -164,12 +313,13 @@ class PDQFlatHashIndex(PDQHashIndex):
         )
         super().__init__(faiss_index)
 
-    def add(self, hashes: t.Iterable[PDQ_HASH_TYPE], custom_ids: t.Iterable[int]):
+    def add(self, hashes: PDQ_VECTORS_INPUT_TYPE, custom_ids: t.Iterable[int]):
         """
         Parameters
         ----------
         hashes: sequence of PDQ Hashes
-            The PDQ hashes to create the index with
+            The PDQ hashes to create the index with. May also be already decoded
+            uint8[n, 32] vectors or raw bytes (see pdq_codec.as_vectors)
         custom_ids: sequence of custom ids for the PDQ Hashes
             Sequence of custom id values to use for the PDQ hashes for any
             method relating to indexes (e.g., hash_at). If provided, the nth item in
@@ -177,18 +327,24 @@ class PDQFlatHashIndex(PDQHashIndex):
             then the ids for the hashes will be assumed to be their respective index
             in hashes (i.e., the nth hash would have id n, starting from 0).
         """
-        hash_bytes = [binascii.unhexlify(hash) for hash in hashes]
-        vectors = list(
-            map(lambda h: numpy.frombuffer(h, dtype=numpy.uint8), hash_bytes)
-        )
-        i64_ids = list(map(uint64_to_int64, custom_ids))
-        self.faiss_index.add_with_ids(numpy.array(vectors), numpy.array(i64_ids))
+        vectors = as_vectors(hashes)
+        i64_ids = uint64_ids_to_int64_array(custom_ids)
+        self._ensure_owned()
+        self.faiss_index.add_with_ids(vectors, i64_ids)
 
     def hash_at(self, idx: int):
         i64_id = uint64_to_int64(idx)
         vector = self.faiss_index.reconstruct(i64_id)
         return binascii.hexlify(vector.tobytes()).decode()
 
+    def remove(self, custom_ids: t.Iterable[int]) -> int:
+        i64_ids = uint64_ids_to_int64_array(custom_ids)
+        self._ensure_owned()
+        return self.faiss_index.remove_ids(faiss.IDSelectorBatch(i64_ids))
+
+    def _storage(self) -> faiss.IndexBinaryFlat:
+        return self._inner_index()
+
 
 class PDQMultiHashIndex(PDQHashIndex):
     """
@@ -201,26 +357,36 @@ class PDQMultiHashIndex(PDQHashIndex):
     nhash: int (optional)
     Optional number of hashmaps for the underlaying faiss index to use for
     the Multi-Index Hashing lookups.
+
+    Range searches that need to flip more than MAX_NFLIP bits per hashmap scan the flat storage instead, as the
+    number of buckets probed grows combinatorially with nflip. With the default 16 hashmaps that means thresholds of
+    32 and up (i.e. the 52 used for higher recall) are exhaustive, which is what PDQFlatHashIndex would do anyway.
     """
 
+    # Measured on 200k random hashes: nflip=1 (thresholds 16-31) is about as fast as a flat scan, nflip=2 is ~7x
+    # slower than it, and nflip=3 ~30x
+    MAX_NFLIP = 1
+
     def __init__(self, nhash: int = 16):
         bits_per_hashmap = BITS_IN_PDQ // nhash
         faiss_index = faiss.IndexBinaryIDMap2(
             faiss.IndexBinaryMultiHash(BITS_IN_PDQ, nhash, bits_per_hashmap)
         )
         super().__init__(faiss_index)
+        self._nflip_gate = _NflipGate()
         self.__construct_index_rev_map()
 
     def add(
         self,
-        hashes: t.Iterable[PDQ_HASH_TYPE],
+        hashes: PDQ_VECTORS_INPUT_TYPE,
         custom_ids: t.Iterable[int],
     ):
         """
         Parameters
         ----------
         hashes: sequence of PDQ Hashes
-            The PDQ hashes to create the index with
+            The PDQ hashes to create the index with. May also be already decoded
+            uint8[n, 32] vectors or raw bytes (see pdq_codec.as_vectors)
         custom_ids: sequence of custom ids for the PDQ Hashes
             Sequence of custom id values to use for the PDQ hashes for any
             method relating to indexes (e.g., hash_at). If provided, the nth item in
@@ -232,14 +398,74 @@ class PDQMultiHashIndex(PDQHashIndex):
         -------
         a PDQMultiHashIndex of these hashes
         """
-        hash_bytes = [binascii.unhexlify(hash) for hash in hashes]
-        vectors = list(
-            map(lambda h: numpy.frombuffer(h, dtype=numpy.uint8), hash_bytes)
-        )
-        i64_ids = list(map(uint64_to_int64, custom_ids))
-        self.faiss_index.add_with_ids(numpy.array(vectors), numpy.array(i64_ids))
+        vectors = as_vectors(hashes)
+        i64_ids = uint64_ids_to_int64_array(custom_ids)
+        self._ensure_owned()
+        self.faiss_index.add_with_ids(vectors, i64_ids)
+        if self.index_rev_map is not None:
+            self.index_rev_map.extend(i64_ids)
+
+    def remove(self, custom_ids: t.Iterable[int]) -> int:
+        """
+        faiss.IndexBinaryMultiHash doesn't implement remove_ids, so this rebuilds the index from the stored vectors of
+        the hashes being kept (which is still much cheaper than re-adding them from hex).
+        """
+        i64_ids = uint64_ids_to_int64_array(custom_ids)
+        positions = numpy.arange(self.faiss_index.ntotal)
+        id_map = self._id_map_view()
+        ids = positions if id_map is None else id_map
+        keep = numpy.flatnonzero(~numpy.isin(ids, i64_ids))
+        removed = len(ids) - len(keep)
+        if not removed:
+            return 0
+        self.__rebuild(self._vectors_at_positions(keep), ids[keep])
+        return removed
+
+    def __rebuild(self, vectors: numpy.ndarray, i64_ids: numpy.ndarray) -> None:
+        """
+        Replaces the index with a new one of the same shape holding vectors
+        """
+        old_mih_index = self.mih_index
+        nhash = old_mih_index.nhash
+        mih_index = faiss.IndexBinaryMultiHash(BITS_IN_PDQ, nhash, BITS_IN_PDQ // nhash)
+        # The nflip gate tracks the value it last set, so carry it over
+        mih_index.nflip = old_mih_index.nflip
+        faiss_index = faiss.IndexBinaryIDMap2(mih_index)
+        faiss_index.add_with_ids(vectors, i64_ids)
+        self.faiss_index = faiss_index
+        self._mapped_buffer = None
         self.__construct_index_rev_map()
 
+    # Stored hashes looked up again after loading, to check the hash tables
+    LOAD_PROBE_SIZE = 16
+
+    def __repair_loaded_hash_tables(self) -> None:
+        """
+        faiss (seen in 1.15) can lose the hash tables of an IndexBinaryMultiHash when reading it back, if every hash
+        falls in the same bucket (e.g. a single hash, or only identical ones). Probes a few stored hashes for
+        themselves, and only if one isn't found rebuilds the tables from the stored hashes, so that healthy indexes
+        (including ones using a mapped buffer) are left as they are.
+        """
+        ntotal = self.faiss_index.ntotal
+        if ntotal == 0:
+            return
+        probes = numpy.unique(
+            numpy.linspace(
+                0, ntotal - 1, min(ntotal, self.LOAD_PROBE_SIZE), dtype=numpy.int64
+            )
+        )
+        mih_index = self.mih_index
+        with self._nflip_gate.hold(mih_index, 0):
+            limits, _, positions = mih_index.range_search(
+                self._vectors_at_positions(probes), 1
+            )
+        if all(p in positions[limits[q] : limits[q + 1]] for q, p in enumerate(probes)):
+            return
+        positions = numpy.arange(ntotal)
+        id_map = self._id_map_view()
+        ids = positions if id_map is None else id_map.copy()
+        self.__rebuild(self._vectors_at_positions(positions), ids)
+
     @property
     def mih_index(self):
         """
@@ -250,27 +476,58 @@ class PDQMultiHashIndex(PDQHashIndex):
             return faiss.downcast_IndexBinary(self.faiss_index.index)
         return self.faiss_index
 
-    def search(
+    def range_search(
         self,
-        queries: t.Sequence[PDQ_HASH_TYPE],
+        queries: PDQ_VECTORS_INPUT_TYPE,
         threshhold: int,
-        return_as_ids: bool = False,
-    ):
-        self.mih_index.nflip = threshhold // self.mih_index.nhash
-        return super().search(queries, threshhold, return_as_ids)
-
-    def search_with_distance_in_result(
+    ) -> PDQSearchResults:
+        nflip = self._nflip_for(threshhold)
+        if nflip > self.MAX_NFLIP:
+            # Doesn't touch the multi-hash index, so no need to hold the gate
+            return super().range_search(queries, threshhold)
+        with self._nflip_gate.hold(self.mih_index, nflip):
+            return super().range_search(queries, threshhold)
+
+    def _range_search_index(self, threshhold: int):
+        if self._nflip_for(threshhold) > self.MAX_NFLIP:
+            # Storage positions are the same as the multi-hash index's labels
+            return self._storage()
+        return self._inner_index()
+
+    def search_topk(
         self,
-        queries: t.Sequence[str],
-        threshhold: int,
-    ):
-        self.mih_index.nflip = threshhold // self.mih_index.nhash
-        return super().search_with_distance_in_result(queries, threshhold)
+        queries: PDQ_VECTORS_INPUT_TYPE,
+        k: int,
+        max_distance: t.Optional[int] = None,
+    ) -> PDQSearchResults:
+        """
+        See PDQHashIndex.search_topk. Like range_search, this scans the flat storage when max_distance is over what
+        MAX_NFLIP covers, and also without a max_distance, as then the nearest hashes could be any distance away.
+        """
+        if self._topk_scans(max_distance):
+            return super().search_topk(queries, k, max_distance)
+        assert max_distance is not None
+        with self._nflip_gate.hold(self.mih_index, self._nflip_for(max_distance)):
+            return super().search_topk(queries, k, max_distance)
+
+    def _topk_scans(self, max_distance: t.Optional[int]) -> bool:
+        return max_distance is None or self._nflip_for(max_distance) > self.MAX_NFLIP
+
+    def _topk_search_index(self, max_distance: t.Optional[int]):
+        if self._topk_scans(max_distance):
+            return self._storage()
+        return self._inner_index()
+
+    def _nflip_for(self, threshhold: int) -> int:
+        return threshhold // self.mih_index.nhash
+
+    def _storage(self) -> faiss.IndexBinaryFlat:
+        return self.mih_index.storage
 
     def hash_at(self, idx: int):
         i64_id = uint64_to_int64(idx)
-        if self.index_rev_map:
-            index_id = self.index_rev_map[i64_id]
+        if self.index_rev_map is not None:
+            index_id = self.index_rev_map.position_of(i64_id)
         else:
             index_id = i64_id
         vector = self.mih_index.storage.reconstruct(index_id)
@@ -284,13 +541,168 @@ class PDQMultiHashIndex(PDQHashIndex):
         support `reconstruct`, which faiss.IndexBinaryMultiHash does not. Thus this workaround is needed until either the
         values in the faiss.IndexBinaryIDMap2 rev_map can be accessed directly or faiss.IndexBinaryMultiHash is directly
         supports `reconstruct` calls.
+
+        The map is sorted id arrays (see IdPositionMap) built from the whole id_map in one numpy call, which add()
+        extends with amortized merges rather than rebuilding.
         """
         if hasattr(self.faiss_index, "id_map"):
-            id_map = self.faiss_index.id_map
-            self.index_rev_map = {id_map.at(i): i for i in range(id_map.size())}
+            ids = faiss.vector_to_array(self.faiss_index.id_map)
+            self.index_rev_map: t.Optional[IdPositionMap] = IdPositionMap.from_ids(ids)
         else:
             self.index_rev_map = None
 
-    def __setstate__(self, data):
-        super().__setstate__(data)
+    def __getstate__(self):
+        return (super().__getstate__(), self.index_rev_map)
+
+    def _after_load(self) -> None:
+        self._nflip_gate = _NflipGate()
         self.__construct_index_rev_map()
+        self.__repair_loaded_hash_tables()
+
+    def __setstate__(self, data):
+        self._nflip_gate = _NflipGate()
+        if isinstance(data, tuple):
+            data, self.index_rev_map = data
+            super().__setstate__(data)
+        else:
+            # Serialized before the reverse map was stored alongside the index
+            super().__setstate__(data)
+            self.__construct_index_rev_map()
+        self.__repair_loaded_hash_tables()
+
+
+class PDQParallelSearcher:
+    """
+    Runs searches against one shared in-memory PDQHashIndex from a pool of
+    threads.
+
+    Large query batches are split into shards that are searched concurrently
+    and merged back in query order. faiss releases the GIL while searching, so
+    this scales with cores without copying the index. Each pool thread sets
+    its own faiss OMP thread count (omp_threads_per_search), so the total
+    stays bounded at num_threads * omp_threads_per_search rather than every
+    shard trying to use every core.
+
+    The index must not be added to while searches are in flight.
+    """
+
+    def __init__(
+        self,
+        index: PDQHashIndex,
+        num_threads: t.Optional[int] = None,
+        omp_threads_per_search: int = 1,
+        min_shard_size: int = 256,
+    ) -> None:
+        self.index = index
+        self.num_threads = num_threads or os.cpu_count() or 1
+        self.min_shard_size = min_shard_size
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.num_threads,
+            initializer=faiss.omp_set_num_threads,
+            initargs=(omp_threads_per_search,),
+        )
+
+    def __enter__(self) -> "PDQParallelSearcher":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+    def _shards(self, n: int) -> t.List[slice]:
+        shard_size = max(self.min_shard_size, -(-n // self.num_threads))
+        return [slice(i, i + shard_size) for i in range(0, n, shard_size)]
+
+    def search(
+        self,
+        queries: PDQ_VECTORS_INPUT_TYPE,
+        threshhold: int,
+        return_as_ids: bool = False,
+    ):
+        """
+        Same as PDQHashIndex.search, with the batch sharded across the pool
+        """
+        qs = as_vectors(queries)
+        futures = [
+            self._pool.submit(self.index.search, qs[shard], threshhold, return_as_ids)
+            for shard in self._shards(len(qs))
+        ]
+        ret = []
+        for future in futures:
+            ret.extend(future.result())
+        return ret
+
+    def search_with_distance_in_result(
+        self,
+        queries: t.Sequence[str],
+        threshhold: int,
+    ):
+        """
+        Same as PDQHashIndex.search_with_distance_in_result, with the batch
+        sharded across the pool
+        """
+        queries = list(queries)
+        futures = [
+            self._pool.submit(
+                self.index.search_with_distance_in_result, queries[shard], threshhold
+            )
+            for shard in self._shards(len(queries))
+        ]
+        ret = {}
+        for future in futures:
+            ret.update(future.result())
+        return ret
+
+
+class _NflipGate:
+    """
+    faiss.IndexBinaryMultiHash has no per-call search parameters: the number
+    of bits to flip when probing (nflip) is a field on the shared index. This
+    coordinates setting it so that concurrent searches are safe.
+
+    Any number of searches may run at once, as long as the current nflip is at
+    least what each of them needs (a larger nflip only costs extra candidates,
+    which are then filtered out by distance). Searches that need a larger
+    nflip wait for the in-flight ones to drain, and are then all let through
+    together with the largest nflip any of them asked for. New searches queue
+    behind waiting ones, so those can't be starved.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._nflip = -1
+        self._pending_nflip = -1
+        self._generation = 0
+
+    @contextlib.contextmanager
+    def hold(self, mih_index, nflip: int) -> t.Iterator[None]:
+        with self._cond:
+            if self._waiting or not (self._active == 0 or self._nflip >= nflip):
+                self._waiting += 1
+                self._pending_nflip = max(self._pending_nflip, nflip)
+                generation = self._generation
+                self._cond.wait_for(
+                    lambda: self._generation != generation or self._active == 0
+                )
+                self._waiting -= 1
+                if self._generation == generation:
+                    # First through after the drain, switch for all waiters
+                    nflip = self._pending_nflip
+                    self._pending_nflip = -1
+                    self._generation += 1
+                    self._cond.notify_all()
+            if self._active == 0 and self._nflip != nflip:
+                mih_index.nflip = nflip
+                self._nflip = nflip
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                if self._active == 0:
+                    self._cond.notify_all()
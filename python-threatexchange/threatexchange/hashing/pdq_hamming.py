@@ -0,0 +1,111 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+"""
+Vectorized hamming distance helpers for PDQ hashes.
+
+Hashes are packed into uint64[n, 4] arrays (4 x 64 bits = BITS_IN_PDQ), so a
+distance is 4 xors and a popcount, and comparisons against many hashes at once
+happen in numpy rather than in python loops.
+"""
+
+import typing as t
+
+import numpy
+
+from . import pdq_codec
+from .pdq_codec import PDQ_HASH_TYPE
+from .pdq_utils import BITS_IN_PDQ
+
+PDQ_PACKED_WORDS = BITS_IN_PDQ // 64
+
+# Number of set bits for every possible 16 bit value, for numpy versions
+# without numpy.bitwise_count. 64KB, so it stays in cache, and halves the
+# lookups per hash compared to a byte table.
+_POPCOUNT_TABLE = numpy.array([bin(i).count("1") for i in range(1 << 16)], numpy.uint8)
+
+# Number of (query, hash) pairs of the distance matrix computed at a time, to
+# bound the size of intermediate arrays (~32 bytes per pair)
+DEFAULT_BLOCK_PAIRS = 1 << 18
+
+
+def hashes_to_packed(hashes: t.Iterable[PDQ_HASH_TYPE]) -> numpy.ndarray:
+    """
+    Pack a sequence of hex PDQ hashes into a uint64[n, 4] array
+    """
+    return pdq_codec.hashes_to_vectors(hashes).view(numpy.uint64)
+
+
+def packed_to_hashes(packed: numpy.ndarray) -> t.List[str]:
+    """
+    Inverse of hashes_to_packed
+    """
+    return pdq_codec.vectors_to_hashes(packed)
+
+
+def as_packed(hashes: pdq_codec.PDQ_VECTORS_INPUT_TYPE) -> numpy.ndarray:
+    """
+    Accept any input supported by pdq_codec.as_vectors (hex hashes, raw bytes,
+    or already decoded arrays), and return a uint64[n, 4] packed array.
+    """
+    return numpy.ascontiguousarray(pdq_codec.as_vectors(hashes)).view(numpy.uint64)
+
+
+def popcount(x: numpy.ndarray) -> numpy.ndarray:
+    """
+    Count set bits for each uint64 in x, summed along the last axis.
+    """
+    bitwise_count = getattr(numpy, "bitwise_count", None)  # numpy>=2.0
+    if bitwise_count is not None:
+        return bitwise_count(x).sum(axis=-1, dtype=numpy.int32)
+    as_uint16 = x.view(numpy.uint16)
+    return _POPCOUNT_TABLE[as_uint16].sum(axis=-1, dtype=numpy.int32)
+
+
+def distance(a: numpy.ndarray, b: numpy.ndarray) -> int:
+    """
+    Hamming distance between two packed hashes (each uint64[4])
+    """
+    return int(popcount(numpy.bitwise_xor(a, b)))
+
+
+def pairwise_distances(a: numpy.ndarray, b: numpy.ndarray) -> numpy.ndarray:
+    """
+    Hamming distance between each row of a and the same row of b.
+
+    Returns int32[n]
+    """
+    return popcount(numpy.bitwise_xor(a, b))
+
+
+def distances_one_to_many(query: numpy.ndarray, packed: numpy.ndarray) -> numpy.ndarray:
+    """
+    Hamming distance between one packed hash and every row of packed.
+
+    Returns int32[n]
+    """
+    return popcount(numpy.bitwise_xor(packed, query.reshape(1, PDQ_PACKED_WORDS)))
+
+
+def distance_matrix(
+    queries: numpy.ndarray,
+    packed: numpy.ndarray,
+    block_pairs: int = DEFAULT_BLOCK_PAIRS,
+) -> numpy.ndarray:
+    """
+    Hamming distance between every row of queries and every row of packed.
+
+    Returns uint16[len(queries), len(packed)]. The matrix is computed in
+    blocks of at most block_pairs entries, so intermediate arrays stay bounded
+    for large inputs.
+    """
+    out = numpy.empty((len(queries), len(packed)), dtype=numpy.uint16)
+    cols = max(1, min(len(packed), block_pairs))
+    rows = max(1, block_pairs // cols)
+    for q_start in range(0, len(queries), rows):
+        q_block = queries[q_start : q_start + rows, numpy.newaxis, :]
+        for p_start in range(0, len(packed), cols):
+            p_block = packed[numpy.newaxis, p_start : p_start + cols, :]
+            out[q_start : q_start + rows, p_start : p_start + cols] = popcount(
+                numpy.bitwise_xor(q_block, p_block)
+            )
+    return out
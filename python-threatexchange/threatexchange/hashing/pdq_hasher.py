@@ -5,13 +5,28 @@ import io
 import pdqhash
 import pathlib
 import numpy as np
-from PIL import Image, ImageOps
+from PIL import Image, ImageOps, JpegImagePlugin
 import typing as t
 
 
 PDQOutput = t.Tuple[
     str, int
 ]  # hexadecimal representation of the Hash vector and a numerical quality value
+PDQDihedralOutput = t.Tuple[
+    t.List[str], int
+]  # hashes of each of pdq_utils.DIHEDRAL_TRANSFORMS, in order, and the quality
+
+# PDQ downsamples to 64x64 regardless, so JPEGs larger than twice this are
+# decoded at 1/2, 1/4 or 1/8 scale, no smaller than this on each side, which
+# is much faster. As in pdqhashing, this is large enough that hashes are
+# usually unchanged by it, and otherwise differ by a few bits.
+DECODE_MIN_SIZE = 1024
+# JPEGs with more pixels than this once decoded are rejected from their
+# header, before any pixels are decoded. None for no limit. Other formats
+# have PIL's own checks against Image.MAX_IMAGE_PIXELS.
+MAX_DECODED_PIXELS: t.Optional[int] = Image.MAX_IMAGE_PIXELS
+
+_JPEG_PREFIX = b"\xff\xd8\xff"
 
 
 def pdq_from_file(path: pathlib.Path) -> PDQOutput:
@@ -19,8 +34,7 @@ def pdq_from_file(path: pathlib.Path) -> PDQOutput:
     Given a path to a file return the PDQ Hash string in hex.
     Current tested against: jpg
     """
-    img_pil = Image.open(path)
-    image = _check_dimension_and_expand_if_needed(np.asarray(img_pil))
+    image = _check_dimension_and_expand_if_needed(np.asarray(_open_image(path)))
     return _pdq_from_numpy_array(image)
 
 
@@ -29,23 +43,94 @@ def pdq_from_bytes(file_bytes: bytes) -> PDQOutput:
     For the bytestream from an image file, compute PDQ Hash and quality.
     """
     np_array = _check_dimension_and_expand_if_needed(
-        np.asarray(Image.open(io.BytesIO(file_bytes)))
+        np.asarray(_open_image(io.BytesIO(file_bytes)))
     )
     return _pdq_from_numpy_array(np_array)
 
 
-def _pdq_from_numpy_array(array: np.ndarray) -> PDQOutput:
-    hash_vector, quality = pdqhash.compute(array)
+def pdq_dihedral_from_file(path: pathlib.Path) -> PDQDihedralOutput:
+    """
+    Given a path to a file return the PDQ Hashes of the image and of its
+    rotations and mirror images (see pdq_utils.DIHEDRAL_TRANSFORMS) in hex.
+
+    All 8 come from the one DCT, so cost little more than pdq_from_file.
+    """
+    image = _check_dimension_and_expand_if_needed(np.asarray(_open_image(path)))
+    return _pdq_dihedral_from_numpy_array(image)
 
-    bin_str = "".join([str(x) for x in hash_vector])
 
-    # binary to hex using format string
-    # '%0*' is for padding up to ceil(num_bits/4),
-    # '%X' create a hex representation from the binary string's integer value
-    hex_str = "%0*X" % ((len(bin_str) + 3) // 4, int(bin_str, 2))
-    hex_str = hex_str.lower()
+def pdq_dihedral_from_bytes(file_bytes: bytes) -> PDQDihedralOutput:
+    """
+    For the bytestream from an image file, compute the dihedral PDQ Hashes
+    and quality, see pdq_dihedral_from_file.
+    """
+    np_array = _check_dimension_and_expand_if_needed(
+        np.asarray(_open_image(io.BytesIO(file_bytes)))
+    )
+    return _pdq_dihedral_from_numpy_array(np_array)
+
+
+def _open_image(fp: t.Union[pathlib.Path, t.BinaryIO]) -> Image.Image:
+    """
+    Opens an image, reading only its header, and sets up large JPEGs to be
+    decoded at reduced scale (see DECODE_MIN_SIZE).
 
-    return hex_str, quality
+    Raises PIL's DecompressionBombError if a JPEG would decode to more than
+    MAX_DECODED_PIXELS, before decoding any of it. Image.open checks the full
+    size against Image.MAX_IMAGE_PIXELS, which would reject large JPEGs that
+    are within the limit at reduced scale, so JPEGs are opened directly.
+    """
+    img = _open_jpeg(fp)
+    if img is None:
+        return Image.open(fp)
+    img.draft(None, (DECODE_MIN_SIZE, DECODE_MIN_SIZE))
+    width, height = img.size
+    if MAX_DECODED_PIXELS is not None and width * height > MAX_DECODED_PIXELS:
+        img.close()
+        raise Image.DecompressionBombError(
+            f"Image size ({width}x{height}) exceeds limit of "
+            f"{MAX_DECODED_PIXELS} pixels"
+        )
+    return img
+
+
+def _open_jpeg(
+    fp: t.Union[pathlib.Path, t.BinaryIO]
+) -> t.Optional[JpegImagePlugin.JpegImageFile]:
+    """
+    fp opened as a JPEG, or None if it isn't one (or is too broken to open,
+    which is left for Image.open to report)
+    """
+    if isinstance(fp, (str, pathlib.Path)):
+        with open(fp, "rb") as f:
+            prefix = f.read(len(_JPEG_PREFIX))
+    else:
+        position = fp.tell()
+        prefix = fp.read(len(_JPEG_PREFIX))
+        fp.seek(position)
+    if prefix != _JPEG_PREFIX:
+        return None
+    try:
+        return JpegImagePlugin.JpegImageFile(fp)
+    except (SyntaxError, OSError):
+        if not isinstance(fp, (str, pathlib.Path)):
+            fp.seek(position)
+        return None
+
+
+def _pdq_dihedral_from_numpy_array(array: np.ndarray) -> PDQDihedralOutput:
+    hash_vectors, quality = pdqhash.compute_dihedral(array)
+    return [_hash_vector_to_hex(v) for v in hash_vectors], quality
+
+
+def _hash_vector_to_hex(hash_vector: np.ndarray) -> str:
+    # packbits is most significant bit first, like the hex string
+    return np.packbits(hash_vector.astype(np.uint8)).tobytes().hex()
+
+
+def _pdq_from_numpy_array(array: np.ndarray) -> PDQOutput:
+    hash_vector, quality = pdqhash.compute(array)
+    return _hash_vector_to_hex(hash_vector), quality
 
 
 def _check_dimension_and_expand_if_needed(array: np.ndarray) -> np.ndarray:
@@ -0,0 +1,107 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+"""
+Compact reverse lookup from custom ids to positions within an index.
+"""
+
+import typing as t
+
+import numpy
+
+
+class IdPositionMap:
+    """
+    Maps custom int64 ids to their position (insertion order) in an index.
+
+    Stored as a few sorted int64 arrays of ids ("runs") plus the matching
+    positions, and looked up by binary search in each. That is 16 bytes an
+    entry, compared to hundreds for a python dict.
+
+    Each extend() adds its ids as a new run, and a run is merged into the one
+    before it once it is at least half that one's size, so the runs shrink
+    geometrically and there are O(log n) of them. Every id is merged O(log n)
+    times over any sequence of extends, instead of the whole map being
+    copied on every one.
+
+    When every id so far is equal to its position (the common case of ids
+    generated with range()), no arrays are stored at all.
+    """
+
+    def __init__(self) -> None:
+        self.size = 0
+        # Empty while ids == positions, oldest (and largest) first
+        self.runs: t.List[t.Tuple[numpy.ndarray, numpy.ndarray]] = []
+        self._identity = True
+
+    @classmethod
+    def from_ids(cls, ids: numpy.ndarray) -> "IdPositionMap":
+        ret = cls()
+        ret.extend(ids)
+        return ret
+
+    @property
+    def is_identity(self) -> bool:
+        return self._identity
+
+    def __len__(self) -> int:
+        return self.size
+
+    def extend(self, ids: numpy.ndarray) -> None:
+        """
+        Record ids for the next len(ids) positions
+        """
+        ids = numpy.asarray(ids, dtype=numpy.int64)
+        start = self.size
+        new_positions = numpy.arange(start, start + len(ids), dtype=numpy.int64)
+        self.size += len(ids)
+        if self._identity:
+            if numpy.array_equal(ids, new_positions):
+                return
+            self._identity = False
+            # Materialize the identity mapping we've been skipping so far
+            if start:
+                identity = numpy.arange(start, dtype=numpy.int64)
+                self.runs.append((identity, identity.copy()))
+        if not len(ids):
+            return
+        order = numpy.argsort(ids, kind="stable")
+        self.runs.append((ids[order], new_positions[order]))
+        while len(self.runs) > 1 and 2 * len(self.runs[-1][0]) >= len(self.runs[-2][0]):
+            newer_ids, newer_positions = self.runs.pop()
+            older_ids, older_positions = self.runs.pop()
+            merged_ids = numpy.concatenate((older_ids, newer_ids))
+            # Stable, so the older of equal ids stays first
+            order = numpy.argsort(merged_ids, kind="stable")
+            self.runs.append(
+                (
+                    merged_ids[order],
+                    numpy.concatenate((older_positions, newer_positions))[order],
+                )
+            )
+
+    def lookup(self, ids: numpy.ndarray) -> numpy.ndarray:
+        """
+        Vectorized id => position. Raises KeyError if any id is missing.
+        """
+        ids = numpy.asarray(ids, dtype=numpy.int64)
+        if self._identity:
+            found = (ids >= 0) & (ids < self.size)
+            positions = ids
+        else:
+            found = numpy.zeros(len(ids), dtype=bool)
+            positions = numpy.zeros(len(ids), dtype=numpy.int64)
+            for run_ids, run_positions in self.runs:
+                idx = numpy.searchsorted(run_ids, ids)
+                idx_clipped = numpy.minimum(idx, len(run_ids) - 1)
+                in_run = ~found & (idx < len(run_ids)) & (run_ids[idx_clipped] == ids)
+                positions[in_run] = run_positions[idx_clipped[in_run]]
+                found |= in_run
+        if not numpy.all(found):
+            raise KeyError(ids[~found].tolist())
+        return positions
+
+    def position_of(self, id: int) -> int:
+        """
+        Scalar id => position
+        """
+        return int(self.lookup(numpy.array([id]))[0])
@@ -0,0 +1,173 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+"""
+Picks the fastest faiss PDQ hash index for a dataset by measuring it.
+
+Whether PDQFlatHashIndex or PDQMultiHashIndex is faster, and with how many
+hashmaps, depends on the number of hashes, how they cluster, the thresholds
+searched with, and how many searches there are per build (see
+benchmarks/benchmark_pdq_faiss_matchers.py). Rather than guess, tune() builds
+each candidate over a sample of the real hashes, and times searches near
+hashes of that sample at the expected thresholds.
+
+Times are measured on the sample, and assumed to scale alike for every
+candidate on the full dataset.
+"""
+
+from dataclasses import asdict, dataclass
+import time
+import typing as t
+
+import numpy
+
+from .pdq_codec import as_vectors
+from .pdq_faiss_matcher import PDQFlatHashIndex, PDQHashIndex, PDQMultiHashIndex
+from .pdq_utils import BITS_IN_PDQ
+
+
+@dataclass(frozen=True)
+class PDQIndexConfig:
+    """
+    Which PDQHashIndex to use, and how to set it up
+
+    backend: the class name, PDQMultiHashIndex or PDQFlatHashIndex
+    nhash: the number of hashmaps, for PDQMultiHashIndex
+    """
+
+    backend: str = PDQMultiHashIndex.__name__
+    nhash: int = 16
+
+    def create(self) -> PDQHashIndex:
+        """An empty index with this config"""
+        if self.backend == PDQFlatHashIndex.__name__:
+            return PDQFlatHashIndex()
+        if self.backend == PDQMultiHashIndex.__name__:
+            return PDQMultiHashIndex(self.nhash)
+        raise ValueError(f"Unknown PDQ index backend {self.backend}")
+
+    def uses_hash_tables_at(self, threshold: int) -> bool:
+        """
+        Whether searches at threshold use the hashmaps, rather than falling
+        back to scanning the storage (see PDQMultiHashIndex.MAX_NFLIP)
+        """
+        return (
+            self.backend != PDQMultiHashIndex.__name__
+            or threshold // self.nhash <= PDQMultiHashIndex.MAX_NFLIP
+        )
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: t.Mapping[str, t.Any]) -> "PDQIndexConfig":
+        return cls(**d)
+
+
+# 32 hashmaps of 8 bits put too many hashes in each bucket to ever be
+# competitive, and with 8 or fewer the usual threshold of 31 needs more flips
+# than PDQMultiHashIndex.MAX_NFLIP, so they would just scan like
+# PDQFlatHashIndex
+CANDIDATES = (
+    PDQIndexConfig(PDQFlatHashIndex.__name__),
+    PDQIndexConfig(nhash=16),
+)
+
+
+@dataclass
+class TuningResult:
+    """
+    The measured cost of each candidate, in seconds for one build of the full
+    dataset plus queries_per_build queries, and the cheapest of them.
+    """
+
+    best: PDQIndexConfig
+    costs: t.Dict[PDQIndexConfig, float]
+
+
+def tune(
+    hashes: t.Union[t.Sequence[str], numpy.ndarray],
+    thresholds: t.Sequence[int],
+    queries_per_build: int = 100_000,
+    sample_size: int = 50_000,
+    num_queries: int = 200,
+    candidates: t.Sequence[PDQIndexConfig] = CANDIDATES,
+    seed: t.Optional[int] = None,
+) -> TuningResult:
+    """
+    Times each of the candidates on a sample of hashes.
+
+    Parameters
+    ----------
+    hashes: the hashes to be indexed, as hex strings or uint8[n, 32] vectors
+    thresholds: the thresholds queries are expected to use, equally often
+    queries_per_build: the number of queries expected before the index is
+        next rebuilt, to weigh search time against build time
+    sample_size: the most hashes to build the candidates with
+    num_queries: the number of queries timed at each threshold
+
+    Candidates that would scan the storage at every threshold are skipped, as
+    they would only time PDQFlatHashIndex again.
+    """
+    if not thresholds:
+        raise ValueError("tune needs at least one threshold")
+    candidates = [
+        config
+        for config in candidates
+        if any(config.uses_hash_tables_at(threshold) for threshold in thresholds)
+    ]
+    if not candidates:
+        return TuningResult(PDQIndexConfig(PDQFlatHashIndex.__name__), {})
+    rng = numpy.random.default_rng(seed)
+    n = len(hashes)
+    if n > sample_size:
+        picked = numpy.sort(rng.choice(n, sample_size, replace=False))
+        if isinstance(hashes, numpy.ndarray):
+            vectors = as_vectors(hashes[picked])
+        else:
+            vectors = as_vectors([hashes[i] for i in picked])
+    else:
+        vectors = as_vectors(hashes)
+    if not len(vectors):
+        return TuningResult(PDQIndexConfig(), {})
+    scale = n / len(vectors)
+
+    queries = {
+        threshold: _queries_near(vectors, threshold, num_queries, rng)
+        for threshold in thresholds
+    }
+    costs = {}
+    for config in candidates:
+        index = config.create()
+        start = time.perf_counter()
+        index.add(vectors, range(len(vectors)))
+        build = time.perf_counter() - start
+        search = 0.0
+        for threshold, qs in queries.items():
+            # Best of a few, as a slow outlier is more likely noise than signal
+            search += min(_time_search(index, qs, threshold) for _ in range(3))
+        per_query = search / (len(thresholds) * num_queries)
+        costs[config] = scale * (build + queries_per_build * per_query)
+    return TuningResult(min(costs, key=costs.__getitem__), costs)
+
+
+def _queries_near(
+    vectors: numpy.ndarray, threshold: int, num_queries: int, rng
+) -> numpy.ndarray:
+    """
+    Queries each between 0 and threshold bits away from a random hash of
+    vectors, as that is where matching queries are
+    """
+    targets = vectors[rng.integers(0, len(vectors), num_queries)]
+    bits = numpy.unpackbits(targets, axis=1)
+    for row, flips in zip(
+        bits, rng.integers(0, min(threshold, BITS_IN_PDQ) + 1, num_queries)
+    ):
+        flipped = rng.choice(BITS_IN_PDQ, flips, replace=False)
+        row[flipped] ^= 1
+    return numpy.packbits(bits, axis=1)
+
+
+def _time_search(index: PDQHashIndex, queries: numpy.ndarray, threshold: int) -> float:
+    start = time.perf_counter()
+    index.range_search(queries, threshold)
+    return time.perf_counter() - start
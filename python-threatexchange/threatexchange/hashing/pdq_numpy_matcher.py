@@ -0,0 +1,261 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+"""
+A PDQ hash index that only needs numpy, for environments where faiss isn't
+available.
+
+It has the same interface as the faiss PDQHashIndex implementations, and
+searches exhaustively like PDQFlatHashIndex: hashes are stored packed as
+uint64[n, 4] and compared blockwise with xor + popcount (see pdq_hamming).
+"""
+
+import typing as t
+
+import numpy
+
+from . import pdq_hamming
+from .pdq_codec import PDQ_VECTORS_INPUT_TYPE
+from .pdq_id_map import IdPositionMap
+from .pdq_results import PDQSearchResults
+
+
+class PDQNumpyHashIndex:
+    """
+    Exhaustive PDQ index backed by numpy arrays.
+
+    Properties:
+    block_pairs: int (optional)
+        Max number of (query, hash) distances to compute at once, which
+        bounds the memory used by a search (see pdq_hamming.distance_matrix)
+    """
+
+    def __init__(self, block_pairs: int = pdq_hamming.DEFAULT_BLOCK_PAIRS) -> None:
+        self.block_pairs = block_pairs
+        self._size = 0
+        # Over-allocated so that repeated adds are amortized O(1) per hash
+        self._packed = numpy.empty((0, pdq_hamming.PDQ_PACKED_WORDS), numpy.uint64)
+        self._ids = numpy.empty(0, numpy.uint64)
+        self._id_map = IdPositionMap()
+
+    @classmethod
+    def from_arrays(
+        cls,
+        packed: numpy.ndarray,
+        ids: numpy.ndarray,
+        block_pairs: int = pdq_hamming.DEFAULT_BLOCK_PAIRS,
+    ) -> "PDQNumpyHashIndex":
+        """
+        Wraps existing uint64[n, 4] packed hashes and uint64[n] ids without
+        copying them, i.e. arrays over an mmap-ed file, which may be read-only.
+        The first add copies them into memory the index owns.
+        """
+        ret = cls(block_pairs)
+        ret._packed = packed.reshape(-1, pdq_hamming.PDQ_PACKED_WORDS)
+        ret._ids = ids
+        if len(ret._packed) != len(ids):
+            raise ValueError("packed and ids must be the same length")
+        ret._size = len(ids)
+        ret._id_map = IdPositionMap.from_ids(ids.view(numpy.int64))
+        return ret
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def packed(self) -> numpy.ndarray:
+        """The uint64[n, 4] packed hashes, in insertion order"""
+        return self._packed[: self._size]
+
+    @property
+    def ids(self) -> numpy.ndarray:
+        """The uint64[n] custom ids, in insertion order"""
+        return self._ids[: self._size]
+
+    def add(self, hashes: PDQ_VECTORS_INPUT_TYPE, custom_ids: t.Iterable[int]):
+        """
+        Parameters
+        ----------
+        hashes: sequence of PDQ Hashes
+            The PDQ hashes to add. May also be already decoded uint8[n, 32]
+            vectors or raw bytes (see pdq_codec.as_vectors)
+        custom_ids: sequence of custom ids for the PDQ Hashes
+            The nth item in custom_ids will be used as the id for the nth hash
+            in hashes.
+        """
+        packed = pdq_hamming.as_packed(hashes)
+        if isinstance(custom_ids, numpy.ndarray):
+            ids = custom_ids.astype(numpy.uint64)
+        else:
+            ids = numpy.fromiter(custom_ids, dtype=numpy.uint64)
+        if len(ids) != len(packed):
+            raise ValueError("hashes and custom_ids must be the same length")
+        end = self._size + len(packed)
+        if end > len(self._packed):
+            capacity = max(end, 2 * len(self._packed))
+            self._packed = self._grow(self._packed, capacity)
+            self._ids = self._grow(self._ids, capacity)
+        self._packed[self._size : end] = packed
+        self._ids[self._size : end] = ids
+        self._size = end
+        self._id_map.extend(ids.view(numpy.int64))
+
+    def remove(self, custom_ids: t.Iterable[int]) -> int:
+        """
+        Removes all hashes with the given custom ids, returning how many were
+        removed. O(n) in the size of the index, so batch removals.
+        """
+        ids = numpy.fromiter(custom_ids, dtype=numpy.uint64)
+        keep = ~numpy.isin(self.ids, ids)
+        removed = self._size - int(keep.sum())
+        if removed:
+            self._packed = self.packed[keep]
+            self._ids = self.ids[keep]
+            self._size = len(self._ids)
+            self._id_map = IdPositionMap.from_ids(self._ids.view(numpy.int64))
+        return removed
+
+    def _grow(self, array: numpy.ndarray, capacity: int) -> numpy.ndarray:
+        ret = numpy.empty((capacity,) + array.shape[1:], array.dtype)
+        ret[: self._size] = array[: self._size]
+        return ret
+
+    def hash_at(self, idx: int):
+        """
+        Returns the hash added with the given custom id
+        """
+        position = self._id_map.position_of(numpy.uint64(idx).view(numpy.int64))
+        return pdq_hamming.packed_to_hashes(self.packed[position : position + 1])[0]
+
+    def _query_blocks(
+        self, queries: numpy.ndarray
+    ) -> t.Iterator[t.Tuple[int, numpy.ndarray]]:
+        """
+        Yields (start, distances) for blocks of queries, where distances is
+        the uint16 distance matrix between those queries and every hash.
+        """
+        rows = max(1, self.block_pairs // max(1, self._size))
+        for start in range(0, len(queries), rows):
+            yield start, pdq_hamming.distance_matrix(
+                queries[start : start + rows], self.packed, self.block_pairs
+            )
+
+    def range_search(
+        self,
+        queries: PDQ_VECTORS_INPUT_TYPE,
+        threshhold: int,
+    ) -> PDQSearchResults:
+        """
+        Returns every hash no more than threshhold away from each query, see
+        PDQHashIndex.range_search
+        """
+        qs = pdq_hamming.as_packed(queries)
+        counts = numpy.zeros(len(qs), dtype=numpy.int64)
+        positions = []
+        distances = []
+        for start, block in self._query_blocks(qs):
+            rows, cols = numpy.nonzero(block <= threshhold)
+            counts[start : start + len(block)] = numpy.bincount(
+                rows, minlength=len(block)
+            )
+            positions.append(cols.astype(numpy.int64))
+            distances.append(block[rows, cols].astype(numpy.int32))
+        return self._results(counts, positions, distances)
+
+    def search_topk(
+        self,
+        queries: PDQ_VECTORS_INPUT_TYPE,
+        k: int,
+        max_distance: t.Optional[int] = None,
+    ) -> PDQSearchResults:
+        """
+        Returns the k nearest hashes to each query (or all of them, if there
+        are fewer than k), closest first, leaving out any further away than
+        max_distance, if given.
+        """
+        qs = pdq_hamming.as_packed(queries)
+        k = min(k, self._size)
+        counts = numpy.zeros(len(qs), dtype=numpy.int64)
+        positions = []
+        distances = []
+        for start, block in self._query_blocks(qs):
+            if k < self._size:
+                nearest = numpy.argpartition(block, k - 1, axis=1)[:, :k]
+            else:
+                nearest = numpy.broadcast_to(numpy.arange(k), (len(block), k))
+            nearest_distances = numpy.take_along_axis(block, nearest, axis=1)
+            order = numpy.argsort(nearest_distances, axis=1, kind="stable")
+            block_positions = numpy.take_along_axis(nearest, order, axis=1)
+            block_distances = numpy.take_along_axis(nearest_distances, order, axis=1)
+            if max_distance is None:
+                counts[start : start + len(block)] = k
+                positions.append(block_positions.ravel())
+                distances.append(block_distances.ravel())
+            else:
+                within = block_distances <= max_distance
+                counts[start : start + len(block)] = within.sum(axis=1)
+                positions.append(block_positions[within])
+                distances.append(block_distances[within])
+        return self._results(counts, positions, distances)
+
+    def _results(
+        self,
+        counts: numpy.ndarray,
+        positions: t.List[numpy.ndarray],
+        distances: t.List[numpy.ndarray],
+    ) -> PDQSearchResults:
+        limits = numpy.zeros(len(counts) + 1, dtype=numpy.int64)
+        numpy.cumsum(counts, out=limits[1:])
+        all_positions = (
+            numpy.concatenate(positions).astype(numpy.int64)
+            if positions
+            else numpy.empty(0, numpy.int64)
+        )
+        all_distances = (
+            numpy.concatenate(distances).astype(numpy.int32)
+            if distances
+            else numpy.empty(0, numpy.int32)
+        )
+        packed = self.packed
+        return PDQSearchResults(
+            limits,
+            self.ids[all_positions],
+            all_distances,
+            all_positions,
+            lambda positions: packed[positions],
+        )
+
+    def search(
+        self,
+        queries: PDQ_VECTORS_INPUT_TYPE,
+        threshhold: int,
+        return_as_ids: bool = False,
+    ):
+        """
+        See PDQHashIndex.search
+        """
+        results = self.range_search(queries, threshhold)
+        if return_as_ids:
+            return [results.ids_for(i).tolist() for i in range(len(results))]
+        return [results.hashes_for(i) for i in range(len(results))]
+
+    def search_with_distance_in_result(
+        self,
+        queries: t.Sequence[str],
+        threshhold: int,
+    ):
+        """
+        See PDQHashIndex.search_with_distance_in_result
+        """
+        results = self.range_search(queries, threshhold)
+        return {query: results.match_tuples_for(i) for i, query in enumerate(queries)}
+
+    def __getstate__(self):
+        return {
+            "block_pairs": self.block_pairs,
+            "packed": self.packed.copy(),
+            "ids": self.ids.copy(),
+        }
+
+    def __setstate__(self, data):
+        self.__init__(data["block_pairs"])
+        self.add(data["packed"], data["ids"])
@@ -0,0 +1,80 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+"""
+Array-backed results for batch searches of PDQ indices.
+"""
+
+import typing as t
+
+import numpy
+
+from .pdq_codec import vectors_to_hashes
+
+
+class PDQSearchResults:
+    """
+    The matches for a batch of queries, stored in the flat layout faiss
+    returns from range_search:
+
+      matches for query i are at [limits[i], limits[i + 1])
+      ids: uint64[total] - the custom id of each match
+      distances: int32[total] - hamming distance of each match to its query
+      positions: int64[total] - position of each match in the index storage
+
+    Matched hashes aren't needed by most callers (PDQIndex only needs ids),
+    so they are only reconstructed when first read, in one bulk gather from
+    the index storage rather than a reconstruct() per match.
+
+    Reading hashes after the index has had entries removed may give wrong
+    results, since positions are only stable while the index is appended to.
+    """
+
+    def __init__(
+        self,
+        limits: numpy.ndarray,
+        ids: numpy.ndarray,
+        distances: numpy.ndarray,
+        positions: numpy.ndarray,
+        vectors_at: t.Callable[[numpy.ndarray], numpy.ndarray],
+    ) -> None:
+        self.limits = limits
+        self.ids = ids
+        self.distances = distances
+        self.positions = positions
+        self._vectors_at = vectors_at
+        self._hashes: t.Optional[t.List[str]] = None
+
+    def __len__(self) -> int:
+        """The number of queries"""
+        return len(self.limits) - 1
+
+    @property
+    def total(self) -> int:
+        """The number of matches across all queries"""
+        return len(self.ids)
+
+    def _slice(self, i: int) -> slice:
+        return slice(int(self.limits[i]), int(self.limits[i + 1]))
+
+    def ids_for(self, i: int) -> numpy.ndarray:
+        return self.ids[self._slice(i)]
+
+    def distances_for(self, i: int) -> numpy.ndarray:
+        return self.distances[self._slice(i)]
+
+    @property
+    def hashes(self) -> t.List[str]:
+        """The matched hashes for all queries, reconstructed on first access"""
+        if self._hashes is None:
+            self._hashes = vectors_to_hashes(self._vectors_at(self.positions))
+        return self._hashes
+
+    def hashes_for(self, i: int) -> t.List[str]:
+        return self.hashes[self._slice(i)]
+
+    def match_tuples_for(self, i: int) -> t.List[t.Tuple[int, str, int]]:
+        """(id, hash, distance) for each match of query i"""
+        s = self._slice(i)
+        return list(
+            zip(self.ids[s].tolist(), self.hashes[s], self.distances[s].tolist())
+        )
@@ -3,6 +3,21 @@
 
 BITS_IN_PDQ = 256
 
+# The rotations and mirror images of an image that PDQ can hash all at once
+# from the one DCT, in the order pdqhash.compute_dihedral returns them. The
+# flips are mirror images across the x and y axes, and the diagonals
+# (flip_plus1 is the transpose).
+DIHEDRAL_TRANSFORMS = (
+    "original",
+    "rotate90",
+    "rotate180",
+    "rotate270",
+    "flipx",
+    "flipy",
+    "flip_plus1",
+    "flip_minus1",
+)
+
 
 def simple_distance_binary(bin_a, bin_b):
     """
@@ -16,8 +31,26 @@ def simple_distance_binary(bin_a, bin_b):
 def simple_distance(hex_a, hex_b):
     """
     Returns the binary hamming distance of two hexadecimal strings.
+
+    Both hashes are packed into a single 256-bit int, so the distance is one
+    xor and one popcount rather than a comparison per bit.
+    """
+    return popcount(hex_to_int(hex_a) ^ hex_to_int(hex_b))
+
+
+def hex_to_int(pdq_hex):
+    """
+    Convert a hexadecimal string to the 256-bit integer it represents. Requires input string to be length BITS_IN_PDQ / 4.
+    """
+    assert len(pdq_hex) == BITS_IN_PDQ / 4
+    return int(pdq_hex, 16)
+
+
+def popcount(x):
+    """
+    Returns the number of set bits in a non-negative integer.
     """
-    return simple_distance_binary(hex_to_binary_str(hex_a), hex_to_binary_str(hex_b))
+    return bin(x).count("1")
 
 
 def hex_to_binary_str(pdq_hex):
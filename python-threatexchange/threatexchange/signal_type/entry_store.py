@@ -0,0 +1,479 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+"""
+Compact storage for the (hash, metadata) entries of a SignalTypeIndex.
+
+For indices built from fetched data (i.e. by `threatexchange dataset`), the
+metadata of each entry is a list of (collab name, FetchedSignalMetadata), and
+each of those holds a list of SignalOpinions with their own owner, category,
+and tags. As python objects, that is easily ten times the size of a 32 byte
+PDQ hash.
+
+ColumnarEntryStore instead keeps those entries in typed arrays, one row per
+record and per opinion, with strings, tag collections, and classes interned
+into small tables. Objects are only rebuilt for the entries that are read,
+which for an index is just the ones that matched.
+
+Entries whose metadata is a list of flat dataclasses, each field a string or
+a collection of string tags (i.e. the BaseIndexMetadata of
+hasher-matcher-actioner), are also columnar, one row per item and per field.
+Their strings are mostly unique (ids and hashes), so are kept as utf-8 in one
+buffer rather than interned, and a field equal to the entry's own hash takes
+no space at all.
+
+Entries of any other shape are stored pickled, so the store can hold
+anything a list could.
+"""
+
+import array
+import collections.abc
+import dataclasses
+import enum
+import pickle
+import sys
+import typing as t
+
+# Entry kinds
+_REMOVED = 0
+_COLUMNAR = 1
+_PICKLED = 2
+_FLAT = 3
+
+_HASH_BYTES = 32
+
+# name => array typecode
+_COLUMNS = {
+    # Per entry
+    "kind": "B",
+    "start": "q",  # First record row, or pickle byte offset
+    "stop": "q",
+    # Per record
+    "record_collab": "i",
+    "record_cls": "i",
+    "record_opinions_end": "q",
+    # Per opinion
+    "opinion_owner": "q",
+    "opinion_category": "i",
+    "opinion_tags": "i",
+    "opinion_cls": "i",
+    "opinion_extra": "i",  # -1 if the opinion class has no extra fields
+    # Per flat dataclass item
+    "item_cls": "i",
+    "item_values_end": "q",
+    # Per flat dataclass field, a byte range of text, or for tags
+    # (-1 - interned id, 0), or (0, -1) for the entry's hash
+    "value_start": "q",
+    "value_stop": "q",
+}
+
+_INT64_MIN = -(2**63)
+_INT64_MAX = 2**63 - 1
+
+
+class _Interned:
+    """Values <=> small ints"""
+
+    def __init__(self, values: t.Iterable[t.Any] = ()) -> None:
+        self.values: t.List[t.Any] = []
+        self.ids: t.Dict[t.Any, int] = {}
+        for value in values:
+            self.id_of(value)
+
+    def id_of(self, value: t.Any) -> int:
+        id = self.ids.get(value)
+        if id is None:
+            id = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return id
+
+
+class _Unsupported(Exception):
+    """An entry that needs to be pickled instead"""
+
+
+class ColumnarEntryStore(collections.abc.MutableSequence):
+    """
+    A list of (hash, metadata) entries, stored column-wise where possible,
+    that is for lists of fetched records or of flat dataclasses (see the
+    module docstring). Anything else is pickled.
+
+    Like the list it replaces, supports indexing, appending, and assigning
+    (i.e. None for removed entries), but not inserting or deleting, which
+    would change the ids of later entries.
+
+    Reading an entry returns newly built objects, so modifying them doesn't
+    change the stored entry.
+    """
+
+    def __init__(self, entries: t.Iterable[t.Any] = ()) -> None:
+        self._columns: t.Dict[str, t.Any] = {
+            name: array.array(typecode) for name, typecode in _COLUMNS.items()
+        }
+        # 32 bytes per entry, zeros if the hash is pickled with the entry
+        self._hashes: t.Any = bytearray()
+        self._pickles: t.Any = bytearray()
+        # utf-8 strings of flat dataclass fields
+        self._text: t.Any = bytearray()
+        self._strings = _Interned()
+        self._classes = _Interned()
+        self._categories = _Interned()
+        # (type, tuple of tags)
+        self._tag_collections = _Interned()
+        # Tuples of the values of fields that opinion subclasses add
+        self._extras = _Interned()
+        self.extend(entries)
+
+    def __len__(self) -> int:
+        return len(self._columns["kind"])
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self._get(j) for j in range(*i.indices(len(self)))]
+        return self._get(self._check_index(i))
+
+    def __setitem__(self, i, value):  # type: ignore[override]
+        if isinstance(i, slice):
+            raise NotImplementedError(
+                "ColumnarEntryStore doesn't support slice assignment"
+            )
+        i = self._check_index(i)
+        self._ensure_owned()
+        kind, start, stop = self._store(value)
+        c = self._columns
+        c["kind"][i] = kind
+        c["start"][i] = start
+        c["stop"][i] = stop
+        self._hashes[i * _HASH_BYTES : (i + 1) * _HASH_BYTES] = self._hash_bytes(
+            kind, value
+        )
+
+    def __delitem__(self, i):  # type: ignore[override]
+        raise NotImplementedError("ColumnarEntryStore only supports appending")
+
+    def insert(self, i: int, value: t.Any) -> None:
+        if i != len(self):
+            raise NotImplementedError("ColumnarEntryStore only supports appending")
+        self.append(value)
+
+    def append(self, value: t.Any) -> None:
+        self._ensure_owned()
+        kind, start, stop = self._store(value)
+        c = self._columns
+        c["kind"].append(kind)
+        c["start"].append(start)
+        c["stop"].append(stop)
+        self._hashes += self._hash_bytes(kind, value)
+
+    def extend(self, values: t.Iterable[t.Any]) -> None:
+        for value in values:
+            self.append(value)
+
+    def _check_index(self, i: int) -> int:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("ColumnarEntryStore index out of range")
+        return i
+
+    @staticmethod
+    def _hash_bytes(kind: int, value: t.Any) -> bytes:
+        if kind in (_COLUMNAR, _FLAT):
+            return bytes.fromhex(value[0])
+        return bytes(_HASH_BYTES)
+
+    # Writing
+
+    def _store(self, value: t.Any) -> t.Tuple[int, int, int]:
+        """Appends the rows for value, returning (kind, start, stop)"""
+        if value is None:
+            return _REMOVED, 0, 0
+        try:
+            hash, metadata = self._check_entry(value)
+            if metadata and all(
+                _field_names(type(item)) is not None for item in metadata
+            ):
+                return self._store_flat(hash, metadata)
+            records = [self._encode_record(item) for item in metadata]
+        except _Unsupported:
+            data = pickle.dumps(value)
+            start = len(self._pickles)
+            self._pickles += data
+            return _PICKLED, start, len(self._pickles)
+        c = self._columns
+        start = len(c["record_cls"])
+        for collab, cls, opinions in records:
+            c["record_collab"].append(collab)
+            c["record_cls"].append(cls)
+            for owner, category, tags, opinion_cls, extra in opinions:
+                c["opinion_owner"].append(owner)
+                c["opinion_category"].append(category)
+                c["opinion_tags"].append(tags)
+                c["opinion_cls"].append(opinion_cls)
+                c["opinion_extra"].append(extra)
+            c["record_opinions_end"].append(len(c["opinion_owner"]))
+        return _COLUMNAR, start, len(c["record_cls"])
+
+    def _store_flat(self, hash: str, items: t.List[t.Any]) -> t.Tuple[int, int, int]:
+        """
+        Appends the rows for a list of flat dataclasses, or raises
+        _Unsupported before appending any if one has a field that isn't a
+        string or tags.
+        """
+        rows = []
+        for item in items:
+            values = []
+            for name in _field_names(type(item)) or ():
+                value = getattr(item, name)
+                if type(value) is str:
+                    values.append(None if value == hash else _utf8(value))
+                else:
+                    values.append(self._encode_tags(value))
+            rows.append((self._classes.id_of(type(item)), values))
+        c = self._columns
+        start = len(c["item_cls"])
+        for cls, values in rows:
+            c["item_cls"].append(cls)
+            for value in values:
+                if value is None:
+                    c["value_start"].append(0)
+                    c["value_stop"].append(-1)
+                elif isinstance(value, bytes):
+                    c["value_start"].append(len(self._text))
+                    self._text += value
+                    c["value_stop"].append(len(self._text))
+                else:
+                    c["value_start"].append(-1 - value)
+                    c["value_stop"].append(0)
+            c["item_values_end"].append(len(c["value_start"]))
+        return _FLAT, start, len(c["item_cls"])
+
+    def _check_entry(self, value: t.Any) -> t.Tuple[str, t.List[t.Any]]:
+        """
+        Checks that value is a (hex hash, list), or raises _Unsupported.
+        """
+        if not isinstance(value, tuple) or len(value) != 2:
+            raise _Unsupported
+        hash, metadata = value
+        if (
+            not isinstance(hash, str)
+            or len(hash) != 2 * _HASH_BYTES
+            or hash != hash.lower()
+            or not isinstance(metadata, list)
+        ):
+            raise _Unsupported
+        try:
+            bytes.fromhex(hash)
+        except ValueError:
+            raise _Unsupported
+        return hash, metadata
+
+    def _encode_record(self, item: t.Any):
+        if not isinstance(item, tuple) or len(item) != 2:
+            raise _Unsupported
+        collab, record = item
+        if type(collab) is not str:
+            raise _Unsupported
+        record_cls = type(record)
+        if (
+            _field_names(record_cls) != ("opinions",)
+            or type(record.opinions) is not list
+        ):
+            raise _Unsupported
+        return (
+            self._strings.id_of(collab),
+            self._classes.id_of(record_cls),
+            [self._encode_opinion(o) for o in record.opinions],
+        )
+
+    def _encode_opinion(self, opinion: t.Any):
+        opinion_cls = type(opinion)
+        names = _field_names(opinion_cls)
+        if names is None or names[:3] != ("owner", "category", "tags"):
+            raise _Unsupported
+        owner, category, tags = opinion.owner, opinion.category, opinion.tags
+        if type(owner) is not int or not _INT64_MIN <= owner <= _INT64_MAX:
+            raise _Unsupported
+        if not isinstance(category, enum.Enum):
+            raise _Unsupported
+        extra = -1
+        if len(names) > 3:
+            extra_values = tuple(getattr(opinion, name) for name in names[3:])
+            try:
+                extra = self._extras.id_of(extra_values)
+            except TypeError:  # Unhashable
+                raise _Unsupported
+        return (
+            owner,
+            self._categories.id_of(category),
+            self._encode_tags(tags),
+            self._classes.id_of(opinion_cls),
+            extra,
+        )
+
+    def _encode_tags(self, tags: t.Any) -> int:
+        """The interned id of a collection of str tags"""
+        tags_type = type(tags)
+        if tags_type not in (list, set, frozenset) or any(
+            type(tag) is not str for tag in tags
+        ):
+            raise _Unsupported
+        tag_values = tuple(tags) if tags_type is list else tuple(sorted(tags))
+        return self._tag_collections.id_of((tags_type, tag_values))
+
+    def _decode_tags(self, id: int) -> t.Any:
+        tags_type, tag_values = self._tag_collections.values[id]
+        return tags_type(tag_values)
+
+    # Reading
+
+    def _get(self, i: int) -> t.Any:
+        c = self._columns
+        kind = c["kind"][i]
+        start, stop = c["start"][i], c["stop"][i]
+        if kind == _REMOVED:
+            return None
+        if kind == _PICKLED:
+            return pickle.loads(self._pickles[start:stop])
+        hash = bytes(self._hashes[i * _HASH_BYTES : (i + 1) * _HASH_BYTES]).hex()
+        if kind == _FLAT:
+            return (hash, [self._decode_item(r, hash) for r in range(start, stop)])
+        return (hash, [self._decode_record(r) for r in range(start, stop)])
+
+    def _decode_item(self, r: int, hash: str) -> t.Any:
+        c = self._columns
+        values_end = c["item_values_end"]
+        values = []
+        for v in range(values_end[r - 1] if r else 0, values_end[r]):
+            start, stop = c["value_start"][v], c["value_stop"][v]
+            if stop < 0:
+                values.append(hash)
+            elif start < 0:
+                values.append(self._decode_tags(-1 - start))
+            else:
+                values.append(bytes(self._text[start:stop]).decode())
+        return self._classes.values[c["item_cls"][r]](*values)
+
+    def _decode_record(self, r: int) -> t.Tuple[str, t.Any]:
+        c = self._columns
+        opinions_end = c["record_opinions_end"]
+        first_opinion = opinions_end[r - 1] if r else 0
+        record_cls = self._classes.values[c["record_cls"][r]]
+        opinions = [
+            self._decode_opinion(o) for o in range(first_opinion, opinions_end[r])
+        ]
+        return (self._strings.values[c["record_collab"][r]], record_cls(opinions))
+
+    def _decode_opinion(self, o: int) -> t.Any:
+        c = self._columns
+        extra = c["opinion_extra"][o]
+        return self._classes.values[c["opinion_cls"][o]](
+            c["opinion_owner"][o],
+            self._categories.values[c["opinion_category"][o]],
+            self._decode_tags(c["opinion_tags"][o]),
+            *(self._extras.values[extra] if extra >= 0 else ()),
+        )
+
+    # Serialization
+
+    def sections(self) -> t.Dict[str, t.Any]:
+        """
+        The store as named buffers, for index_file.write_index_file. The
+        small interning tables are pickled together.
+        """
+        ret: t.Dict[str, t.Any] = dict(self._columns)
+        ret["hashes"] = self._hashes
+        ret["pickles"] = self._pickles
+        ret["text"] = self._text
+        ret["tables"] = pickle.dumps(self._tables())
+        ret["byteorder"] = sys.byteorder.encode()
+        return ret
+
+    @classmethod
+    def from_sections(cls, sections: t.Mapping[str, t.Any]) -> "ColumnarEntryStore":
+        """
+        Opens a store from sections(), i.e. as memoryviews of a mapped index
+        file, without copying them. The first change copies the columns.
+        """
+        ret = cls.__new__(cls)
+        ret._set_tables(pickle.loads(sections["tables"]))
+        swap = bytes(sections["byteorder"]).decode() != sys.byteorder
+        ret._columns = {}
+        for name, typecode in _COLUMNS.items():
+            # Files from before flat dataclasses were columnar lack their columns
+            column = memoryview(sections.get(name, b"")).cast("B").cast(typecode)
+            if swap:
+                column = array.array(typecode, column.tobytes())
+                column.byteswap()
+            ret._columns[name] = column
+        ret._hashes = memoryview(sections["hashes"])
+        ret._pickles = memoryview(sections["pickles"])
+        ret._text = memoryview(sections.get("text", b""))
+        return ret
+
+    def _tables(self) -> t.Tuple[t.List[t.Any], ...]:
+        return (
+            self._strings.values,
+            self._classes.values,
+            self._categories.values,
+            self._tag_collections.values,
+            self._extras.values,
+        )
+
+    def _set_tables(self, tables: t.Tuple[t.List[t.Any], ...]) -> None:
+        strings, classes, categories, tag_collections, extras = tables
+        self._strings = _Interned(strings)
+        self._classes = _Interned(classes)
+        self._categories = _Interned(categories)
+        self._tag_collections = _Interned(tag_collections)
+        self._extras = _Interned(extras)
+
+    def _ensure_owned(self) -> None:
+        """Copy columns that are views of a buffer (see from_sections)"""
+        if isinstance(self._hashes, bytearray):
+            return
+        self._columns = {
+            name: array.array(_COLUMNS[name], column)
+            for name, column in self._columns.items()
+        }
+        self._hashes = bytearray(self._hashes)
+        self._pickles = bytearray(self._pickles)
+        self._text = bytearray(self._text)
+
+    def __getstate__(self):
+        self._ensure_owned()
+        return {
+            "columns": self._columns,
+            "hashes": self._hashes,
+            "pickles": self._pickles,
+            "text": self._text,
+            "tables": self._tables(),
+        }
+
+    def __setstate__(self, state) -> None:
+        self._columns = state["columns"]
+        for name, typecode in _COLUMNS.items():
+            self._columns.setdefault(name, array.array(typecode))
+        self._hashes = state["hashes"]
+        self._pickles = state["pickles"]
+        self._text = state.get("text", bytearray())
+        self._set_tables(state["tables"])
+
+
+def _utf8(value: str) -> bytes:
+    try:
+        return value.encode()
+    except UnicodeEncodeError:  # i.e. lone surrogates
+        raise _Unsupported
+
+
+def _field_names(cls: type) -> t.Optional[t.Tuple[str, ...]]:
+    """
+    The positional __init__ args of a dataclass, or None if it isn't one
+    that can be rebuilt from them.
+    """
+    if not dataclasses.is_dataclass(cls):
+        return None
+    fields = dataclasses.fields(cls)
+    if not all(f.init for f in fields):
+        return None
+    return tuple(f.name for f in fields)
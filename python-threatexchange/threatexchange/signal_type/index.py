@@ -71,8 +71,8 @@ class SignalTypeIndex(t.Generic[T]):
     The default interface assumes that you can both create and update
     indices. It's possible that some storage types cannot support this.
     In that case build() and deserialize() are the only methods that
-    should be used to create indices, and you can have add() methods
-    throw NotImplementedError.
+    should be used to create indices, and you can have add() and remove()
+    methods throw NotImplementedError.
 
     # Handling Restricted Value Types
     In cases where your underlying index has limited type support for
@@ -107,6 +107,17 @@ class SignalTypeIndex(t.Generic[T]):
         """
         raise NotImplementedError
 
+    def query_many(self, queries: t.Sequence[str]) -> t.List[t.List[IndexMatch[T]]]:
+        """
+        Look up multiple entries against the index in a single call.
+
+        Returns one list of matches per query, in the same order as queries.
+        The default implementation just calls query() for each entry, but
+        indices that can search a whole batch at once (i.e. faiss) should
+        override this, as it is usually much cheaper than one lookup per hash.
+        """
+        return [self.query(q) for q in queries]
+
     @classmethod
     def build(cls: t.Type[Self], entries: t.Iterable[t.Tuple[str, T]]) -> Self:
         """
@@ -139,6 +150,22 @@ class SignalTypeIndex(t.Generic[T]):
         for signal_str, entry in entries:
             self.add(signal_str, entry)
 
+    def remove(self, signal_str: str, entry: t.Optional[T] = None) -> int:
+        """
+        Remove entries from the index, returning how many were removed.
+
+        If entry is given, only entries for signal_str equal to it are
+        removed, otherwise all entries for signal_str are.
+
+        This lets a small change to the underlying signals be applied to an
+        existing index, rather than rebuilding it.
+        """
+        raise NotImplementedError
+
+    def remove_all(self, entries: t.Iterable[t.Tuple[str, t.Optional[T]]]) -> int:
+        """remove, but more so"""
+        return sum(self.remove(signal_str, entry) for signal_str, entry in entries)
+
     def serialize(self, fout: t.BinaryIO) -> None:
         """
         Convert the index into a bytestream (probably a file).
@@ -0,0 +1,283 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+"""
+A versioned binary file format for SignalTypeIndex serialization that can be
+opened with mmap, as an alternative to pickling the whole index.
+
+Loading a pickle reads the entire file and then materializes every object in
+it, briefly holding two copies. An index file is instead a set of named,
+aligned binary sections (i.e. the raw bytes of a faiss index or numpy
+arrays), which are used in place from the mapped file, so opening one is
+close to free and pages are only read as they are touched.
+
+Layout (all integers little-endian):
+
+  magic           8 bytes   b"TXINDEX\\0"
+  version         uint32
+  reserved        uint32
+  sections        each starting at a multiple of SECTION_ALIGNMENT
+  table of contents, as utf-8 json:
+                  {"kind": str, "attrs": {...}, "sections": {name: [offset, length]}}
+  toc offset      uint64
+  toc length      uint64
+  magic           8 bytes
+
+The table of contents is written last so that the file can be written to a
+stream without seeking.
+"""
+
+import array
+import collections.abc
+import json
+import mmap
+import pickle
+import struct
+import typing as t
+
+MAGIC = b"TXINDEX\0"
+FORMAT_VERSION = 1
+SECTION_ALIGNMENT = 64
+
+_HEADER = struct.Struct("<8sII")
+_FOOTER = struct.Struct("<QQ8s")
+
+# Anything supporting the buffer protocol: bytes, memoryview, numpy arrays...
+Buffer = t.Any
+
+T = t.TypeVar("T")
+
+
+def map_file(fin: t.BinaryIO) -> Buffer:
+    """
+    Return the remaining contents of fin, memory mapped if it is a real file,
+    or else read into memory.
+
+    The mapping stays valid after fin is closed.
+    """
+    try:
+        fileno = fin.fileno()
+    except (AttributeError, OSError):
+        return fin.read()
+    offset = fin.tell()
+    if offset % mmap.ALLOCATIONGRANULARITY:
+        return fin.read()
+    try:
+        return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ, offset=offset)
+    except ValueError:  # Empty file
+        return fin.read()
+
+
+def is_index_file(buf: Buffer) -> bool:
+    return bytes(memoryview(buf)[: len(MAGIC)]) == MAGIC
+
+
+def write_index_file(
+    fout: t.BinaryIO,
+    kind: str,
+    sections: t.Mapping[str, Buffer],
+    attrs: t.Optional[t.Dict[str, t.Any]] = None,
+) -> None:
+    """
+    Write sections (name => buffer) to fout in the index file format.
+
+    kind and attrs (which must be json serializable) are stored as is, for
+    the reader to identify the index and restore any small state.
+    """
+    fout.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0))
+    pos = _HEADER.size
+    toc: t.Dict[str, t.List[int]] = {}
+    for name, section in sections.items():
+        data = memoryview(section).cast("B")
+        padding = -pos % SECTION_ALIGNMENT
+        fout.write(b"\0" * padding)
+        pos += padding
+        toc[name] = [pos, len(data)]
+        fout.write(data)
+        pos += len(data)
+    toc_bytes = json.dumps(
+        {"kind": kind, "attrs": attrs or {}, "sections": toc}
+    ).encode()
+    fout.write(toc_bytes)
+    fout.write(_FOOTER.pack(pos, len(toc_bytes), MAGIC))
+
+
+class IndexFile:
+    """
+    A parsed index file. Sections are memoryviews into the original buffer
+    (i.e. the mmap from map_file), so nothing is copied.
+    """
+
+    def __init__(self, buf: Buffer) -> None:
+        view = memoryview(buf).cast("B")
+        if len(view) < _HEADER.size + _FOOTER.size:
+            raise ValueError("Too short to be an index file")
+        magic, version, _ = _HEADER.unpack_from(view, 0)
+        toc_offset, toc_length, end_magic = _FOOTER.unpack_from(
+            view, len(view) - _FOOTER.size
+        )
+        if magic != MAGIC or end_magic != MAGIC:
+            raise ValueError("Not an index file, or truncated")
+        if version > FORMAT_VERSION:
+            raise ValueError(
+                f"Index file version {version} is newer than supported ({FORMAT_VERSION})"
+            )
+        toc = json.loads(bytes(view[toc_offset : toc_offset + toc_length]))
+        self.version: int = version
+        self.kind: str = toc["kind"]
+        self.attrs: t.Dict[str, t.Any] = toc["attrs"]
+        self.sections: t.Dict[str, memoryview] = {
+            name: view[offset : offset + length]
+            for name, (offset, length) in toc["sections"].items()
+        }
+
+    @classmethod
+    def read(cls, fin: t.BinaryIO) -> "IndexFile":
+        return cls(map_file(fin))
+
+
+def pickle_entries(entries: t.Iterable[t.Any]) -> t.Tuple[bytes, t.List[int]]:
+    """
+    Pickle each entry separately, returning the concatenated pickles and the
+    offset of each (plus the end), for reading back with PickledEntryList.
+    """
+    chunks = []
+    offsets = [0]
+    for entry in entries:
+        chunk = b"" if entry is None else pickle.dumps(entry)
+        chunks.append(chunk)
+        offsets.append(offsets[-1] + len(chunk))
+    return b"".join(chunks), offsets
+
+
+class PickledEntryList(collections.abc.MutableSequence, t.Generic[T]):
+    """
+    A list of entries, backed by separately pickled entries in a buffer, as
+    written by pickle_entries. An empty pickle stands for None.
+
+    Entries are only unpickled when accessed, so opening a large mapped index
+    doesn't need to materialize all of its metadata. Assigned and appended
+    entries are kept in memory on top of the buffer.
+    """
+
+    def __init__(self, blob: Buffer, offsets: t.Sequence[int]) -> None:
+        self._blob = blob
+        self._offsets = offsets
+        self._num_stored = len(offsets) - 1
+        self._overrides: t.Dict[int, t.Optional[T]] = {}
+        self._appended: t.List[t.Optional[T]] = []
+
+    def __len__(self) -> int:
+        return self._num_stored + len(self._appended)
+
+    def _get(self, i: int) -> t.Optional[T]:
+        if i >= self._num_stored:
+            return self._appended[i - self._num_stored]
+        if i in self._overrides:
+            return self._overrides[i]
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        if start == end:
+            return None
+        return pickle.loads(self._blob[start:end])
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self._get(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("PickledEntryList index out of range")
+        return self._get(i)
+
+    def __setitem__(self, i, value):  # type: ignore[override]
+        if isinstance(i, slice):
+            raise NotImplementedError(
+                "PickledEntryList doesn't support slice assignment"
+            )
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("PickledEntryList assignment index out of range")
+        if i >= self._num_stored:
+            self._appended[i - self._num_stored] = value
+        else:
+            self._overrides[i] = value
+
+    def __delitem__(self, i):  # type: ignore[override]
+        raise NotImplementedError("PickledEntryList only supports appending")
+
+    def insert(self, i: int, value: t.Optional[T]) -> None:
+        if i != len(self):
+            raise NotImplementedError("PickledEntryList only supports appending")
+        self._appended.append(value)
+
+    def __reduce__(self):
+        # The buffer is usually an mmap, which can't be pickled
+        return (list, (list(self),))
+
+
+def str_mapping_sections(mapping: t.Mapping[str, t.Any]) -> t.Dict[str, Buffer]:
+    """
+    Sections for a mapping of str => picklable value, which
+    PickledStrMapping.from_sections reads back
+    """
+    keys = sorted(mapping)
+    encoded = [k.encode() for k in keys]
+    key_offsets = [0]
+    for key in encoded:
+        key_offsets.append(key_offsets[-1] + len(key))
+    values, value_offsets = pickle_entries(mapping[k] for k in keys)
+    return {
+        "keys": b"".join(encoded),
+        "key_offsets": array.array("q", key_offsets),
+        "values": values,
+        "value_offsets": array.array("q", value_offsets),
+    }
+
+
+class PickledStrMapping(collections.abc.Mapping, t.Generic[T]):
+    """
+    A read-only mapping of str => values, backed by sorted keys and
+    separately pickled values in a buffer, as written by str_mapping_sections.
+
+    Lookups are a binary search over the keys, only unpickling the value
+    found, so the mapping can be opened from a mapped file without reading
+    it all. Each lookup returns a new copy of the value.
+    """
+
+    def __init__(self, sections: t.Mapping[str, Buffer]) -> None:
+        self._keys = sections["keys"]
+        self._key_offsets = memoryview(sections["key_offsets"]).cast("B").cast("q")
+        self._values = sections["values"]
+        self._value_offsets = memoryview(sections["value_offsets"]).cast("B").cast("q")
+
+    def __len__(self) -> int:
+        return len(self._key_offsets) - 1
+
+    def _key(self, i: int) -> bytes:
+        return bytes(self._keys[self._key_offsets[i] : self._key_offsets[i + 1]])
+
+    def _find(self, key: str) -> int:
+        encoded = key.encode()
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < encoded:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self._key(lo) == encoded:
+            return lo
+        return -1
+
+    def __getitem__(self, key: str) -> T:
+        i = self._find(key) if isinstance(key, str) else -1
+        if i < 0:
+            raise KeyError(key)
+        start, end = self._value_offsets[i], self._value_offsets[i + 1]
+        return pickle.loads(self._values[start:end])
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._find(key) >= 0
+
+    def __iter__(self) -> t.Iterator[str]:
+        return (self._key(i).decode() for i in range(len(self)))
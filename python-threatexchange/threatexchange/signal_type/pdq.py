@@ -50,6 +50,10 @@ class PdqSignal(
     # Hashes of distance less than or equal to this threshold are considered a 'match'
     PDQ_CONFIDENT_MATCH_THRESHOLD = 31
 
+    # Hashes of lower quality than this, i.e. of near blank images, aren't
+    # worth matching: PDQ recommends discarding them
+    PDQ_MIN_QUALITY = 50
+
     @classmethod
     def get_content_types(self) -> t.List[t.Type[ContentType]]:
         return [PhotoContent]
@@ -75,14 +79,48 @@ class PdqSignal(
         return pdq_hash
 
     @classmethod
-    def hash_from_bytes(self, bytes_: bytes) -> str:
+    def hash_from_bytes(cls, bytes_: bytes) -> str:
+        return cls.hash_with_attributes_from_bytes(bytes_).hash
+
+    @classmethod
+    def hash_with_attributes_from_bytes(
+        cls, bytes_: bytes
+    ) -> signal_base.HashWithAttributes:
         try:
             from threatexchange.hashing.pdq_hasher import pdq_from_bytes
         except:
             _raise_pillow_warning()
-            return ""
+            return signal_base.HashWithAttributes("", {})
         pdq_hash, quality = pdq_from_bytes(bytes_)
-        return pdq_hash
+        return signal_base.HashWithAttributes(pdq_hash, {"quality": quality})
+
+    @classmethod
+    def is_low_quality(
+        cls,
+        attributes: t.Mapping[str, t.Union[int, float, str]],
+        min_quality: t.Optional[int] = None,
+    ) -> bool:
+        quality = attributes.get("quality")
+        if quality is None:
+            return False
+        if min_quality is None:
+            min_quality = cls.PDQ_MIN_QUALITY
+        return int(quality) < min_quality
+
+    @classmethod
+    def dihedral_hashes_from_bytes(cls, bytes_: bytes) -> t.List[str]:
+        """
+        The hashes of the image and of its rotations and mirror images, in the
+        order of hashing.pdq_utils.DIHEDRAL_TRANSFORMS, for
+        PDQIndex.query_many_dihedral.
+        """
+        try:
+            from threatexchange.hashing.pdq_hasher import pdq_dihedral_from_bytes
+        except:
+            _raise_pillow_warning()
+            return []
+        pdq_hashes, _quality = pdq_dihedral_from_bytes(bytes_)
+        return pdq_hashes
 
     @staticmethod
     def get_examples() -> t.List[str]:
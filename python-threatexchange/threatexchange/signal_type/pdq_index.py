@@ -2,75 +2,704 @@
 
 """
 Implementation of SignalTypeIndex abstraction for PDQ by wrapping
-hashing.pdq_faiss_matcher.
+hashing.pdq_faiss_matcher, or hashing.pdq_numpy_matcher if faiss isn't
+installed.
 """
 
 import collections
+import math
+import random
+import threading
 import typing as t
 import pickle
 
+import numpy
+
+from threatexchange.signal_type import index_file
+from threatexchange.signal_type.entry_store import ColumnarEntryStore
 from threatexchange.signal_type.index import (
     PickledSignalTypeIndex,
     SignalTypeIndex,
     IndexMatch,
     T as IndexT,
 )
-from threatexchange.hashing.pdq_faiss_matcher import (
-    PDQMultiHashIndex,
-    PDQFlatHashIndex,
-    PDQHashIndex,
-)
+from threatexchange.hashing.pdq_numpy_matcher import PDQNumpyHashIndex
+from threatexchange.hashing.pdq_utils import DIHEDRAL_TRANSFORMS
+from threatexchange.hashing.pdq_results import PDQSearchResults
+
+try:
+    from threatexchange.hashing.pdq_faiss_matcher import (
+        PDQMultiHashIndex,
+        PDQFlatHashIndex,
+        PDQHashIndex,
+    )
+    from threatexchange.hashing.pdq_index_tuning import (
+        PDQIndexConfig,
+        tune as tune_index,
+    )
+
+    _FAISS_AVAILABLE = True
+except ImportError:
+    _FAISS_AVAILABLE = False
+
+if t.TYPE_CHECKING:
+    _PDQIndexImpl = t.Union["PDQHashIndex", PDQNumpyHashIndex]
+
+
+class DihedralIndexMatch(IndexMatch[IndexT]):
+    """
+    A match from PDQIndex.query_many_dihedral, which also has the transform
+    of the query (one of hashing.pdq_utils.DIHEDRAL_TRANSFORMS) that matched.
+    I.e. "rotate90" means the entry is of the query image rotated 90 degrees.
+    """
+
+    __slots__ = ["transform"]
+    transform: str
+
+    def __init__(self, distance: int, metadata: IndexT, transform: str) -> None:
+        super().__init__(distance, metadata)
+        self.transform = transform
 
 
 class PDQIndex(PickledSignalTypeIndex):
     """
     Wrapper around the pdq faiss index lib using PDQMultiHashIndex
+
+    Falls back to the (exhaustive) PDQNumpyHashIndex if faiss isn't installed.
+
+    build(tune=True) picks the faiss index (and its number of hashmaps) that
+    is fastest for the entries, see hashing.pdq_index_tuning, and the choice
+    is kept in config and serialized with the index.
+
+    Entries are kept in a ColumnarEntryStore, which stores the metadata of
+    fetched signals, and lists of flat dataclasses like hasher-matcher-
+    actioner's, in a small fraction of the memory of the python objects.
+
+    Entries with identical hashes (i.e. the same hash in several datasets)
+    share one vector in the underlying index, whose id is the local id of
+    the first of them, and the local ids of the rest are kept in a postings
+    list for it. So shared hashes don't make the index bigger or slower.
+
+    Removed entries are tombstoned: they are dropped from local_id_to_entry
+    straight away (so no longer match), and once a vector has no entries
+    left it is removed from the underlying index, in batches, once there
+    are enough of them. Removing from the index costs O(n), so this keeps
+    applying small deltas proportional to the delta.
+
+    A few degenerate hashes (i.e. of blank or uniform images) can match a
+    large fraction of all queries. build() marks them as hot (see
+    find_hot_entries), query_many can cap how far hot entries match and how
+    many matches are returned, and with count_matches it tracks in
+    match_counts how often each entry has matched, to find the ones that do
+    so suspiciously often.
     """
 
+    # Compact once tombstones outnumber this fraction of the live entries...
+    COMPACTION_RATIO = 0.25
+    # ...and there are at least this many of them
+    COMPACTION_MIN_TOMBSTONES = 1024
+
+    # Whether build() tunes the index by default. Tuning times builds and
+    # searches of each candidate, which slows down the build and makes the
+    # choice depend on the machine, so it is opt-in. Subclasses with a fixed
+    # backend aren't TUNABLE at all
+    AUTO_TUNE = False
+    TUNABLE = True
+    # build() only tunes for this many entries or more, as below that every
+    # index is fast
+    AUTO_TUNE_MIN_ENTRIES = 10_000
+
+    # Entries within the threshold of at least this fraction of a sample of
+    # the index's own hashes are hot...
+    HOT_ENTRY_SAMPLE_SIZE = 10_000
+    HOT_ENTRY_MIN_FRACTION = 0.01
+    # ...as long as that is at least this many of them, so that in a small
+    # index a handful of near duplicates aren't hot
+    HOT_ENTRY_MIN_MATCHES = 50
+
     @classmethod
     def get_match_threshold(cls):
         return 31  # PDQ_CONFIDENT_MATCH_THRESHOLD
 
     @classmethod
-    def _get_empty_index(cls) -> PDQHashIndex:
+    def _get_empty_index(cls) -> "_PDQIndexImpl":
+        if not _FAISS_AVAILABLE:
+            return PDQNumpyHashIndex()
         return PDQMultiHashIndex()
 
-    def __init__(self, entries: t.Iterable[t.Tuple[str, IndexT]] = ()) -> None:
+    def __init__(
+        self,
+        entries: t.Iterable[t.Tuple[str, IndexT]] = (),
+        config: t.Optional["PDQIndexConfig"] = None,
+    ) -> None:
         super().__init__()
-        self.local_id_to_entry: t.List[t.Tuple[str, IndexT]] = []
-        self.index: PDQHashIndex = self._get_empty_index()
+        # Removed entries are replaced with None, so that ids stay stable
+        self.local_id_to_entry: t.MutableSequence[
+            t.Optional[t.Tuple[str, IndexT]]
+        ] = ColumnarEntryStore()
+        self.config = config
+        self.index: "_PDQIndexImpl" = (
+            self._get_empty_index() if config is None else config.create()
+        )
+        self._num_removed = 0
+        # Vector id => local ids of the other entries with the same hash
+        self._postings: t.Dict[int, t.List[int]] = {}
+        # Ids of vectors without entries, but not yet removed from self.index
+        self._tombstones: t.Set[int] = set()
+        # Vector ids of hot entries, as of the last find_hot_entries()
+        self.hot_ids: t.FrozenSet[int] = frozenset()
+        # Vector id => number of hashes searched by query_many(count_matches)
+        # it matched, so at most one key per vector
+        self.match_counts: t.Counter[int] = collections.Counter()
+        self._match_counts_lock = threading.Lock()
         self.add_all(entries=entries)
 
+    def __getstate__(self) -> t.Dict[str, t.Any]:
+        state = self.__dict__.copy()
+        del state["_match_counts_lock"]
+        return state
+
+    def __setstate__(self, state: t.Dict[str, t.Any]) -> None:
+        # Indices pickled before removal was supported
+        state.setdefault("_num_removed", 0)
+        state.setdefault("_tombstones", set())
+        # Indices pickled before deduplication have a vector per entry
+        state.setdefault("_postings", {})
+        state.setdefault("config", None)
+        state.setdefault("hot_ids", frozenset())
+        state.setdefault("match_counts", collections.Counter())
+        self.__dict__.update(state)
+        self._match_counts_lock = threading.Lock()
+
+    @classmethod
+    def build(
+        cls,
+        entries: t.Iterable[t.Tuple[str, IndexT]],
+        thresholds: t.Optional[t.Sequence[int]] = None,
+        tune: t.Optional[bool] = None,
+    ):
+        """
+        Build an index from a set of entries, with its hot entries at the
+        largest of thresholds (by default get_match_threshold()) found.
+
+        With tune (by default AUTO_TUNE), and enough entries, the faiss index
+        is picked by timing candidates for queries at thresholds.
+        """
+        entries = list(entries)
+        thresholds = thresholds or [cls.get_match_threshold()]
+        if tune is None:
+            tune = cls.AUTO_TUNE
+        config = None
+        if (
+            tune
+            and cls.TUNABLE
+            and _FAISS_AVAILABLE
+            and len(entries) >= cls.AUTO_TUNE_MIN_ENTRIES
+        ):
+            config = tune_index([e[0] for e in entries], thresholds).best
+        ret = cls(entries, config=config)
+        if len(entries) >= cls.HOT_ENTRY_MIN_MATCHES:
+            ret.find_hot_entries(max(thresholds))
+        return ret
+
+    def find_hot_entries(
+        self, threshold: t.Optional[int] = None, seed: t.Optional[int] = None
+    ) -> t.FrozenSet[int]:
+        """
+        Finds the entries that would match an outsized share of queries, and
+        stores the ids of their vectors as hot_ids.
+
+        Searching for a random sample of the index's own hashes counts, for
+        every entry at once, how many of them it is within threshold of. As
+        distance is symmetric, that estimates the share of hashes like those
+        indexed that the entry matches, so one batch search over the sample
+        replaces a search for every entry.
+        """
+        if threshold is None:
+            threshold = self.get_match_threshold()
+        n = len(self.local_id_to_entry)
+        picked = random.Random(seed).sample(
+            range(n), min(n, self.HOT_ENTRY_SAMPLE_SIZE)
+        )
+        sample = [
+            entry[0]
+            for entry in (self.local_id_to_entry[i] for i in picked)
+            if entry is not None
+        ]
+        hot: t.FrozenSet[int] = frozenset()
+        if sample:
+            results = self.index.range_search(sample, threshold)
+            counts = numpy.bincount(results.ids.astype(numpy.int64), minlength=n)
+            min_count = max(
+                self.HOT_ENTRY_MIN_MATCHES,
+                math.ceil(self.HOT_ENTRY_MIN_FRACTION * len(sample)),
+            )
+            hot = frozenset(
+                id
+                for id in numpy.flatnonzero(counts >= min_count).tolist()
+                if id not in self._tombstones
+            )
+        self.hot_ids = hot
+        return hot
+
+    def most_matched(self, n: int = 10) -> t.List[t.Tuple[str, int]]:
+        """
+        The hashes of the n entries that have matched the most hashes in
+        query_many(count_matches=True) since match_counts was last cleared,
+        with their counts.
+        """
+        # Vectors whose entries were all removed are skipped, so take a few
+        # more than n, and more again only if too many of them were
+        fetch = 2 * n
+        while True:
+            with self._match_counts_lock:
+                most_common = self.match_counts.most_common(fetch)
+                total = len(self.match_counts)
+            ret = []
+            for id, count in most_common:
+                entries = self._entries_for(id)
+                if entries:
+                    ret.append((entries[0][0], count))
+                    if len(ret) == n:
+                        return ret
+            if fetch >= total:
+                return ret
+            fetch *= 4
+
+    def _entries_for(self, vector_id: int) -> t.List[t.Tuple[str, IndexT]]:
+        """The entries with the hash of a vector that haven't been removed"""
+        ret = []
+        for id in (vector_id, *self._postings.get(vector_id, ())):
+            entry = self.local_id_to_entry[id]
+            if entry is not None:
+                ret.append(entry)
+        return ret
+
     def __len__(self) -> int:
-        return len(self.local_id_to_entry)
+        return len(self.local_id_to_entry) - self._num_removed
 
-    def query(self, hash: str) -> t.List[IndexMatch[IndexT]]:
+    def query(
+        self,
+        hash: str,
+        threshold: t.Optional[int] = None,
+        entry_threshold: t.Optional[t.Callable[[IndexT], int]] = None,
+    ) -> t.List[IndexMatch[IndexT]]:
+        """
+        Look up entries against the index, up to the max supported distance,
+        or threshold if given (see query_many).
         """
-        Look up entries against the index, up to the max supported distance.
+        return self.query_many([hash], threshold, entry_threshold)[0]
+
+    def query_many(
+        self,
+        hashes: t.Sequence[str],
+        threshold: t.Optional[int] = None,
+        entry_threshold: t.Optional[t.Callable[[IndexT], int]] = None,
+        max_matches: t.Optional[int] = None,
+        hot_threshold: t.Optional[int] = None,
+        count_matches: bool = False,
+    ) -> t.List[t.List[IndexMatch[IndexT]]]:
         """
+        Look up a batch of hashes with a single search of the faiss index.
+
+        Identical hashes in the batch are only searched once, and the matched
+        hashes are never reconstructed since only their ids are needed.
+
+        threshold overrides get_match_threshold() for this search, so one
+        index can serve callers with different thresholds. The multi-hash
+        index switches to an exhaustive scan for high thresholds (see
+        PDQMultiHashIndex.MAX_NFLIP), so this is as fast as a PDQFlatIndex.
 
-        # query takes a signal hash but index supports batch queries hence [hash]
-        results = self.index.search_with_distance_in_result(
-            [hash], self.get_match_threshold()
+        entry_threshold, if given, returns the threshold for each matched
+        entry (i.e. from the privacy group or collaboration in its metadata),
+        and matches further away than that are dropped. It can only narrow
+        the search threshold, so pass the largest of them as threshold.
+
+        hot_threshold, if given, drops matches to hot entries (see
+        find_hot_entries) further away than it.
+
+        max_matches, if given, keeps only that many of the closest matches
+        for each hash, which bounds the work done per match for hashes that
+        match much of the index, as matches beyond it are never built.
+        Matches are then sorted by distance.
+
+        count_matches adds the vectors matched to match_counts (see
+        most_matched).
+        """
+        unique_hashes = list(dict.fromkeys(hashes))
+        if not unique_hashes:
+            return []
+        if threshold is None:
+            threshold = self.get_match_threshold()
+        results = self.index.range_search(unique_hashes, threshold)
+        if count_matches:
+            self.record_matches(results.ids)
+        return self._to_matches(
+            hashes,
+            unique_hashes,
+            results,
+            max_matches,
+            hot_threshold=hot_threshold,
+            entry_threshold=entry_threshold,
         )
 
-        matches = []
-        for id, _, distance in results[hash]:
-            matches.append(IndexMatch(distance, self.local_id_to_entry[id][1]))
-        return matches
+    def record_matches(self, ids: numpy.ndarray) -> None:
+        """Adds one to the match_counts of each of the vector ids"""
+        unique_ids, counts = numpy.unique(ids, return_counts=True)
+        counted = dict(zip(unique_ids.tolist(), counts.tolist()))
+        with self._match_counts_lock:
+            self.match_counts.update(counted)
+
+    def query_many_dihedral(
+        self,
+        dihedral_hashes: t.Sequence[t.Sequence[str]],
+        threshold: t.Optional[int] = None,
+    ) -> t.List[t.List[DihedralIndexMatch[IndexT]]]:
+        """
+        Look up rotated and mirrored copies of a batch of images, given the
+        hashes of each image in the order of DIHEDRAL_TRANSFORMS (i.e. from
+        PdqSignal.dihedral_hashes_from_bytes).
+
+        All of the hashes are searched in one batch, and each entry matched
+        by several transforms of an image is only returned once, with the
+        transform closest to it (the earliest of them, if tied).
+        """
+        groups = [list(hashes) for hashes in dihedral_hashes]
+        if any(len(hashes) > len(DIHEDRAL_TRANSFORMS) for hashes in groups):
+            raise ValueError(
+                f"Expected at most {len(DIHEDRAL_TRANSFORMS)} hashes per image"
+            )
+        # Symmetric images have some identical transforms
+        unique_hashes = list(dict.fromkeys(h for hashes in groups for h in hashes))
+        if not unique_hashes:
+            return [[] for _ in groups]
+        if threshold is None:
+            threshold = self.get_match_threshold()
+        results = self.index.range_search(unique_hashes, threshold)
+        position = {hash: i for i, hash in enumerate(unique_hashes)}
+        ret = []
+        for hashes in groups:
+            # vector id -> (distance, transform)
+            closest: t.Dict[int, t.Tuple[int, int]] = {}
+            for transform, hash in enumerate(hashes):
+                i = position[hash]
+                for id, distance in zip(
+                    results.ids_for(i).tolist(), results.distances_for(i).tolist()
+                ):
+                    if id not in closest or distance < closest[id][0]:
+                        closest[id] = (distance, transform)
+            matches = []
+            for id, (distance, transform) in closest.items():
+                for entry in self._entries_for(id):
+                    matches.append(
+                        DihedralIndexMatch(
+                            distance, entry[1], DIHEDRAL_TRANSFORMS[transform]
+                        )
+                    )
+            matches.sort(key=lambda m: m.distance)
+            ret.append(matches)
+        return ret
+
+    def query_topk(
+        self, hash: str, k: int, max_distance: t.Optional[int] = None
+    ) -> t.List[IndexMatch[IndexT]]:
+        """
+        Look up the k closest entries to hash, closest first.
+        """
+        return self.query_many_topk([hash], k, max_distance)[0]
+
+    def query_many_topk(
+        self,
+        hashes: t.Sequence[str],
+        k: int,
+        max_distance: t.Optional[int] = None,
+    ) -> t.List[t.List[IndexMatch[IndexT]]]:
+        """
+        Look up the k closest entries to each of a batch of hashes, closest
+        first, and no further than max_distance if given.
+
+        Unlike query_many this isn't limited to the match threshold, but the
+        number of results is bounded however many entries are nearby, which
+        suits investigating a hash.
+        """
+        unique_hashes = list(dict.fromkeys(hashes))
+        if not unique_hashes or k <= 0:
+            return [[] for _ in hashes]
+        matches_by_hash = {}
+        pending = unique_hashes
+        # Removed vectors not yet compacted out may take up some of the k, so
+        # with any, ask for twice as many, and more for the few hashes that
+        # still come up short
+        fetch = 2 * k if self._tombstones else k
+        while pending:
+            results = self.index.search_topk(pending, fetch, max_distance)
+            retry = []
+            for i, (hash, matches) in enumerate(
+                zip(pending, self._to_matches(pending, pending, results, k))
+            ):
+                # Fewer than fetch found means there are no more to find
+                if len(matches) < k and len(results.ids_for(i)) == fetch:
+                    retry.append(hash)
+                else:
+                    matches_by_hash[hash] = matches
+            pending = retry
+            fetch *= 4
+        # Copy so that callers mutating one result don't affect duplicates
+        return [list(matches_by_hash[hash]) for hash in hashes]
+
+    def _to_matches(
+        self,
+        hashes: t.Sequence[str],
+        unique_hashes: t.Sequence[str],
+        results: PDQSearchResults,
+        limit: t.Optional[int] = None,
+        hot_threshold: t.Optional[int] = None,
+        entry_threshold: t.Optional[t.Callable[[IndexT], int]] = None,
+    ) -> t.List[t.List[IndexMatch[IndexT]]]:
+        """
+        The matches of each of hashes, at most limit of them (the closest,
+        closest first), with matches to hot entries further than hot_threshold
+        and to entries further than their entry_threshold left out. Results
+        are cut down as arrays, so only matches that are returned are built.
+        """
+        hot_ids = None
+        if hot_threshold is not None and self.hot_ids:
+            hot_ids = numpy.array(sorted(self.hot_ids), dtype=numpy.uint64)
+        matches_by_hash = {}
+        for i, hash in enumerate(unique_hashes):
+            ids = results.ids_for(i)
+            distances = results.distances_for(i)
+            if hot_ids is not None:
+                keep = ~(numpy.isin(ids, hot_ids) & (distances > hot_threshold))
+                ids, distances = ids[keep], distances[keep]
+            if limit is not None:
+                # Vectors whose entries were all removed or are filtered out
+                # by entry_threshold don't count toward the limit
+                k = None if entry_threshold else limit + len(self._tombstones)
+                order = self._closest(distances, k)
+                ids, distances = ids[order], distances[order]
+            matches = []
+            for id, distance in zip(ids.tolist(), distances.tolist()):
+                for entry in self._entries_for(id):
+                    if entry_threshold is None or distance <= entry_threshold(entry[1]):
+                        matches.append(IndexMatch(distance, entry[1]))
+                if limit is not None and len(matches) >= limit:
+                    del matches[limit:]
+                    break
+            matches_by_hash[hash] = matches
+        # Copy so that callers mutating one result don't affect duplicates
+        return [list(matches_by_hash[hash]) for hash in hashes]
+
+    @staticmethod
+    def _closest(distances: numpy.ndarray, k: t.Optional[int]) -> numpy.ndarray:
+        """
+        Positions of the k smallest distances (or of all of them), smallest
+        first, and in their original order if tied. Which of several tied
+        at the kth smallest distance are kept is arbitrary.
+        """
+        if k is not None and k < len(distances):
+            closest = numpy.argpartition(distances, k - 1)[:k]
+            closest.sort()
+            return closest[numpy.argsort(distances[closest], kind="stable")]
+        return numpy.argsort(distances, kind="stable")
 
     def add(self, signal_str: str, entry: IndexT) -> None:
         self.add_all(((signal_str, entry),))
 
     def add_all(self, entries: t.Iterable[t.Tuple[str, IndexT]]) -> None:
+        """
+        Adds a vector for each hash not already in the index, and adds the
+        rest to the postings of the existing vector for their hash.
+        """
+        entries = list(entries)
+        if not entries:
+            return
         start = len(self.local_id_to_entry)
         self.local_id_to_entry.extend(entries)
-        if start != len(self.local_id_to_entry):
+        hashes = [e[0] for e in entries]
+        vector_ids: t.Dict[str, int] = {}
+        if start:
+            unique_hashes = list(dict.fromkeys(hashes))
+            # Identical hashes are exactly the distance 0 matches
+            results = self.index.range_search(unique_hashes, 0)
+            for i, hash in enumerate(unique_hashes):
+                ids = results.ids_for(i)
+                if len(ids):
+                    # Several only for indices built before deduplication
+                    vector_ids[hash] = int(ids.min())
+        new_hashes = []
+        new_ids = []
+        for id, hash in enumerate(hashes, start):
+            vector_id = vector_ids.setdefault(hash, id)
+            if vector_id == id:
+                new_hashes.append(hash)
+                new_ids.append(id)
+            else:
+                self._postings.setdefault(vector_id, []).append(id)
+                # Its entries may all have been removed before compaction
+                self._tombstones.discard(vector_id)
+        if new_hashes:
             # This function signature is very silly
-            self.index.add(
-                (e[0] for e in self.local_id_to_entry[start:]),
-                range(start, len(self.local_id_to_entry)),
+            self.index.add(new_hashes, new_ids)  # type: ignore
+
+    def remove(self, signal_str: str, entry: t.Optional[IndexT] = None) -> int:
+        return self.remove_all(((signal_str, entry),))
+
+    def remove_all(self, entries: t.Iterable[t.Tuple[str, t.Optional[IndexT]]]) -> int:
+        """
+        Removes the matching entries, tombstoning vectors left without any,
+        and compacts the underlying index if enough have built up.
+        """
+        entries = list(entries)
+        if not entries:
+            return 0
+        # Entries with an identical hash are exactly the distance 0 matches
+        results = self.index.range_search([e[0] for e in entries], 0)
+        removed = 0
+        for i, (_, to_remove) in enumerate(entries):
+            for vector_id in results.ids_for(i).tolist():
+                remaining = []
+                for id in (vector_id, *self._postings.pop(vector_id, ())):
+                    entry = self.local_id_to_entry[id]
+                    if entry is None:
+                        continue
+                    if to_remove is not None and entry[1] != to_remove:
+                        remaining.append(id)
+                        continue
+                    self.local_id_to_entry[id] = None
+                    removed += 1
+                # The vector's own entry may be gone while others remain
+                postings = [id for id in remaining if id != vector_id]
+                if postings:
+                    self._postings[vector_id] = postings
+                if not remaining:
+                    self._tombstones.add(vector_id)
+        self._num_removed += removed
+        if len(self._tombstones) >= max(
+            self.COMPACTION_MIN_TOMBSTONES, self.COMPACTION_RATIO * len(self)
+        ):
+            self.compact()
+        return removed
+
+    def compact(self) -> None:
+        """
+        Removes all tombstoned vectors from the underlying index.
+        """
+        if self._tombstones:
+            self.index.remove(self._tombstones)
+            self._tombstones.clear()
+
+    def serialize(self, fout: t.BinaryIO) -> None:
+        """
+        Writes the index in the index_file format, which deserialize can
+        memory map instead of unpickling.
+        """
+        sections: t.Dict[str, t.Any] = {}
+        attrs: t.Dict[str, t.Any] = {
+            "backend": type(self.index).__name__,
+            "num_removed": self._num_removed,
+        }
+        if self.config is not None:
+            attrs["config"] = self.config.to_dict()
+        if isinstance(self.index, PDQNumpyHashIndex):
+            attrs["block_pairs"] = self.index.block_pairs
+            sections["packed"] = numpy.ascontiguousarray(self.index.packed)
+            sections["ids"] = numpy.ascontiguousarray(self.index.ids)
+        else:
+            sections["faiss"] = self.index.serialize_to_buffer()
+        if isinstance(self.local_id_to_entry, ColumnarEntryStore):
+            attrs["entries"] = "columnar"
+            for name, section in self.local_id_to_entry.sections().items():
+                sections[f"entries.{name}"] = section
+        else:
+            attrs["entries"] = "pickled"
+            blob, offsets = index_file.pickle_entries(self.local_id_to_entry)
+            sections["entry_offsets"] = numpy.array(offsets, dtype=numpy.uint64)
+            sections["entries"] = blob
+        sections["tombstones"] = numpy.array(sorted(self._tombstones), numpy.int64)
+        # Flattened (vector id, local id) pairs
+        sections["postings"] = numpy.array(
+            [
+                x
+                for vector_id, ids in self._postings.items()
+                for id in ids
+                for x in (vector_id, id)
+            ],
+            numpy.int64,
+        )
+        sections["hot_ids"] = numpy.array(sorted(self.hot_ids), numpy.int64)
+        index_file.write_index_file(fout, type(self).__name__, sections, attrs)
+
+    @classmethod
+    def deserialize(cls, fin: t.BinaryIO):
+        """
+        Opens an index written by serialize. If fin is a real file it is
+        memory mapped, and the hashes and entries are used in place rather
+        than read up front.
+
+        Also accepts indices pickled by earlier versions.
+        """
+        buf = index_file.map_file(fin)
+        if not index_file.is_index_file(buf):
+            return pickle.loads(buf)
+        f = index_file.IndexFile(buf)
+        ret = cls.__new__(cls)
+        SignalTypeIndex.__init__(ret)
+        ret.index = cls._index_from_file(f)
+        # Only written if tuned, which needs faiss, as does loading its index
+        config = f.attrs.get("config")
+        ret.config = None if config is None else PDQIndexConfig.from_dict(config)
+        if f.attrs.get("entries") == "columnar":
+            prefix = "entries."
+            ret.local_id_to_entry = ColumnarEntryStore.from_sections(
+                {
+                    name[len(prefix) :]: section
+                    for name, section in f.sections.items()
+                    if name.startswith(prefix)
+                }
+            )
+        else:
+            ret.local_id_to_entry = index_file.PickledEntryList(
+                f.sections["entries"],
+                numpy.frombuffer(f.sections["entry_offsets"], dtype=numpy.uint64),
+            )
+        ret._num_removed = f.attrs["num_removed"]
+        ret._tombstones = set(
+            numpy.frombuffer(f.sections["tombstones"], dtype=numpy.int64).tolist()
+        )
+        ret._postings = {}
+        # Not written by earlier versions
+        postings = f.sections.get("postings")
+        if postings is not None:
+            for vector_id, id in (
+                numpy.frombuffer(postings, numpy.int64).reshape(-1, 2).tolist()
+            ):
+                ret._postings.setdefault(vector_id, []).append(id)
+        hot_ids = f.sections.get("hot_ids")
+        ret.hot_ids = frozenset(
+            () if hot_ids is None else numpy.frombuffer(hot_ids, numpy.int64).tolist()
+        )
+        ret.match_counts = collections.Counter()
+        ret._match_counts_lock = threading.Lock()
+        return ret
+
+    @staticmethod
+    def _index_from_file(f: index_file.IndexFile) -> "_PDQIndexImpl":
+        backend = f.attrs["backend"]
+        if backend == PDQNumpyHashIndex.__name__:
+            return PDQNumpyHashIndex.from_arrays(
+                numpy.frombuffer(f.sections["packed"], dtype=numpy.uint64),
+                numpy.frombuffer(f.sections["ids"], dtype=numpy.uint64),
+                f.attrs["block_pairs"],
             )
+        if not _FAISS_AVAILABLE:
+            raise ValueError(f"Index was written with {backend}, which needs faiss")
+        faiss_backends: t.Dict[str, t.Type[PDQHashIndex]] = {
+            c.__name__: c for c in (PDQFlatHashIndex, PDQMultiHashIndex)
+        }
+        if backend not in faiss_backends:
+            raise ValueError(f"Unknown PDQ index backend {backend}")
+        return faiss_backends[backend].from_buffer(f.sections["faiss"])
 
 
 class PDQFlatIndex(PDQIndex):
@@ -79,12 +708,34 @@ class PDQFlatIndex(PDQIndex):
     that uses PDQFlatHashIndex instead of PDQMultiHashIndex
     It also uses a high match threshold to increase recall
     possibly as the cost of precision.
+
+    PDQIndex.query_many(hashes, threshold=52) is as fast, so rather than
+    building both, prefer one PDQIndex and pass the threshold per query.
     """
 
+    TUNABLE = False
+
     @classmethod
     def get_match_threshold(cls):
         return 52  # larger PDQ_MATCH_THRESHOLD for flatindexes
 
     @classmethod
-    def _get_empty_index(cls) -> PDQHashIndex:
+    def _get_empty_index(cls) -> "_PDQIndexImpl":
+        if not _FAISS_AVAILABLE:
+            return PDQNumpyHashIndex()
         return PDQFlatHashIndex()
+
+
+class PDQNumpyIndex(PDQIndex):
+    """
+    PDQIndex using PDQNumpyHashIndex, which only needs numpy.
+
+    Searches are exhaustive, so like PDQFlatIndex the cost doesn't grow with
+    the threshold, but unlike it this uses the standard PDQ match threshold.
+    """
+
+    TUNABLE = False
+
+    @classmethod
+    def _get_empty_index(cls) -> "_PDQIndexImpl":
+        return PDQNumpyHashIndex()
@@ -0,0 +1,330 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+"""
+A SignalTypeIndex split across several worker processes.
+
+A single index lives in one python process, so its size is limited by what
+one heap can comfortably hold, and apart from any threads the underlying
+library uses (i.e. faiss's OMP threads), lookups are serialized by the GIL.
+
+ShardedSignalTypeIndex instead partitions entries by signal across N shards,
+each a regular index in its own process. Queries are sent to every shard at
+once, and their matches merged by distance, so throughput scales with cores.
+"""
+
+import inspect
+import io
+import multiprocessing
+import threading
+import typing as t
+import zlib
+
+from threatexchange.signal_type import index_file
+from threatexchange.signal_type.index import (
+    IndexMatch,
+    SignalTypeIndex,
+    T as IndexT,
+)
+from threatexchange.signal_type.pdq_index import PDQIndex
+
+Self = t.TypeVar("Self", bound="ShardedSignalTypeIndex")
+
+
+def _serve_shard(
+    conn,
+    shard_cls: t.Type[SignalTypeIndex],
+    serialized: t.Optional[bytes],
+    threads: t.Optional[int],
+) -> None:
+    """
+    Worker process main: holds one shard, and calls methods on it for the
+    parent until told to stop.
+    """
+    if threads is not None:
+        try:
+            import faiss
+
+            faiss.omp_set_num_threads(threads)
+        except ImportError:
+            pass
+    if serialized is None:
+        index = shard_cls()
+    else:
+        index = shard_cls.deserialize(io.BytesIO(serialized))
+    del serialized
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        method, args, kwargs = request
+        try:
+            if method == "serialize":
+                buffer = io.BytesIO()
+                index.serialize(buffer)
+                result: t.Any = buffer.getvalue()
+            elif method == "build":
+                index = shard_cls.build(*args, **kwargs)
+                result = None
+            else:
+                result = getattr(index, method)(*args, **kwargs)
+        except Exception as e:
+            conn.send((False, e))
+        else:
+            conn.send((True, result))
+    conn.close()
+
+
+class ShardedSignalTypeIndex(SignalTypeIndex[IndexT]):
+    """
+    Partitions entries by a hash of their signal across num_shards processes,
+    each holding a SHARD_INDEX_CLS.
+
+    Partitioning by signal means all entries for one signal are in the same
+    shard, so removes only go to that shard, while queries go to all of them.
+
+    The worker processes stop on close(), or when the parent exits.
+
+    Properties:
+    num_shards: int (optional)
+        Number of worker processes, by default one per core
+    threads_per_shard: int (optional)
+        If set, and faiss is installed, the number of OMP threads each worker
+        lets faiss use. Defaults to one, as the shards already use every core
+    """
+
+    SHARD_INDEX_CLS: t.ClassVar[t.Type[SignalTypeIndex]]
+
+    def __init__(
+        self,
+        entries: t.Iterable[t.Tuple[str, IndexT]] = (),
+        num_shards: t.Optional[int] = None,
+        threads_per_shard: t.Optional[int] = 1,
+        _serialized_shards: t.Optional[t.Sequence[bytes]] = None,
+    ) -> None:
+        super().__init__()
+        if _serialized_shards is not None:
+            num_shards = len(_serialized_shards)
+        elif num_shards is None:
+            num_shards = multiprocessing.cpu_count()
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1")
+        self.num_shards = num_shards
+        # faiss isn't fork safe once it has started its OMP threads
+        context = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._conns = []
+        self._processes = []
+        for i in range(num_shards):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_serve_shard,
+                args=(
+                    child_conn,
+                    self.SHARD_INDEX_CLS,
+                    None if _serialized_shards is None else _serialized_shards[i],
+                    threads_per_shard,
+                ),
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._processes.append(process)
+        self.add_all(entries)
+
+    @classmethod
+    def build(
+        cls: t.Type[Self],
+        entries: t.Iterable[t.Tuple[str, IndexT]],
+        *args: t.Any,
+        num_shards: t.Optional[int] = None,
+        threads_per_shard: t.Optional[int] = 1,
+        **kwargs: t.Any,
+    ) -> Self:
+        """
+        Builds each shard with SHARD_INDEX_CLS.build in its own worker, so
+        that whatever it does beyond adding the entries (i.e. PDQIndex's
+        tuning and find_hot_entries) is done for every shard, in parallel.
+
+        Other arguments are passed on to SHARD_INDEX_CLS.build.
+        """
+        ret = cls(num_shards=num_shards, threads_per_shard=threads_per_shard)
+        by_shard = ret._partition(entries)
+        ret._call(
+            {
+                shard: ("build", (by_shard.get(shard, []), *args), kwargs)
+                for shard in range(ret.num_shards)
+            }
+        )
+        return ret
+
+    def __enter__(self: Self) -> Self:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stops the worker processes"""
+        with self._lock:
+            for conn in self._conns:
+                try:
+                    conn.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+                conn.close()
+            for process in self._processes:
+                process.join()
+            self._conns = []
+            self._processes = []
+
+    def shard_of(self, signal_str: str) -> int:
+        """The shard holding the entries for signal_str"""
+        return zlib.crc32(signal_str.encode()) % self.num_shards
+
+    def _call(
+        self,
+        requests: t.Mapping[int, t.Tuple[str, t.Tuple[t.Any, ...], t.Dict[str, t.Any]]],
+    ) -> t.Dict[int, t.Any]:
+        """
+        Sends {shard: (method, args, kwargs)} to the shards, so that they all run at
+        the same time, then waits for all of their results.
+        """
+        if not self._conns:
+            raise ValueError("ShardedSignalTypeIndex is closed")
+        with self._lock:
+            for shard, request in requests.items():
+                self._conns[shard].send(request)
+            responses = {shard: self._conns[shard].recv() for shard in requests}
+        results = {}
+        for shard, (ok, result) in responses.items():
+            if not ok:
+                raise result
+            results[shard] = result
+        return results
+
+    def _call_all(self, method: str, *args: t.Any, **kwargs: t.Any) -> t.List[t.Any]:
+        results = self._call(
+            {shard: (method, args, kwargs) for shard in range(self.num_shards)}
+        )
+        return [results[shard] for shard in range(self.num_shards)]
+
+    def _partition(
+        self, entries: t.Iterable[t.Tuple[str, t.Any]]
+    ) -> t.Dict[int, t.List[t.Tuple[str, t.Any]]]:
+        by_shard: t.Dict[int, t.List[t.Tuple[str, t.Any]]] = {}
+        for entry in entries:
+            by_shard.setdefault(self.shard_of(entry[0]), []).append(entry)
+        return by_shard
+
+    def __len__(self) -> int:
+        return sum(self._call_all("__len__"))
+
+    def query(
+        self, query: str, *args: t.Any, **kwargs: t.Any
+    ) -> t.List[IndexMatch[IndexT]]:
+        return self.query_many([query], *args, **kwargs)[0]
+
+    def query_many(
+        self, queries: t.Sequence[str], *args: t.Any, **kwargs: t.Any
+    ) -> t.List[t.List[IndexMatch[IndexT]]]:
+        """
+        Searches every shard for the whole batch in parallel, and merges their
+        matches for each query, closest first.
+
+        Other arguments are passed on to each shard's query_many (i.e.
+        PDQIndex's threshold, entry_threshold or max_matches), so they must be
+        picklable. Each shard keeps max_matches of its own matches, and
+        max_matches of the closest of those over all shards are returned.
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+        max_matches = (
+            inspect.signature(self.SHARD_INDEX_CLS.query_many)
+            .bind(self, queries, *args, **kwargs)
+            .arguments.get("max_matches")
+        )
+        ret = self._merge(
+            self._call_all("query_many", queries, *args, **kwargs), len(queries)
+        )
+        if max_matches is not None:
+            ret = [matches[:max_matches] for matches in ret]
+        return ret
+
+    def query_many_topk(
+        self,
+        queries: t.Sequence[str],
+        k: int,
+        max_distance: t.Optional[int] = None,
+    ) -> t.List[t.List[IndexMatch[IndexT]]]:
+        """
+        The k closest matches to each query over all shards, for shard
+        indices that support it (i.e. PDQIndex.query_many_topk)
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+        ret = self._merge(
+            self._call_all("query_many_topk", queries, k, max_distance), len(queries)
+        )
+        return [matches[:k] for matches in ret]
+
+    def _merge(
+        self,
+        shard_results: t.List[t.List[t.List[IndexMatch[IndexT]]]],
+        num_queries: int,
+    ) -> t.List[t.List[IndexMatch[IndexT]]]:
+        ret: t.List[t.List[IndexMatch[IndexT]]] = [[] for _ in range(num_queries)]
+        for results in shard_results:
+            for matches, shard_matches in zip(ret, results):
+                matches.extend(shard_matches)
+        for matches in ret:
+            matches.sort(key=lambda m: m.distance)
+        return ret
+
+    def add(self, signal_str: str, entry: IndexT) -> None:
+        self.add_all(((signal_str, entry),))
+
+    def add_all(self, entries: t.Iterable[t.Tuple[str, IndexT]]) -> None:
+        by_shard = self._partition(entries)
+        self._call({shard: ("add_all", (e,), {}) for shard, e in by_shard.items()})
+
+    def remove(self, signal_str: str, entry: t.Optional[IndexT] = None) -> int:
+        return self.remove_all(((signal_str, entry),))
+
+    def remove_all(self, entries: t.Iterable[t.Tuple[str, t.Optional[IndexT]]]) -> int:
+        by_shard = self._partition(entries)
+        results = self._call(
+            {shard: ("remove_all", (e,), {}) for shard, e in by_shard.items()}
+        )
+        return sum(results.values())
+
+    def serialize(self, fout: t.BinaryIO) -> None:
+        """
+        Writes each shard's own serialization as a section of an index file
+        """
+        shards = self._call_all("serialize")
+        index_file.write_index_file(
+            fout,
+            type(self).__name__,
+            {f"shard.{i}": shard for i, shard in enumerate(shards)},
+            {"num_shards": self.num_shards},
+        )
+
+    @classmethod
+    def deserialize(cls: t.Type[Self], fin: t.BinaryIO) -> Self:
+        f = index_file.IndexFile.read(fin)
+        return cls(
+            _serialized_shards=[
+                bytes(f.sections[f"shard.{i}"]) for i in range(f.attrs["num_shards"])
+            ]
+        )
+
+
+class ShardedPDQIndex(ShardedSignalTypeIndex[IndexT]):
+    """
+    PDQIndex split across processes, see ShardedSignalTypeIndex
+    """
+
+    SHARD_INDEX_CLS = PDQIndex
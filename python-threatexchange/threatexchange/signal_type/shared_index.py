@@ -0,0 +1,172 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+"""
+Sharing one copy of an index between worker processes.
+
+Pre-fork servers and other multi-process matchers otherwise load a private
+copy of the index in every worker, so memory grows with the worker count,
+and every worker pays the cost of loading it.
+
+Instead, one process publishes the index with publish_index(), and each
+worker reads it with a SharedIndexReader. Indices that deserialize by
+memory mapping their file (PDQIndex, TrivialSignalTypeIndex) then share the
+same physical pages through the page cache, and attaching is close to free.
+For an index in RAM, like a multiprocessing.shared_memory segment, publish
+to a tmpfs directory such as /dev/shm, which is where those segments live
+on Linux anyway.
+
+Each publish is a new generation: the index is written to its own file, and
+then the generation counter is atomically replaced, so readers see either
+the old index or the new one in full. Readers check the counter at most
+every check_interval seconds, and swap to the new index when it changes.
+
+Note that PDQMultiHashIndex still builds its hash tables in each process;
+the hashes themselves and the entries are shared.
+"""
+
+import contextlib
+import os
+import tempfile
+import threading
+import time
+import typing as t
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows, where publishers must not overlap
+    fcntl = None  # type: ignore
+
+from threatexchange.signal_type.index import SignalTypeIndex
+
+GENERATION_FILE = "GENERATION"
+LOCK_FILE = "LOCK"
+
+IndexT = t.TypeVar("IndexT", bound=SignalTypeIndex)
+
+
+def _index_path(directory: str, generation: int) -> str:
+    return os.path.join(directory, f"index.{generation}")
+
+
+def current_generation(directory: str) -> t.Optional[int]:
+    """The generation last published to directory, if any"""
+    try:
+        with open(os.path.join(directory, GENERATION_FILE)) as f:
+            return int(f.read())
+    except FileNotFoundError:
+        return None
+
+
+@contextlib.contextmanager
+def _publish_lock(directory: str) -> t.Iterator[None]:
+    """Held while publishing, so that publishers in several processes take turns"""
+    with open(os.path.join(directory, LOCK_FILE), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _write_atomically(path: str, write: t.Callable[[t.BinaryIO], None]) -> None:
+    """Writes a private temporary file beside path, then renames it to path"""
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def publish_index(
+    index: SignalTypeIndex, directory: str, keep: int = 2, if_missing: bool = False
+) -> int:
+    """
+    Serialize index into directory as the next generation, returning it.
+
+    Only the last `keep` generations are kept. Readers that already opened an
+    older one keep working, as an unlinked file is only freed once unmapped.
+
+    Publishers in different processes take turns through a lock file in
+    directory. With if_missing, index is only published if nothing has been
+    yet, and otherwise the current generation is returned, so that every
+    worker process can call this at startup and only the first publishes.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with _publish_lock(directory):
+        previous = current_generation(directory)
+        if if_missing and previous is not None:
+            return previous
+        generation = 0 if previous is None else previous + 1
+        _write_atomically(_index_path(directory, generation), index.serialize)
+        _write_atomically(
+            os.path.join(directory, GENERATION_FILE),
+            lambda f: f.write(str(generation).encode()),
+        )
+
+        for old in range(max(0, generation - keep - 1), generation - keep + 1):
+            try:
+                os.unlink(_index_path(directory, old))
+            except FileNotFoundError:
+                pass
+    return generation
+
+
+class SharedIndexReader(t.Generic[IndexT]):
+    """
+    The latest index published to a directory by publish_index.
+
+    Create one per worker process (i.e. after forking), and call get() for
+    each request. An index returned by get() stays usable after a newer one
+    is swapped in, so a request can keep using the one it started with.
+    """
+
+    def __init__(
+        self,
+        index_cls: t.Type[IndexT],
+        directory: str,
+        check_interval: float = 1.0,
+    ) -> None:
+        self.index_cls = index_cls
+        self.directory = directory
+        self.check_interval = check_interval
+        self.generation: t.Optional[int] = None
+        self._index: t.Optional[IndexT] = None
+        self._last_check = float("-inf")
+        self._lock = threading.Lock()
+
+    def get(self) -> IndexT:
+        """
+        Returns the current index, loading a newer generation if there is
+        one. Raises FileNotFoundError if nothing has been published yet.
+        """
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            with self._lock:
+                if now - self._last_check >= self.check_interval:
+                    self._refresh()
+                    self._last_check = now
+        if self._index is None:
+            raise FileNotFoundError(f"No index published to {self.directory}")
+        return self._index
+
+    def _refresh(self) -> None:
+        # A few tries, in case generations are published faster than we open them
+        for _ in range(3):
+            generation = current_generation(self.directory)
+            if generation is None or generation == self.generation:
+                return
+            try:
+                with open(_index_path(self.directory, generation), "rb") as f:
+                    index = t.cast(IndexT, self.index_cls.deserialize(f))
+            except FileNotFoundError:
+                continue
+            self._index = index
+            self.generation = generation
+            return
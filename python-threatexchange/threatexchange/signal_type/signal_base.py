@@ -6,11 +6,12 @@ Core abstractions for signal types.
 """
 
 import pathlib
+import pickle
 import typing as t
 
 from threatexchange import common
 from threatexchange.content_type import content_base
-from threatexchange.signal_type import index
+from threatexchange.signal_type import index, index_file
 
 
 class HashComparisonResult(t.NamedTuple):
@@ -34,6 +35,16 @@ class HashComparisonResult(t.NamedTuple):
         return cls.from_match() if matches else cls.from_no_match()
 
 
+class HashWithAttributes(t.NamedTuple):
+    """
+    A hash, and any attributes specific to its signal type that were computed
+    along with it, i.e. {"quality": 100} for PDQ
+    """
+
+    hash: str
+    attributes: t.Mapping[str, t.Union[int, float, str]]
+
+
 class SignalType:
     """
     Abstraction for different signal types.
@@ -78,6 +89,21 @@ class SignalType:
         """
         raise NotImplementedError
 
+    @classmethod
+    def is_low_quality(
+        cls,
+        attributes: t.Mapping[str, t.Union[int, float, str]],
+        min_quality: t.Optional[int] = None,
+    ) -> bool:
+        """
+        Is a hash with these attributes (see HashWithAttributes) too degenerate
+        to be worth matching, i.e. of a near blank image? Those tend to match
+        far too much to mean anything.
+
+        min_quality overrides the default for signal types with a quality.
+        """
+        return False
+
     @classmethod
     def validate_signal_str(cls, signal_str: str) -> str:
         """
@@ -145,6 +171,14 @@ class BytesHasher(FileHasher):
         """Get a string representation of the hash from bytes."""
         raise NotImplementedError
 
+    @classmethod
+    def hash_with_attributes_from_bytes(cls, bytes_: bytes) -> HashWithAttributes:
+        """
+        hash_from_bytes, plus any attributes computed along the way, such as
+        a quality score for SignalType.is_low_quality.
+        """
+        return HashWithAttributes(cls.hash_from_bytes(bytes_), {})
+
     @classmethod
     def hash_from_file(cls, file: pathlib.Path) -> str:
         return cls.hash_from_bytes(file.read_bytes())
@@ -169,21 +203,77 @@ class SimpleSignalType(SignalType):
 class TrivialSignalTypeIndex(index.PickledSignalTypeIndex[index.T]):
     """
     Index that does only exact matches
+
+    Serializes to an index file that deserialize() memory maps, so that
+    lookups in a loaded index only unpickle the entries for the hashes
+    queried. The first add() or remove() reads the whole thing into a dict.
     """
 
     def __init__(self) -> None:
-        self.state: t.Dict[str, t.List[index.T]] = {}
+        self.state: t.Union[
+            t.Dict[str, t.List[index.T]],
+            index_file.PickledStrMapping[t.List[index.T]],
+        ] = {}
+
+    def _mutable_state(self) -> t.Dict[str, t.List[index.T]]:
+        if not isinstance(self.state, dict):
+            self.state = dict(self.state.items())
+        return self.state
+
+    def __getstate__(self):
+        return {**self.__dict__, "state": self._mutable_state()}
 
     def query(self, query: str) -> t.List[index.IndexMatch[index.T]]:
         return [index.IndexMatch(0, meta) for meta in self.state.get(query, [])]
 
+    def query_many(
+        self, queries: t.Sequence[str]
+    ) -> t.List[t.List[index.IndexMatch[index.T]]]:
+        state = self.state
+        return [
+            [index.IndexMatch(0, meta) for meta in state.get(q, ())] for q in queries
+        ]
+
     def add(self, signal_str: str, entry: index.T) -> None:
-        l = self.state.get(signal_str)
+        state = self._mutable_state()
+        l = state.get(signal_str)
         if not l:
             l = []
-            self.state[signal_str] = l
+            state[signal_str] = l
         l.append(entry)
 
+    def remove(self, signal_str: str, entry: t.Optional[index.T] = None) -> int:
+        state = self._mutable_state()
+        l = state.get(signal_str)
+        if not l:
+            return 0
+        if entry is None:
+            del state[signal_str]
+            return len(l)
+        kept = [e for e in l if e != entry]
+        if kept:
+            state[signal_str] = kept
+        else:
+            del state[signal_str]
+        return len(l) - len(kept)
+
+    def serialize(self, fout: t.BinaryIO) -> None:
+        index_file.write_index_file(
+            fout, type(self).__name__, index_file.str_mapping_sections(self.state)
+        )
+
+    @classmethod
+    def deserialize(cls, fin: t.BinaryIO):
+        """
+        Also accepts indices pickled by earlier versions
+        """
+        buf = index_file.map_file(fin)
+        if not index_file.is_index_file(buf):
+            return pickle.loads(buf)
+        ret = cls()
+        ret.state = index_file.PickledStrMapping(index_file.IndexFile(buf).sections)
+        return ret
+
 
 class TrivialLinearSearchHashIndex(index.PickledSignalTypeIndex[index.T]):
     """
@@ -207,6 +297,21 @@ class TrivialLinearSearchHashIndex(index.PickledSignalTypeIndex[index.T]):
                 ret.append(index.IndexMatch(res.distance, payload))
         return ret
 
+    def query_many(
+        self, queries: t.Sequence[str]
+    ) -> t.List[t.List[index.IndexMatch[index.T]]]:
+        # One pass over the state for the whole batch, with duplicate
+        # queries only being compared once
+        by_query: t.Dict[str, t.List[index.IndexMatch[index.T]]] = {
+            q: [] for q in queries
+        }
+        for hash, payload in self.state:
+            for query_hash, ret in by_query.items():
+                res = self._SIGNAL_TYPE.compare_hash(hash, query_hash)
+                if res.match:
+                    ret.append(index.IndexMatch(res.distance, payload))
+        return [list(by_query[q]) for q in queries]
+
     def add(self, signal_str: str, entry: index.T) -> None:
         self.state.append((signal_str, entry))
 
@@ -234,5 +339,18 @@ class TrivialLinearSearchMatchIndex(index.PickledSignalTypeIndex[index.T]):
                 ret.append(index.IndexMatch(res.distance, payload))
         return ret
 
+    def query_many(
+        self, queries: t.Sequence[str]
+    ) -> t.List[t.List[index.IndexMatch[index.T]]]:
+        by_query: t.Dict[str, t.List[index.IndexMatch[index.T]]] = {
+            q: [] for q in queries
+        }
+        for signal, payload in self.state:
+            for query_hash, ret in by_query.items():
+                res = self._SIGNAL_TYPE.matches_str(signal, query_hash)
+                if res.match:
+                    ret.append(index.IndexMatch(res.distance, payload))
+        return [list(by_query[q]) for q in queries]
+
     def add(self, signal_str: str, entry: index.T) -> None:
         self.state.append((signal_str, entry))
@@ -0,0 +1,158 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+import dataclasses
+import io
+import pickle
+import typing as t
+import unittest
+
+from threatexchange.fetcher.apis.fb_threatexchange_api import (
+    FBThreatExchangeIndicatorRecord,
+    FBThreatExchangeOpinion,
+)
+from threatexchange.fetcher.fetch_state import SignalOpinion, SignalOpinionCategory
+from threatexchange.fetcher.simple.state import SimpleFetchedSignalMetadata
+from threatexchange.signal_type import index_file
+from threatexchange.signal_type.entry_store import ColumnarEntryStore
+
+# Like hasher-matcher-actioner's index metadata
+@dataclasses.dataclass
+class IndicatorMetadata:
+    indicator_id: str
+    signal_value: str
+    privacy_group: str
+    tags: t.Set[str] = dataclasses.field(default_factory=set)
+
+
+@dataclasses.dataclass
+class BankedMetadata:
+    signal_id: str
+    signal_value: str
+    bank_member_id: str
+
+
+@dataclasses.dataclass
+class CountMetadata:
+    count: int
+
+
+HASH_A = "f" * 64
+HASH_B = "0123456789abcdef" * 4
+
+entries = [
+    (
+        HASH_A,
+        [
+            (
+                "collab a",
+                SimpleFetchedSignalMetadata(
+                    [
+                        SignalOpinion(
+                            1, SignalOpinionCategory.TRUE_POSITIVE, {"a", "b"}
+                        ),
+                        SignalOpinion(2, SignalOpinionCategory.FALSE_POSITIVE, []),
+                    ]
+                ),
+            ),
+            (
+                "collab b",
+                FBThreatExchangeIndicatorRecord(
+                    [
+                        FBThreatExchangeOpinion(
+                            3,
+                            SignalOpinionCategory.WORTH_INVESTIGATING,
+                            ["b", "a"],
+                            1234,
+                        )
+                    ]
+                ),
+            ),
+        ],
+    ),
+    (HASH_B, []),
+    # Stored pickled
+    (HASH_B, {"system_id": 3}),
+    ("not a hash", [("collab a", SimpleFetchedSignalMetadata.get_trivial())]),
+    None,
+]
+
+
+class TestColumnarEntryStore(unittest.TestCase):
+    def setUp(self):
+        self.store = ColumnarEntryStore(entries)
+
+    def test_get(self):
+        self.assertEqual(len(self.store), len(entries))
+        self.assertEqual(list(self.store), entries)
+        self.assertEqual(self.store[-1], None)
+        self.assertEqual(self.store[1:3], entries[1:3])
+        with self.assertRaises(IndexError):
+            self.store[len(entries)]
+
+    def test_returns_copies(self):
+        self.store[0][1][0][1].opinions[0].tags.add("c")
+        self.store[0][1][1][1].opinions[0].tags.append("c")
+        self.assertEqual(self.store[0], entries[0])
+
+    def test_set(self):
+        self.store[0] = None
+        self.store[1] = entries[0]
+        self.store.append(entries[2])
+        self.assertEqual(
+            list(self.store), [None, entries[0]] + entries[2:] + [entries[2]]
+        )
+
+    def test_interns(self):
+        self.store.extend([entries[0]] * 10)
+        self.assertEqual(len(self.store._strings.values), 2)
+        self.assertEqual(len(self.store._tag_collections.values), 3)
+
+    def test_flat_dataclasses(self):
+        flat = [
+            (
+                HASH_A,
+                [
+                    IndicatorMetadata("1", HASH_A, "group", {"b", "a"}),
+                    IndicatorMetadata("2", HASH_B, "group \u2603"),
+                    BankedMetadata("3", HASH_A, "member"),
+                ],
+            ),
+            (HASH_B, [BankedMetadata("4", HASH_B, "")]),
+        ]
+        store = ColumnarEntryStore(flat)
+        self.assertEqual(list(store), flat)
+        self.assertEqual(list(store._columns["kind"]), [3, 3])
+        # Only the fields that aren't the entry's hash are stored as text
+        self.assertEqual(
+            bytes(store._text).decode(), "1group2" + HASH_B + "group \u26033member4"
+        )
+        store[0][1][0].tags.add("c")
+        self.assertEqual(store[0], flat[0])
+
+        # Any other field type is pickled
+        store.append((HASH_A, [CountMetadata(1)]))
+        store.append((HASH_A, [CountMetadata(1), BankedMetadata("5", "", "")]))
+        self.assertEqual(list(store._columns["kind"]), [3, 3, 2, 2])
+        self.assertEqual(len(store._columns["item_cls"]), 4)
+        self.assertEqual(store[3][1][1], BankedMetadata("5", "", ""))
+
+        buffer = io.BytesIO()
+        index_file.write_index_file(buffer, "test", store.sections())
+        f = index_file.IndexFile(buffer.getvalue())
+        self.assertEqual(
+            list(ColumnarEntryStore.from_sections(f.sections)), list(store)
+        )
+        self.assertEqual(list(pickle.loads(pickle.dumps(store))), list(store))
+
+    def test_pickle(self):
+        self.assertEqual(list(pickle.loads(pickle.dumps(self.store))), entries)
+
+    def test_sections(self):
+        buffer = io.BytesIO()
+        index_file.write_index_file(buffer, "test", self.store.sections())
+        f = index_file.IndexFile(buffer.getvalue())
+        loaded = ColumnarEntryStore.from_sections(f.sections)
+        self.assertEqual(list(loaded), entries)
+        loaded[4] = entries[1]
+        loaded.append(entries[0])
+        self.assertEqual(list(loaded), entries[:4] + [entries[1], entries[0]])
@@ -1,5 +1,6 @@
 # Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
 
+import io
 import unittest
 
 from threatexchange.signal_type import (
@@ -50,3 +51,35 @@ class SignalTypeHashTest(unittest.TestCase):
             assert s.hash_from_str(
                 "test string"
             ), "{s!r} produced no output from hasher"
+
+    def test_hash_with_attributes(self):
+        hash, attributes = md5.VideoMD5Signal.hash_with_attributes_from_bytes(b"")
+        self.assertEqual(hash, md5.VideoMD5Signal.hash_from_bytes(b""))
+        self.assertFalse(md5.VideoMD5Signal.is_low_quality(attributes))
+
+    def test_pdq_quality(self):
+        try:
+            import numpy
+            from PIL import Image
+        except ImportError:
+            self.skipTest("Needs the [pdq_hasher] extra")
+
+        def png(pixels) -> bytes:
+            buffer = io.BytesIO()
+            Image.fromarray(pixels).save(buffer, format="PNG")
+            return buffer.getvalue()
+
+        blank = png(numpy.full((64, 64), 128, dtype=numpy.uint8))
+        noise = png(
+            numpy.random.default_rng(0).integers(0, 256, (64, 64), dtype=numpy.uint8)
+        )
+        hash, attributes = pdq.PdqSignal.hash_with_attributes_from_bytes(noise)
+        self.assertEqual(hash, pdq.PdqSignal.hash_from_bytes(noise))
+        self.assertFalse(pdq.PdqSignal.is_low_quality(attributes))
+        self.assertTrue(pdq.PdqSignal.is_low_quality(attributes, min_quality=101))
+
+        _, attributes = pdq.PdqSignal.hash_with_attributes_from_bytes(blank)
+        self.assertLess(attributes["quality"], pdq.PdqSignal.PDQ_MIN_QUALITY)
+        self.assertTrue(pdq.PdqSignal.is_low_quality(attributes))
+        self.assertFalse(pdq.PdqSignal.is_low_quality(attributes, min_quality=0))
+        self.assertFalse(pdq.PdqSignal.is_low_quality({}))
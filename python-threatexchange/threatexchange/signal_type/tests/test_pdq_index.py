@@ -1,12 +1,20 @@
 # Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
 
+import io
+import random
 import unittest
+from unittest import mock
 import pickle
+import tempfile
 import typing as t
 import functools
 
+import numpy
+
+from threatexchange.hashing.pdq_utils import simple_distance
+from threatexchange.signal_type.entry_store import ColumnarEntryStore
 from threatexchange.signal_type.index import IndexMatch
-from threatexchange.signal_type.pdq_index import PDQIndex
+from threatexchange.signal_type.pdq_index import PDQIndex, PDQFlatIndex, PDQNumpyIndex
 
 test_entries = [
     (
@@ -132,3 +140,266 @@ class TestPDQIndex(unittest.TestCase):
             result,
             [IndexMatch(0, test_entries[1][1]), IndexMatch(16, test_entries[0][1])],
         )
+
+    def test_query_many(self):
+        queries = [
+            test_entries[1][0],
+            "aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa",
+            test_entries[1][0],
+        ]
+        results = self.index.query_many(queries)
+        self.assertEqual(len(results), len(queries))
+        expected = [
+            IndexMatch(0, test_entries[1][1]),
+            IndexMatch(16, test_entries[0][1]),
+        ]
+        self.assertEqualPDQIndexMatchResults(results[0], expected)
+        self.assertEqualPDQIndexMatchResults(results[1], [])
+        self.assertEqualPDQIndexMatchResults(results[2], expected)
+        self.assertIsNot(results[0], results[2])
+        self.assertEqual(self.index.query_many([]), [])
+
+    def test_build_tunes(self):
+        class TunedPDQIndex(PDQIndex):
+            AUTO_TUNE_MIN_ENTRIES = len(test_entries)
+
+        self.assertIsNone(self.index.config)
+        # Only when asked to
+        self.assertIsNone(TunedPDQIndex.build(test_entries).config)
+        self.assertIsNone(PDQFlatIndex.build(test_entries, tune=True).config)
+        index = TunedPDQIndex.build(test_entries, thresholds=[31, 52], tune=True)
+        self.assertIsNotNone(index.config)
+        self.assertEqual(type(index.index).__name__, index.config.backend)
+        buffer = io.BytesIO()
+        index.serialize(buffer)
+        buffer.seek(0)
+        loaded = TunedPDQIndex.deserialize(buffer)
+        self.assertEqual(loaded.config, index.config)
+        self.assertEqualPDQIndexMatchResults(
+            loaded.query(test_entries[1][0]),
+            [IndexMatch(0, test_entries[1][1]), IndexMatch(16, test_entries[0][1])],
+        )
+
+    def test_hot_entries(self):
+        class HotPDQIndex(PDQIndex):
+            HOT_ENTRY_MIN_MATCHES = 2
+
+        self.assertEqual(self.index.hot_ids, frozenset())
+        # The first two entries are within 16 of each other, and no others
+        index = HotPDQIndex.build(test_entries)
+        self.assertEqual(index.hot_ids, {0, 1})
+        query = test_entries[0][0]
+        self.assertEqual(sorted(m.distance for m in index.query(query)), [0, 16])
+        self.assertEqual(
+            [
+                [m.distance for m in ms]
+                for ms in index.query_many([query], hot_threshold=10)
+            ],
+            [[0]],
+        )
+        self.assertEqualPDQIndexMatchResults(
+            index.query_many([query], max_matches=1)[0],
+            [IndexMatch(0, test_entries[0][1])],
+        )
+        # Only counted when asked to
+        self.assertEqual(index.most_matched(), [])
+        index.query_many(
+            [test_entries[0][0], test_entries[1][0], test_entries[4][0]],
+            count_matches=True,
+        )
+        self.assertEqual(
+            sorted(index.most_matched(2)),
+            [(test_entries[0][0], 2), (test_entries[1][0], 2)],
+        )
+
+        buffer = io.BytesIO()
+        index.serialize(buffer)
+        buffer.seek(0)
+        loaded = HotPDQIndex.deserialize(buffer)
+        self.assertEqual(loaded.hot_ids, {0, 1})
+        self.assertEqual(loaded.most_matched(), [])
+
+    def test_most_matched_skips_removed(self):
+        rng = random.Random(5)
+        entries = [("%064x" % rng.getrandbits(256), i) for i in range(20)]
+        index = PDQIndex.build(entries)
+        # Entry i matched 100 + i times
+        index.record_matches(
+            numpy.repeat(numpy.arange(20, dtype=numpy.uint64), numpy.arange(100, 120))
+        )
+        self.assertEqual(
+            index.most_matched(2), [(entries[19][0], 119), (entries[18][0], 118)]
+        )
+        # More removed than the first 2 * n looked at
+        index.remove_all(entries[10:])
+        self.assertEqual(
+            index.most_matched(2), [(entries[9][0], 109), (entries[8][0], 108)]
+        )
+        index.remove_all(entries[1:10])
+        self.assertEqual(index.most_matched(2), [(entries[0][0], 100)])
+
+    def test_max_matches(self):
+        query = test_entries[0][0]
+        # 0 to 255 bits away from the query, in shuffled order
+        entries = [("%064x" % ((1 << d) - 1), d) for d in range(0, 256, 7)]
+        entries.reverse()
+        for cls in (PDQIndex, PDQFlatIndex, PDQNumpyIndex):
+            with self.subTest(cls=cls.__name__):
+                index = cls.build(entries)
+                self.assertEqual(
+                    [
+                        m.metadata
+                        for m in index.query_many([query], 256, max_matches=3)[0]
+                    ],
+                    [0, 7, 14],
+                )
+                # Removed entries and those filtered out don't take up any
+                index.remove(entries[-1][0])
+                results = index.query_many(
+                    [query],
+                    256,
+                    entry_threshold=lambda d: 255 if d % 2 else 0,
+                    max_matches=3,
+                )
+                self.assertEqual([m.metadata for m in results[0]], [7, 21, 35])
+
+    def test_query_many_dihedral(self):
+        original, rotated = test_entries[1][0], test_entries[2][0]
+        unrelated = "a" * 64
+        results = self.index.query_many_dihedral(
+            [
+                [unrelated, original, unrelated],
+                [rotated, unrelated, unrelated, unrelated, rotated],
+                [],
+            ]
+        )
+        self.assertEqual(
+            [(m.distance, m.metadata, m.transform) for m in results[0]],
+            [(0, test_entries[1][1], "rotate90"), (16, test_entries[0][1], "rotate90")],
+        )
+        # Identical transforms are only matched once, as the first of them
+        self.assertEqual(
+            [(m.distance, m.transform) for m in results[1]], [(0, "original")]
+        )
+        self.assertEqual(results[2], [])
+        with self.assertRaises(ValueError):
+            self.index.query_many_dihedral([[original] * 9])
+
+    def test_query_threshold(self):
+        query = test_entries[0][0]
+        for cls in (PDQIndex, PDQFlatIndex, PDQNumpyIndex):
+            with self.subTest(cls=cls.__name__):
+                index = cls.build(test_entries)
+                self.assertEqual(
+                    [m.distance for m in index.query(query, threshold=15)], [0]
+                )
+                self.assertEqual(
+                    sorted(m.distance for m in index.query(query, threshold=128)),
+                    [0, 16, 128, 128],
+                )
+                # e.g. a stricter threshold for the collaboration of system 8
+                results = index.query_many(
+                    [query, query],
+                    threshold=128,
+                    entry_threshold=lambda e: 10 if e["system_id"] == 8 else 128,
+                )
+                for matches in results:
+                    self.assertEqual(sorted(m.distance for m in matches), [0, 128, 128])
+
+        for cls in (PDQIndex, PDQFlatIndex, PDQNumpyIndex):
+            with self.subTest(cls=cls.__name__):
+                index = cls.build(test_entries)
+                index.remove(test_entries[4][0])
+                with tempfile.TemporaryFile() as f:
+                    index.serialize(f)
+                    f.seek(0)
+                    loaded = cls.deserialize(f)
+                self.assertIs(type(loaded), cls)
+                self.assertIsInstance(loaded.local_id_to_entry, ColumnarEntryStore)
+                self.assertEqual(len(loaded), len(test_entries) - 1)
+                self.assertEqual(loaded.query(test_entries[4][0]), [])
+                self.assertEqualPDQIndexMatchResults(
+                    loaded.query(test_entries[1][0]),
+                    [
+                        IndexMatch(0, test_entries[1][1]),
+                        IndexMatch(16, test_entries[0][1]),
+                    ],
+                )
+
+                # Changes after loading from the mapped file
+                loaded.add(test_entries[4][0], {"system_id": 4})
+                loaded.remove(test_entries[0][0])
+                loaded.compact()
+                self.assertEqualPDQIndexMatchResults(
+                    loaded.query(test_entries[1][0]),
+                    [IndexMatch(0, test_entries[1][1])],
+                )
+                self.assertEqualPDQIndexMatchResults(
+                    loaded.query(test_entries[4][0]),
+                    [IndexMatch(0, {"system_id": 4})],
+                )
+                self.assertEqual(
+                    len(pickle.loads(pickle.dumps(loaded))), len(test_entries) - 1
+                )
+
+    def test_serialize_to_stream(self):
+        buffer = io.BytesIO()
+        self.index.serialize(buffer)
+        buffer.seek(0)
+        loaded = PDQIndex.deserialize(buffer)
+        self.assertEqual(len(loaded.query(test_entries[0][0])), 2)
+
+    def test_deserialize_pickled(self):
+        loaded = PDQIndex.deserialize(io.BytesIO(pickle.dumps(self.index)))
+        self.assertEqual(len(loaded.query(test_entries[0][0])), 2)
+
+    def test_query_topk(self):
+        for cls in (PDQIndex, PDQFlatIndex, PDQNumpyIndex):
+            with self.subTest(cls=cls.__name__):
+                index = cls.build(test_entries)
+                matches = index.query_topk(test_entries[0][0], 2, max_distance=128)
+                self.assertEqual(
+                    [(m.distance, m.metadata) for m in matches],
+                    [(0, test_entries[0][1]), (16, test_entries[1][1])],
+                )
+                # Beyond the match threshold
+                matches = index.query_topk(test_entries[0][0], 3, max_distance=128)
+                self.assertEqual([m.distance for m in matches], [0, 16, 128])
+
+                # Removed entries don't take up any of the k
+                index.remove(test_entries[0][0])
+                results = index.query_many_topk(
+                    [test_entries[0][0], test_entries[0][0]], 2, max_distance=128
+                )
+                self.assertEqual([m.distance for m in results[0]], [16, 128])
+                self.assertEqual(len(results[1]), 2)
+                self.assertEqual(index.query_many_topk([], 2), [])
+
+    def test_query_topk_with_many_removed(self):
+        rng = random.Random(4)
+        entries = [("%064x" % rng.getrandbits(256), i) for i in range(300)]
+        query = entries[0][0]
+        by_distance = sorted(
+            entries, key=lambda e: (simple_distance(query, e[0]), e[1])
+        )
+        for cls in (PDQIndex, PDQFlatIndex, PDQNumpyIndex):
+            with self.subTest(cls=cls.__name__):
+                index = cls.build(entries)
+                index.remove_all(by_distance[:40])
+                fetched = []
+                search_topk = index.index.search_topk
+
+                def recording_search_topk(queries, k, max_distance=None):
+                    fetched.append(k)
+                    return search_topk(queries, k, max_distance)
+
+                with mock.patch.object(
+                    index.index, "search_topk", recording_search_topk
+                ):
+                    matches = index.query_topk(query, 3)
+                self.assertEqual(
+                    [m.distance for m in matches],
+                    [simple_distance(query, e[0]) for e in by_distance[40:43]],
+                )
+                # Not k plus every removed entry up front
+                self.assertEqual(fetched, [6, 24, 96])
@@ -0,0 +1,142 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+import io
+import random
+import unittest
+
+from threatexchange.signal_type.pdq_index import PDQIndex
+from threatexchange.signal_type.sharded_index import ShardedPDQIndex
+
+
+class HotPDQIndex(PDQIndex):
+    HOT_ENTRY_MIN_MATCHES = 2
+
+
+class ShardedHotPDQIndex(ShardedPDQIndex):
+    SHARD_INDEX_CLS = HotPDQIndex
+
+
+def random_entries(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [("%064x" % rng.getrandbits(256), i) for i in range(n)]
+
+
+def flip_bits(hash: str, bits: int, rng: random.Random) -> str:
+    value = int(hash, 16)
+    for bit in rng.sample(range(256), bits):
+        value ^= 1 << bit
+    return "%064x" % value
+
+
+def as_tuples(results):
+    return [sorted((m.distance, m.metadata) for m in matches) for matches in results]
+
+
+class TestShardedPDQIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.entries = random_entries(200)
+        # Shared, as starting the worker processes is slow
+        cls.index = ShardedPDQIndex(cls.entries, num_shards=3)
+        cls.reference = PDQIndex.build(cls.entries)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.index.close()
+
+    def test_query_many(self):
+        rng = random.Random(1)
+        queries = [flip_bits(h, rng.randrange(40), rng) for h, _ in self.entries[:50]]
+        queries.append("a" * 64)
+        self.assertEqual(
+            as_tuples(self.index.query_many(queries)),
+            as_tuples(self.reference.query_many(queries)),
+        )
+        for matches in self.index.query_many(queries):
+            distances = [m.distance for m in matches]
+            self.assertEqual(distances, sorted(distances))
+        self.assertEqual(self.index.query_many([]), [])
+
+    def test_query_many_options(self):
+        rng = random.Random(2)
+        queries = [flip_bits(h, rng.randrange(40), rng) for h, _ in self.entries[:50]]
+        self.assertEqual(
+            as_tuples(self.index.query_many(queries, 10)),
+            as_tuples(self.reference.query_many(queries, 10)),
+        )
+        self.assertEqual(
+            as_tuples([self.index.query(queries[0], threshold=256)]),
+            as_tuples([self.reference.query(queries[0], threshold=256)]),
+        )
+        results = self.index.query_many(queries, 256, max_matches=3)
+        expected = self.reference.query_many(queries, 256, max_matches=3)
+        self.assertEqual(
+            [[m.distance for m in matches] for matches in results],
+            [[m.distance for m in matches] for matches in expected],
+        )
+        self.assertEqual(
+            as_tuples(self.index.query_many(queries, 256, None, 1)),
+            as_tuples(self.reference.query_many(queries, 256, None, 1)),
+        )
+
+    def test_build(self):
+        with ShardedPDQIndex.build(self.entries, num_shards=2) as index:
+            self.assertEqual(index.num_shards, 2)
+            self.assertEqual(len(index), len(self.entries))
+            query = self.entries[7][0]
+            self.assertEqual(
+                as_tuples([index.query(query)]),
+                as_tuples([self.reference.query(query)]),
+            )
+        # Each shard is built with the shard class's build, which finds its
+        # hot entries
+        rng = random.Random(3)
+        near = flip_bits(self.entries[0][0], 10, rng)
+        entries = self.entries[:60] + [(near, 1000)]
+        with ShardedHotPDQIndex.build(entries, num_shards=1) as index:
+            self.assertEqual(sorted(m.distance for m in index.query(near)), [0, 10])
+            self.assertEqual(
+                [m.distance for m in index.query(near, hot_threshold=5)], [0]
+            )
+
+    def test_query_many_topk(self):
+        queries = [h for h, _ in self.entries[:5]]
+        results = self.index.query_many_topk(queries, 3, max_distance=256)
+        expected = self.reference.query_many_topk(queries, 3, max_distance=256)
+        self.assertEqual(
+            [[m.distance for m in matches] for matches in results],
+            [[m.distance for m in matches] for matches in expected],
+        )
+
+    def test_len(self):
+        self.assertEqual(len(self.index), len(self.entries))
+
+    def test_add_and_remove(self):
+        with ShardedPDQIndex(num_shards=2) as index:
+            index.add_all(self.entries[:10])
+            index.add(self.entries[0][0], 1000)
+            self.assertEqual(
+                as_tuples([index.query(self.entries[0][0])]),
+                [[(0, 0), (0, 1000)]],
+            )
+            self.assertEqual(index.remove(self.entries[0][0], 1000), 1)
+            self.assertEqual(index.remove_all(self.entries[1:3]), 2)
+            self.assertEqual(len(index), 8)
+            self.assertEqual(index.query(self.entries[1][0]), [])
+
+    def test_serialize(self):
+        buffer = io.BytesIO()
+        self.index.serialize(buffer)
+        buffer.seek(0)
+        with ShardedPDQIndex.deserialize(buffer) as loaded:
+            self.assertEqual(loaded.num_shards, 3)
+            query = self.entries[5][0]
+            self.assertEqual(
+                as_tuples([loaded.query(query)]), as_tuples([self.index.query(query)])
+            )
+
+    def test_closed(self):
+        index = ShardedPDQIndex(num_shards=1)
+        index.close()
+        with self.assertRaises(ValueError):
+            index.query("a" * 64)
@@ -0,0 +1,110 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+
+import io
+import multiprocessing
+import os
+import pickle
+import tempfile
+import unittest
+
+from threatexchange.signal_type import index_file
+from threatexchange.signal_type.pdq_index import PDQIndex
+from threatexchange.signal_type.shared_index import (
+    SharedIndexReader,
+    current_generation,
+    publish_index,
+)
+from threatexchange.signal_type.signal_base import TrivialSignalTypeIndex
+
+PDQ_A = "f" * 64
+PDQ_B = "0" * 64
+
+
+def _publish(directory: str, metadata: int, if_missing: bool) -> int:
+    return publish_index(
+        PDQIndex.build([(PDQ_A, metadata)]), directory, if_missing=if_missing
+    )
+
+
+class TestSharedIndex(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def test_publish_and_swap(self):
+        reader = SharedIndexReader(PDQIndex, self.dir.name, check_interval=0)
+        with self.assertRaises(FileNotFoundError):
+            reader.get()
+
+        self.assertEqual(publish_index(PDQIndex.build([(PDQ_A, 1)]), self.dir.name), 0)
+        first = reader.get()
+        self.assertEqual(reader.generation, 0)
+        self.assertIs(reader.get(), first)
+        self.assertEqual([m.metadata for m in first.query(PDQ_A)], [1])
+
+        for generation in (1, 2, 3):
+            publish_index(PDQIndex.build([(PDQ_B, generation)]), self.dir.name)
+        self.assertEqual(current_generation(self.dir.name), 3)
+        self.assertEqual(
+            sorted(f for f in os.listdir(self.dir.name) if f.startswith("index.")),
+            ["index.2", "index.3"],
+        )
+        second = reader.get()
+        self.assertEqual(reader.generation, 3)
+        self.assertEqual([m.metadata for m in second.query(PDQ_B)], [3])
+        # Still usable, though its file was removed
+        self.assertEqual([m.metadata for m in first.query(PDQ_A)], [1])
+
+    def test_check_interval(self):
+        publish_index(PDQIndex.build([(PDQ_A, 1)]), self.dir.name)
+        reader = SharedIndexReader(PDQIndex, self.dir.name, check_interval=3600)
+        first = reader.get()
+        publish_index(PDQIndex.build([(PDQ_A, 2)]), self.dir.name)
+        self.assertIs(reader.get(), first)
+
+    def test_concurrent_publishers(self):
+        with multiprocessing.Pool(4) as pool:
+            # e.g. every worker publishing at startup, only one of which should
+            generations = pool.starmap(
+                _publish, [(self.dir.name, i, True) for i in range(8)]
+            )
+            self.assertEqual(generations, [0] * 8)
+            self.assertEqual(os.listdir(self.dir.name).count("index.0"), 1)
+            # Each gets its own generation
+            generations = pool.starmap(
+                _publish, [(self.dir.name, i, False) for i in range(8)]
+            )
+        self.assertEqual(sorted(generations), list(range(1, 9)))
+        self.assertEqual(current_generation(self.dir.name), 8)
+        self.assertFalse([f for f in os.listdir(self.dir.name) if f.endswith(".tmp")])
+
+    def test_exact_match_index(self):
+        index = TrivialSignalTypeIndex.build([("a", 1), ("b", 2), ("a", 3)])
+        publish_index(index, self.dir.name)
+        loaded = SharedIndexReader(TrivialSignalTypeIndex, self.dir.name).get()
+        self.assertIsInstance(loaded.state, index_file.PickledStrMapping)
+        self.assertEqual(
+            [[m.metadata for m in ms] for ms in loaded.query_many(["a", "c", "b"])],
+            [[1, 3], [], [2]],
+        )
+
+
+class TestTrivialIndexSerialize(unittest.TestCase):
+    def test_round_trip(self):
+        index = TrivialSignalTypeIndex.build([("a", 1), ("é", 2), ("a", 3)])
+        buffer = io.BytesIO()
+        index.serialize(buffer)
+        buffer.seek(0)
+        loaded = TrivialSignalTypeIndex.deserialize(buffer)
+        self.assertEqual(dict(loaded.state), index.state)
+        self.assertNotIn("b", loaded.state)
+
+        loaded.add("b", 4)
+        self.assertEqual(loaded.remove("a", 1), 1)
+        self.assertEqual(loaded.state, {"a": [3], "é": [2], "b": [4]})
+        self.assertEqual(pickle.loads(pickle.dumps(loaded)).state, loaded.state)
+
+    def test_deserialize_pickled(self):
+        index = TrivialSignalTypeIndex.build([("a", 1)])
+        loaded = TrivialSignalTypeIndex.deserialize(io.BytesIO(pickle.dumps(index)))
+        self.assertEqual(loaded.state, {"a": [1]})